@@ -12,5 +12,22 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+# Native async views for the webhook and order reads (orders.async_views)
+os.environ.setdefault("DJANGO_ASYNC_VIEWS", "1")
+# Async requests run their queries in short-lived threads, each with its own
+# connection; persistent connections would only pile up.
+os.environ.setdefault("DJANGO_CONN_MAX_AGE", "0")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup: the stream module uses the ORM and settings.
+from orders.stream import STREAM_PATH, sse_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # The order change feed holds connections open for minutes; it is served
+    # without Django's per-request thread (see orders.stream).
+    if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+        await sse_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
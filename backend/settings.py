@@ -13,6 +13,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -49,6 +52,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the whole middleware stack
+    "orders.metrics.RequestMetricsMiddleware",
+    # Chooses the read database before any view or middleware queries
+    "orders.replicas.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -90,6 +97,60 @@ DATABASES = {
     }
 }
 
+# Opt-in production profile for SQLite (DJANGO_DB_PROFILE=production):
+# - WAL: readers and the single writer no longer block each other.
+# - synchronous=NORMAL: no fsync per commit in WAL mode; a power loss can
+#   drop the last commits, but never corrupts the file.
+# - Memory-mapped reads and a larger page cache (per connection).
+# - busy_timeout: writers wait for the lock instead of failing at once.
+# - BEGIN IMMEDIATE: transactions take the write lock up front, where
+#   busy_timeout applies. A deferred transaction that upgrades from read to
+#   write lock fails with "database is locked" without waiting.
+# - Persistent connections, so the pragmas run once per connection and not
+#   once per request. backend.asgi turns these off (DJANGO_CONN_MAX_AGE=0)
+#   because async requests do not reuse connections.
+# WAL mode is stored in the database file and stays on afterwards.
+SQLITE_PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 2**20,
+    "cache_size": -32 * 2**10,  # KiB when negative: 32 MiB
+    "busy_timeout": 20000,  # ms
+    "temp_store": "MEMORY",
+}
+SQLITE_PRODUCTION_OPTIONS = {
+    "transaction_mode": "IMMEDIATE",
+    "init_command": ";".join(f"PRAGMA {name}={value}" for name, value in SQLITE_PRODUCTION_PRAGMAS.items()),
+}
+DB_PROFILE = os.environ.get("DJANGO_DB_PROFILE", "default")
+if DB_PROFILE == "production":
+    DATABASES["default"].update({
+        "CONN_MAX_AGE": int(os.environ.get("DJANGO_CONN_MAX_AGE", "600")),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": SQLITE_PRODUCTION_OPTIONS,
+    })
+elif DB_PROFILE != "default":
+    raise ImproperlyConfigured(f"DJANGO_DB_PROFILE must be 'default' or 'production', not {DB_PROFILE!r}")
+
+# Read replicas (orders.replicas): comma-separated SQLite files that
+# `manage.py sync_replicas` keeps in sync with the primary. Safe requests read
+# from one of them, unless the client wrote within REPLICA_STICKY_SECONDS
+# (echoed in the DB-Primary-Until header or the db_primary cookie); keep that
+# longer than the sync interval.
+REPLICA_DATABASES = []
+for index, path in enumerate(filter(None, os.environ.get("DJANGO_REPLICA_PATHS", "").split(",")), 1):
+    alias = f"replica{index}"
+    DATABASES[alias] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": path.strip(),
+        "CONN_MAX_AGE": DATABASES["default"].get("CONN_MAX_AGE", 0),
+        "OPTIONS": {"init_command": "PRAGMA query_only=ON"},
+        "TEST": {"MIRROR": "default"},
+    }
+    REPLICA_DATABASES.append(alias)
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", "5"))
+DATABASE_ROUTERS = ["orders.replicas.PrimaryReplicaRouter"] if REPLICA_DATABASES else []
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -141,6 +202,10 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:5173",
     "https://amir-case.sandbox.aviant.no",
 ]
+# Let the dashboard read request timings in the browser, and read and echo
+# back the read-your-writes window of orders.replicas
+CORS_EXPOSE_HEADERS = ["Server-Timing", "DB-Primary-Until"]
+CORS_ALLOW_HEADERS = (*default_headers, "db-primary-until")
 
 # Trust X-Forwarded-Proto from AWS ALB (TLS terminated at ALB)
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
@@ -158,3 +223,20 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
+
+# Kyte integration. Leave KYTE_BASE_URL unset to only log outbound
+# notifications (mock mode).
+KYTE_BASE_URL = os.environ.get("KYTE_BASE_URL")
+KYTE_API_KEY = os.environ.get("KYTE_API_KEY")
+KYTE_TIMEOUT = float(os.environ.get("KYTE_TIMEOUT", "5"))
+
+# Per-request Server-Timing header and /api/metrics/ histograms; "0" removes
+# the middleware entirely.
+REQUEST_METRICS_ENABLED = os.environ.get("REQUEST_METRICS_ENABLED", "1") != "0"
+
+# Serve the webhook and order reads with the native async views in
+# orders.async_views; backend.asgi turns this on, WSGI keeps the DRF views.
+ASYNC_VIEWS = os.environ.get("DJANGO_ASYNC_VIEWS", "0") == "1"
+
+# Seconds between change-feed polls for the order SSE stream (per worker)
+ORDER_STREAM_POLL_INTERVAL = float(os.environ.get("ORDER_STREAM_POLL_INTERVAL", "1"))
@@ -1,5 +1,24 @@
 from django.contrib import admin
-from .models import Customer, Restaurant, Order, OrderItem, OrderEvent
+from django.utils.html import format_html, format_html_join
+
+from . import archive
+from .models import (
+    Customer, Restaurant, Order, OrderItem, OrderEvent, KyteOutboxMessage, KyteWebhookDelivery,
+    RestaurantOrderStats, OrderEventArchive, HourlyRollup,
+)
+
+
+def events_table(events):
+    """Read-only HTML table of (archived) events for admin detail pages."""
+    if not events:
+        return '-'
+    rows = format_html_join(
+        '', '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>',
+        ((e.id, e.created_at, e.event_type, e.event_data) for e in events),
+    )
+    return format_html(
+        '<table><tr><th>ID</th><th>Created at</th><th>Type</th><th>Data</th></tr>{}</table>', rows
+    )
 
 
 @admin.register(Customer)
@@ -34,7 +53,7 @@ class OrderAdmin(admin.ModelAdmin):
     ]
     list_filter = ['status', 'preparation_status', 'placed_at']
     search_fields = ['customer__first_name', 'customer__second_name', 'restaurant__name']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'archived_events']
     inlines = [OrderItemInline, OrderEventInline]
     
     fieldsets = (
@@ -47,8 +66,16 @@ class OrderAdmin(admin.ModelAdmin):
         ('Timestamps', {
             'fields': ('placed_at', 'accepted_at', 'delivered_at', 'cancelled_at', 'created_at', 'updated_at')
         }),
+        ('Archived events', {
+            'classes': ('collapse',),
+            'fields': ('archived_events',)
+        }),
     )
 
+    @admin.display(description='Archived events')
+    def archived_events(self, obj):
+        return events_table(archive.archived_events(obj.pk)) if obj.pk else '-'
+
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
@@ -69,3 +96,61 @@ class OrderEventAdmin(admin.ModelAdmin):
     
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(KyteOutboxMessage)
+class KyteOutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event', 'status', 'attempts', 'available_at', 'sent_at']
+    list_filter = ['status', 'event']
+    readonly_fields = ['event', 'payload', 'attempts', 'last_error', 'created_at', 'sent_at']
+
+
+@admin.register(KyteWebhookDelivery)
+class KyteWebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'idempotency_key', 'event_type', 'status_code', 'created_at']
+    list_filter = ['event_type']
+    search_fields = ['idempotency_key']
+    readonly_fields = ['idempotency_key', 'event_type', 'response', 'status_code', 'created_at']
+
+
+@admin.register(RestaurantOrderStats)
+class RestaurantOrderStatsAdmin(admin.ModelAdmin):
+    list_display = ['restaurant', 'status_created', 'status_ready', 'status_cancelled', 'revenue_date', 'revenue', 'updated_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OrderEventArchive)
+class OrderEventArchiveAdmin(admin.ModelAdmin):
+    list_display = ['order', 'period', 'event_count', 'archived_at']
+    list_filter = ['period']
+    search_fields = ['order__id']
+    fields = ['order', 'period', 'event_count', 'archived_at', 'events']
+    readonly_fields = fields
+
+    @admin.display(description='Events')
+    def events(self, obj):
+        return events_table(archive.unpack(obj.order_id, obj.data))
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(HourlyRollup)
+class HourlyRollupAdmin(admin.ModelAdmin):
+    list_display = ['restaurant', 'hour', 'order_count', 'cancelled_count', 'revenue', 'prepared_count', 'updated_at']
+    list_filter = ['restaurant']
+    date_hierarchy = 'hour'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
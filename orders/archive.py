@@ -0,0 +1,153 @@
+"""Archival of the ``order_events`` audit trail.
+
+Events of orders that closed (delivered or cancelled) more than a retention
+period ago are moved into ``OrderEventArchive``: one row per order holding
+its events as zlib-compressed JSON, tagged with the month the order closed.
+The hot table and its three indexes then only hold recent history.
+
+Rows stay per order because archived events are read one order at a time
+(the timeline, the admin, prep times in the rollups); a per-month blob would
+compress further but make each of those reads inflate the whole month.
+Instead every row is compressed against ``ZDICT``, a preset dictionary of
+the keys and values all orders share, which roughly halves the row size.
+Whole months are still dropped as a unit through ``prune``.
+
+Archived events are read back on demand as unsaved ``OrderEvent`` instances,
+so the existing serializers and admin render them unchanged.
+``manage.py archive_order_events`` drives the move.
+"""
+from __future__ import annotations
+
+import json
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, QuerySet
+from django.utils.dateparse import parse_datetime
+
+from .models import Order, OrderEvent, OrderEventArchive
+
+
+CLOSED_STATUSES = [Order.OrderStatus.DELIVERED, Order.OrderStatus.CANCELLED]
+EVENT_FIELDS = ('id', 'event_type', 'event_data', 'created_at')
+
+_AT = '2026-01-01T00:00:00.000000+00:00'
+_CREATED = '2026-01-01T00:00:00.000Z'
+# One event of each type as ``pack`` serializes it, rarest first: zlib codes
+# matches near the end of the dictionary most cheaply. Rows are only readable
+# with the exact bytes they were packed with, so never edit this list.
+_DICTIONARY_EVENTS = [
+    {'id': 0, 'event_type': 'order_cancelled', 'event_data': {'order_id': 0, 'reason': 'Customer cancelled'}, 'created_at': _CREATED},
+    {'id': 0, 'event_type': 'preparation_rejected', 'event_data': {'reason': 'Kitchen closed', 'rejected_at': _AT}, 'created_at': _CREATED},
+    {'id': 0, 'event_type': 'preparation_cancelled', 'event_data': {'reason': 'Out of stock', 'cancelled_at': _AT}, 'created_at': _CREATED},
+    {'id': 0, 'event_type': 'preparation_delayed', 'event_data': {'delay_minutes': 10, 'reason': '', 'delayed_at': _AT}, 'created_at': _CREATED},
+    {'id': 0, 'event_type': 'order_created', 'event_data': {
+        'restaurant_id': 1, 'customer_id': 1, 'placed_at': _AT, 'total_amount': '10.00',
+        'items': [{'menu_item': 'Pizza', 'quantity': 1, 'unit_price': '10.00'}],
+    }, 'created_at': _CREATED},
+    {'id': 0, 'event_type': 'preparation_accepted', 'event_data': {'accepted_at': _AT}, 'created_at': _CREATED},
+    {'id': 0, 'event_type': 'preparation_done', 'event_data': {'completed_at': _AT}, 'created_at': _CREATED},
+    {'id': 0, 'event_type': 'order_delivered', 'event_data': {'delivered_at': _AT}, 'created_at': _CREATED},
+]
+ZDICT = json.dumps(_DICTIONARY_EVENTS, cls=DjangoJSONEncoder).encode()
+
+
+def pack(events: Iterable[dict]) -> bytes:
+    compressor = zlib.compressobj(9, zdict=ZDICT)
+    return compressor.compress(json.dumps(list(events), cls=DjangoJSONEncoder).encode()) + compressor.flush()
+
+
+def _decompress(data: bytes) -> list:
+    # Also inflates rows packed before ZDICT existed: those streams don't ask
+    # for a dictionary, so the preset one goes unused.
+    decompressor = zlib.decompressobj(zdict=ZDICT)
+    return json.loads(decompressor.decompress(bytes(data)) + decompressor.flush())
+
+
+def unpack(order_id: int, data: bytes) -> List[OrderEvent]:
+    events = []
+    for event in _decompress(data):
+        events.append(OrderEvent(
+            id=event['id'],
+            order_id=order_id,
+            event_type=event['event_type'],
+            event_data=event['event_data'],
+            created_at=parse_datetime(event['created_at']),
+        ))
+    return events
+
+
+def candidates(cutoff: datetime) -> QuerySet:
+    """Closed orders last changed before ``cutoff`` that still have live events."""
+    return Order.objects.filter(status__in=CLOSED_STATUSES, updated_at__lt=cutoff).filter(
+        Exists(OrderEvent.objects.filter(order_id=OuterRef('pk')))
+    )
+
+
+@transaction.atomic
+def archive_orders(order_ids: List[int]) -> int:
+    """Move the live events of ``order_ids`` into the archive; returns how many moved.
+
+    Events written after an order was archived are merged into its row.
+    """
+    periods = dict(
+        Order.objects.filter(id__in=order_ids).values_list('id', 'updated_at')
+    )
+    live: Dict[int, List[dict]] = defaultdict(list)
+    for event in OrderEvent.objects.filter(order_id__in=order_ids).order_by('id').values('order_id', *EVENT_FIELDS):
+        live[event.pop('order_id')].append(event)
+    if not live:
+        return 0
+
+    existing = OrderEventArchive.objects.in_bulk(list(live))
+    rows = []
+    for order_id, events in live.items():
+        if order_id in existing:
+            events = _decompress(existing[order_id].data) + events
+        rows.append(OrderEventArchive(
+            order_id=order_id,
+            period=periods[order_id].strftime('%Y-%m'),
+            event_count=len(events),
+            data=pack(events),
+        ))
+    OrderEventArchive.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['order'],
+        update_fields=['period', 'event_count', 'data', 'archived_at'],
+    )
+
+    moved = max(event['id'] for events in live.values() for event in events)
+    deleted, _ = OrderEvent.objects.filter(order_id__in=list(live), id__lte=moved).delete()
+    return deleted
+
+
+def archived_events(order_id: int) -> List[OrderEvent]:
+    data = OrderEventArchive.objects.filter(order_id=order_id).values_list('data', flat=True).first()
+    return unpack(order_id, data) if data is not None else []
+
+
+def history(order_id: int) -> List[OrderEvent]:
+    """Live and archived events of an order, newest first like ``OrderEvent``."""
+    events = list(OrderEvent.objects.filter(order_id=order_id)) + archived_events(order_id)
+    return sorted(events, key=lambda event: (event.created_at, event.id), reverse=True)
+
+
+def prune(before_period: str) -> int:
+    """Drop archived months earlier than ``before_period`` (``YYYY-MM``); returns rows deleted."""
+    deleted, _ = OrderEventArchive.objects.filter(period__lt=before_period).delete()
+    return deleted
+
+
+def compact() -> None:
+    """Refresh planner statistics and return the freed pages to the filesystem.
+
+    VACUUM rewrites the whole database file and cannot run in a transaction.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+        cursor.execute('VACUUM')
@@ -0,0 +1,193 @@
+"""Native async views for the Kyte webhook and the order read endpoints.
+
+``backend.asgi`` enables these (``ASYNC_VIEWS``) ahead of the DRF routes for
+the same URLs, so under an ASGI server the hot paths run on the event loop
+instead of a worker thread per request. They answer exactly like the DRF
+views: the same serializers, cursor pagination, ETags and JSON rendering.
+
+Queries use the async ORM (``afirst``, ``aget``, ``async for``). Django still
+runs each query in a thread since SQLite has no async driver, but a request
+only holds that thread while a query runs, not for parsing, middleware,
+serialization or while the client is slow. The webhook's write transaction
+(``run_webhook``) runs in one ``sync_to_async`` call because ``atomic`` is
+sync-only; the idempotency replay lookup before it is async.
+
+Anything else (other methods on the same URLs, the browsable API, form
+bodies) is handed to the DRF view.
+"""
+from __future__ import annotations
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.urls import re_path
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from . import counters, etags
+from .models import Order
+from .pagination import OrderCursorPagination
+from .serializers import OrderListRowSerializer, OrderSerializer, RestaurantOrderStatsSerializer
+from .views import (
+    REPLAYED_HEADERS, KyteWebhookView, OrderViewSet, RestaurantViewSet, _parse_id,
+    delivered_query, filter_cancelled, filter_orders, parse_webhook, replay, run_webhook,
+)
+
+
+_renderer = JSONRenderer()
+
+
+def render(data, status_code=status.HTTP_200_OK, headers=None) -> HttpResponse:
+    """``data`` as DRF's JSON renderer writes it."""
+    response = HttpResponse(
+        _renderer.render(data), status=status_code, content_type='application/json', headers=headers
+    )
+    # Browsers asking for HTML get the DRF browsable API instead.
+    response['Vary'] = 'Accept'
+    return response
+
+
+def _wants_json(request) -> bool:
+    return 'format' not in request.GET and 'text/html' not in request.headers.get('Accept', '')
+
+
+def async_view(handler, fallback, method='GET'):
+    """Serve ``method`` JSON requests with ``handler``, everything else with the DRF view ``fallback``."""
+    fallback = sync_to_async(fallback)
+
+    async def view(request, *args, **kwargs):
+        if request.method == method and _wants_json(request):
+            try:
+                return await handler(request, *args, **kwargs)
+            except APIException as e:
+                # As DRF's exception handler renders it.
+                return render(e.detail if isinstance(e.detail, (list, dict)) else {'detail': e.detail}, e.status_code)
+        return await fallback(request, *args, **kwargs)
+
+    return csrf_exempt(view)
+
+
+async def _list(request, queryset):
+    """Async counterpart of ``OrderViewSet._list_response``."""
+    restaurant_id = request.GET.get('restaurant_id')
+    version = await etags.arestaurant_version(restaurant_id) if restaurant_id else None
+    etag = None
+    if version is not None:
+        etag = etags.make_etag(request, *version, renderer_format=_renderer.format)
+        not_modified = etags.not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+    paginator = OrderCursorPagination()
+    rows = [row async for row in paginator.page_queryset(queryset.list_rows(), Request(request))]
+    data = paginator.get_paginated_data(OrderListRowSerializer(paginator.set_page(rows), many=True).data)
+    response = render(data)
+    return etags.tag(response, etag) if etag else response
+
+
+def _filter(queryset, request):
+    """``filter_orders`` answering bad parameters with 400, as the DRF views do."""
+    try:
+        return filter_orders(queryset, request.GET)
+    except ValueError as e:
+        raise ParseError({'error': str(e)})
+
+
+async def order_list(request):
+    return await _list(request, _filter(Order.objects.all(), request))
+
+
+async def order_pending(request):
+    return await _list(request, _filter(Order.objects.all(), request).pending())
+
+
+async def order_active(request):
+    return await _list(request, _filter(Order.objects.all(), request).active())
+
+
+async def order_cancelled(request):
+    return await _list(request, filter_cancelled(_filter(Order.objects.all(), request), request.GET))
+
+
+async def order_detail(request, pk):
+    if 'fields' in request.GET or 'expand' in request.GET:
+        return await sync_to_async(_order_detail)(request, pk=pk)
+    version = await etags.aorder_version(int(pk))
+    etag = None
+    if version is not None:
+        etag = etags.make_etag(request, *version, renderer_format=_renderer.format)
+        not_modified = etags.not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+    queryset = _filter(OrderViewSet.queryset.all(), request)
+    try:
+        order = await queryset.aget(pk=pk)
+    except Order.DoesNotExist:
+        return render({'detail': 'No Order matches the given query.'}, status.HTTP_404_NOT_FOUND)
+    response = render(OrderSerializer(order, context={'request': request}).data)
+    return etags.tag(response, etag) if etag else response
+
+
+async def restaurant_summary(request, pk):
+    try:
+        stats = await counters.aget_stats(_parse_id(pk))
+    except ValueError:
+        stats = None
+    if stats is None:
+        return render({'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND)
+    return render(RestaurantOrderStatsSerializer(stats).data)
+
+
+async def kyte_webhook(request):
+    """Async counterpart of ``KyteWebhookView.post`` for JSON bodies."""
+    if request.content_type != 'application/json':
+        return await sync_to_async(webhook_view)(request)
+    try:
+        data = json.loads(request.body)
+    except ValueError as e:
+        return render({'detail': f'JSON parse error - {e}'}, status.HTTP_400_BAD_REQUEST)
+    try:
+        call = parse_webhook(data, request.headers.get('Idempotency-Key'), KyteWebhookView.max_batch_size)
+    except ValueError as e:
+        return render({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+    delivery = await delivered_query(call.key).afirst() if call.key else None
+    if delivery is not None:
+        body, status_code, replayed = replay(call, delivery)
+    else:
+        body, status_code, replayed = await sync_to_async(run_webhook)(call)
+    return render(body, status_code, REPLAYED_HEADERS if replayed else None)
+
+
+webhook_view = KyteWebhookView.as_view()
+_order_lists = OrderViewSet.as_view({'get': 'list', 'post': 'create'})
+_order_detail = OrderViewSet.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy',
+})
+
+
+def _order_action(name):
+    return OrderViewSet.as_view({'get': name}, detail=False)
+
+
+# Same paths and names as the router's, so reverse() and the metrics route
+# labels do not change. Detail pks are digits only, leaving the other
+# ``orders/<name>/`` actions to the router.
+urlpatterns = [
+    re_path(r'^orders/$', async_view(order_list, _order_lists), name='order-list'),
+    re_path(r'^orders/pending/$', async_view(order_pending, _order_action('pending')), name='order-pending'),
+    re_path(r'^orders/active/$', async_view(order_active, _order_action('active')), name='order-active'),
+    re_path(
+        r'^orders/cancelled/$', async_view(order_cancelled, _order_action('cancelled')), name='order-cancelled'
+    ),
+    re_path(r'^orders/(?P<pk>\d+)/$', async_view(order_detail, _order_detail), name='order-detail'),
+    re_path(
+        r'^restaurants/(?P<pk>\d+)/summary/$',
+        async_view(restaurant_summary, RestaurantViewSet.as_view({'get': 'summary'}, detail=True)),
+        name='restaurant-summary',
+    ),
+    re_path(r'^kyte/events/$', async_view(kyte_webhook, webhook_view, method='POST'), name='kyte-webhook'),
+]
@@ -0,0 +1,128 @@
+"""Small helpers shared by the benchmark management commands."""
+from __future__ import annotations
+
+import os
+import statistics
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Sequence
+
+from django.db import connection
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, warmup: int = 0) -> Dict[str, float]:
+    """Run ``fn`` ``repeat`` times (after ``warmup`` untimed runs) and report
+    median wall time, SQL query count and SQL time (both from the last run)."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        queries = QueryTimer()
+        with connection.execute_wrapper(queries):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    return {
+        'wall_ms': statistics.median(timings) * 1000,
+        'queries': queries.count,
+        'sql_ms': queries.seconds * 1000,
+    }
+
+
+class QueryTimer:
+    """``execute_wrapper`` counting queries and their time at full precision
+    (the debug query log rounds to milliseconds)."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of ``values`` (already sorted), 0 if empty."""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+def process_tree_memory(pid: int) -> int:
+    """Memory in bytes of process ``pid`` and its descendants (Linux ``/proc``).
+
+    Uses PSS, which splits pages shared between forked workers among them,
+    so a pre-fork server is not counted once per worker; falls back to RSS.
+    """
+    children = defaultdict(list)
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children[ppid].append(int(entry))
+
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        pending += children.get(current, [])
+        for path, field in ((f'/proc/{current}/smaps_rollup', 'Pss:'), (f'/proc/{current}/status', 'VmRSS:')):
+            try:
+                with open(path) as f:
+                    kb = next((int(line.split()[1]) for line in f if line.startswith(field)), None)
+            except OSError:
+                kb = None
+            if kb is not None:
+                total += kb * 1024
+                break
+    return total
+
+
+def compare(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]],
+            threshold_pct: float, noise_ms: float = 1.0) -> List[str]:
+    """Regressions of ``results`` against ``baseline`` (both ``{size: {name: measure()}}``).
+
+    More SQL queries than the baseline is always a regression; wall time is
+    one when it grows by more than ``threshold_pct`` percent and ``noise_ms``.
+    Entries missing from the baseline are skipped.
+    """
+    regressions = []
+    for size, entries in results.items():
+        for name, result in entries.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            if result['queries'] > base['queries']:
+                regressions.append(f"{name} @ {size}: {base['queries']} -> {result['queries']} queries")
+            limit = base['wall_ms'] * (1 + threshold_pct / 100)
+            if result['wall_ms'] > limit and result['wall_ms'] - base['wall_ms'] > noise_ms:
+                regressions.append(
+                    f"{name} @ {size}: {base['wall_ms']:.2f} -> {result['wall_ms']:.2f} ms "
+                    f"(+{(result['wall_ms'] / base['wall_ms'] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+@contextmanager
+def scratch_database(verbosity: int = 0):
+    """Point the default connection at a throwaway test database.
+
+    Benchmarks generate large datasets; running them against a scratch copy
+    keeps the configured database untouched.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
@@ -0,0 +1,184 @@
+"""Per-restaurant order counters behind the dashboard badges.
+
+Every code path that creates, transitions or deletes an order calls
+``record`` (or ``apply``) after saving it, inside the same transaction. The
+counters move by ``F()`` deltas, so concurrent writers never overwrite each
+other's counts, and the summary endpoint is a single primary-key read.
+
+A missing counters row is built from the orders table on first use. Writes
+that bypass these paths (admin edits, bulk generation, cascading deletes)
+are reconciled by ``manage.py rebuild_order_counters``.
+"""
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.utils import timezone
+
+from .models import Order, Restaurant, RestaurantOrderStats
+
+
+STATUS_COLUMNS = [RestaurantOrderStats.status_column(value) for value in Order.OrderStatus.values]
+COLUMNS = STATUS_COLUMNS + [
+    RestaurantOrderStats.prep_column(value) for value in [None, *Order.PreparationStatus.values]
+]
+
+CENT = Decimal('0.01')
+
+# (restaurant_id, status, preparation_status, placed_at, total_amount)
+State = Tuple[int, str, Optional[str], Optional[datetime], Optional[Decimal]]
+
+
+def state(order: Order) -> State:
+    """Snapshot of what the counters depend on; take it before changing ``order``."""
+    # Freshly created orders may still hold the raw payload values.
+    placed_at = Order._meta.get_field('placed_at').to_python(order.placed_at)
+    if placed_at is not None and timezone.is_naive(placed_at):
+        placed_at = timezone.make_aware(placed_at)
+    total = Order._meta.get_field('total_amount').to_python(order.total_amount)
+    return (order.restaurant_id, order.status, order.preparation_status, placed_at, total)
+
+
+def record(order: Order, before: Optional[State] = None) -> None:
+    """Count a saved change to ``order``; ``before`` is None for new orders."""
+    apply([(before, state(order))])
+
+
+def record_removed(before: State) -> None:
+    """Count a deleted order, given its ``state`` from before the delete."""
+    apply([(before, None)])
+
+
+def _revenue(snapshot: State, today) -> Decimal:
+    _, order_status, _, placed_at, total = snapshot
+    if order_status == Order.OrderStatus.CANCELLED or placed_at is None:
+        return Decimal('0')
+    if timezone.localdate(placed_at) != today:
+        return Decimal('0')
+    return total or Decimal('0')
+
+
+def apply(changes: Iterable[Tuple[Optional[State], Optional[State]]]) -> None:
+    """Apply ``(before, after)`` snapshot pairs with one UPDATE per restaurant."""
+    today = timezone.localdate()
+    deltas: Dict[int, Counter] = defaultdict(Counter)
+    revenue: Dict[int, Decimal] = defaultdict(Decimal)
+    for before, after in changes:
+        for snapshot, sign in ((before, -1), (after, 1)):
+            if snapshot is None:
+                continue
+            restaurant_id, order_status, preparation_status = snapshot[:3]
+            deltas[restaurant_id][RestaurantOrderStats.status_column(order_status)] += sign
+            deltas[restaurant_id][RestaurantOrderStats.prep_column(preparation_status)] += sign
+            revenue[restaurant_id] += sign * _revenue(snapshot, today)
+
+    for restaurant_id, columns in deltas.items():
+        updates = {column: F(column) + delta for column, delta in columns.items() if delta and column in COLUMNS}
+        amount = revenue[restaurant_id]
+        if amount:
+            amount = Value(amount, output_field=models.DecimalField())
+            updates['revenue'] = Case(When(revenue_date=today, then=F('revenue') + amount), default=amount)
+            updates['revenue_date'] = today
+        if not updates:
+            continue
+        updates['updated_at'] = timezone.now()
+        if not RestaurantOrderStats.objects.filter(pk=restaurant_id).update(**updates):
+            # No row yet: the orders table already includes this change.
+            rebuild([restaurant_id])
+
+
+def compute(restaurant_ids: Optional[List[int]] = None) -> Dict[int, RestaurantOrderStats]:
+    """Counters recomputed from the orders table, as unsaved rows."""
+    today = timezone.localdate()
+    day_start = timezone.make_aware(datetime.combine(today, time.min))
+    day_end = timezone.make_aware(datetime.combine(today + timedelta(days=1), time.min))
+
+    restaurants = Restaurant.objects.all()
+    orders = Order.objects.order_by()
+    if restaurant_ids is not None:
+        restaurants = restaurants.filter(id__in=restaurant_ids)
+        orders = orders.filter(restaurant_id__in=restaurant_ids)
+    stats = {
+        restaurant_id: RestaurantOrderStats(restaurant_id=restaurant_id, revenue_date=today)
+        for restaurant_id in restaurants.values_list('id', flat=True)
+    }
+
+    for field, column_for in (
+        ('status', RestaurantOrderStats.status_column),
+        ('preparation_status', RestaurantOrderStats.prep_column),
+    ):
+        for row in orders.values('restaurant_id', field).annotate(count=Count('id')):
+            column = column_for(row[field])
+            if column in COLUMNS and row['restaurant_id'] in stats:
+                setattr(stats[row['restaurant_id']], column, row['count'])
+
+    todays = (
+        orders.filter(placed_at__gte=day_start, placed_at__lt=day_end)
+        .exclude(status=Order.OrderStatus.CANCELLED)
+        .values('restaurant_id')
+        .annotate(total=Sum('total_amount'))
+    )
+    for row in todays:
+        if row['restaurant_id'] in stats:
+            # SQLite sums decimals as floats.
+            stats[row['restaurant_id']].revenue = Decimal(row['total'] or 0).quantize(CENT)
+    return stats
+
+
+def drift(stored: Optional[RestaurantOrderStats], actual: RestaurantOrderStats) -> Dict[str, tuple]:
+    """``{counter: (stored, actual)}`` for every counter that differs."""
+    if stored is None:
+        return {'row': ('missing', 'built')}
+    differences = {}
+    for column in COLUMNS:
+        if getattr(stored, column) != getattr(actual, column):
+            differences[column] = (getattr(stored, column), getattr(actual, column))
+    stored_revenue = stored.revenue_today()
+    if stored_revenue != actual.revenue_today():
+        differences['revenue'] = (stored_revenue, actual.revenue_today())
+    return differences
+
+
+@transaction.atomic
+def rebuild(restaurant_ids: Optional[List[int]] = None) -> Dict[int, Dict[str, tuple]]:
+    """Overwrite counters with values recomputed from the orders table.
+
+    Returns the drift that was corrected, keyed by restaurant id.
+    """
+    actual = compute(restaurant_ids)
+    stored = RestaurantOrderStats.objects.in_bulk(list(actual))
+    corrected = {}
+    for restaurant_id, stats in actual.items():
+        differences = drift(stored.get(restaurant_id), stats)
+        if differences:
+            corrected[restaurant_id] = differences
+    RestaurantOrderStats.objects.bulk_create(
+        actual.values(),
+        update_conflicts=True,
+        unique_fields=['restaurant'],
+        update_fields=[*COLUMNS, 'revenue_date', 'revenue', 'updated_at'],
+    )
+    return corrected
+
+
+def get_stats(restaurant_id: int) -> Optional[RestaurantOrderStats]:
+    """The counters row for ``restaurant_id``, built on first use; None if no such restaurant."""
+    stats = RestaurantOrderStats.objects.filter(pk=restaurant_id).first()
+    if stats is None and Restaurant.objects.filter(pk=restaurant_id).exists():
+        rebuild([restaurant_id])
+        stats = RestaurantOrderStats.objects.get(pk=restaurant_id)
+    return stats
+
+
+async def aget_stats(restaurant_id: int) -> Optional[RestaurantOrderStats]:
+    stats = await RestaurantOrderStats.objects.filter(pk=restaurant_id).afirst()
+    if stats is None:
+        # First use only: the rebuild writes in a transaction, which needs the sync ORM.
+        stats = await sync_to_async(get_stats)(restaurant_id)
+    return stats
@@ -0,0 +1,99 @@
+"""Conditional GET for order endpoints.
+
+Each endpoint derives a cheap version of what it would render, turns it
+into a strong ETag together with the request path, query string and output
+format, and answers a matching ``If-None-Match`` with 304 before the page
+query or any serialization runs.
+
+- Order detail: ``updated_at`` plus the id of the latest event. Everything
+  that changes the payload saves the order (item writes touch it too).
+- Restaurant lists: the restaurant's latest order ``updated_at`` and its
+  order count. Any change to the restaurant's orders (including one leaving
+  a filtered list, or a delete) changes the version.
+"""
+from __future__ import annotations
+
+import hashlib
+import operator
+from functools import reduce
+from typing import Optional
+
+from django.db.models import F, OuterRef, Subquery
+from django.http import HttpResponseNotModified
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from . import counters
+from .models import Order, OrderEvent, RestaurantOrderStats
+
+
+def make_etag(request, *version, renderer_format=None) -> str:
+    """Strong ETag for ``version`` as rendered for this exact request.
+
+    ``renderer_format`` defaults to the format DRF negotiated for the request.
+    """
+    if renderer_format is None:
+        renderer_format = getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+    parts = [request.get_full_path(), renderer_format, *version]
+    return quote_etag(hashlib.sha1('|'.join(map(str, parts)).encode()).hexdigest())
+
+
+def _order_version_query(pk):
+    latest_event = OrderEvent.objects.filter(order=OuterRef('pk')).order_by('-id').values('id')[:1]
+    return Order.objects.filter(pk=pk).values_list('updated_at', Subquery(latest_event))
+
+
+def order_version(pk) -> Optional[tuple]:
+    return _order_version_query(pk).first()
+
+
+async def aorder_version(pk) -> Optional[tuple]:
+    return await _order_version_query(pk).afirst()
+
+
+def _restaurant_version_query(restaurant_id):
+    latest = (
+        Order.objects.filter(restaurant_id=OuterRef('pk'))
+        .order_by('-updated_at')
+        .values('updated_at')[:1]
+    )
+    count = reduce(operator.add, (F(column) for column in counters.STATUS_COLUMNS))
+    return RestaurantOrderStats.objects.filter(pk=restaurant_id).values_list(Subquery(latest), count)
+
+
+def restaurant_version(restaurant_id) -> Optional[tuple]:
+    """``(latest updated_at, order count)`` in one query; None for an unknown restaurant.
+
+    The latest ``updated_at`` is a single seek into the
+    ``(restaurant, updated_at)`` index; the count comes from the counters row
+    (``orders.counters``), since counting the index range grows with the
+    restaurant's history.
+    """
+    version = _restaurant_version_query(restaurant_id).first()
+    if version is None and counters.get_stats(restaurant_id) is not None:
+        return restaurant_version(restaurant_id)
+    return version
+
+
+async def arestaurant_version(restaurant_id) -> Optional[tuple]:
+    version = await _restaurant_version_query(restaurant_id).afirst()
+    if version is None and await counters.aget_stats(restaurant_id) is not None:
+        return await arestaurant_version(restaurant_id)
+    return version
+
+
+def not_modified(request, etag: str) -> Optional[HttpResponseNotModified]:
+    """The 304 response if the client already has ``etag``, else None."""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def tag(response, etag: str):
+    """Attach ``etag`` to a 200 response; clients must revalidate before reuse."""
+    if response.status_code == 200:
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,114 @@
+"""Streaming order exports for finance, as NDJSON or CSV.
+
+Orders are read in keyset chunks ordered by ``(placed_at, id)``. Each chunk
+costs one query for its orders and one for all their items, so memory stays
+at one chunk whatever the size of the export.
+
+The chunks are separate short queries on purpose, instead of one cursor
+held open for the whole download. A SQLite read that stays open blocks
+writers in rollback-journal mode, and in WAL mode it stops checkpoints, for
+as long as the slowest client takes to download.
+
+NDJSON has one order per line with its items nested. CSV has one row per
+item, with the order columns repeated; an order without items gets a single
+row with empty item columns.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterator, List
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import CharField, F, Q, QuerySet, Value
+from django.db.models.functions import Concat
+
+from .models import OrderItem
+
+
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+CHUNK_SIZE = 2000
+ORDER_FIELDS = (
+    'id', 'restaurant_id', 'restaurant_name', 'customer_id', 'customer_name', 'status',
+    'preparation_status', 'rejection_reason', 'delay_minutes', 'total_amount', 'cancel_stage',
+    'cancel_source', 'placed_at', 'accepted_at', 'delivered_at', 'cancelled_at', 'updated_at',
+)
+ITEM_FIELDS = ('menu_item', 'quantity', 'unit_price')
+CSV_HEADER = ORDER_FIELDS + tuple(f'item_{field}' for field in ITEM_FIELDS)
+
+_encoder = DjangoJSONEncoder()
+
+
+def chunks(queryset: QuerySet, chunk_size: int = CHUNK_SIZE) -> Iterator[List[dict]]:
+    """Orders of ``queryset`` as dicts with their ``items``, ``chunk_size`` at a time."""
+    rows = (
+        queryset.order_by('placed_at', 'id')
+        .annotate(
+            restaurant_name=F('restaurant__name'),
+            customer_name=Concat(
+                F('customer__first_name'), Value(' '), F('customer__second_name'), output_field=CharField()
+            ),
+        )
+        .values(*ORDER_FIELDS)
+    )
+    chunk = list(rows[:chunk_size])
+    while chunk:
+        items: Dict[int, List[dict]] = {order['id']: [] for order in chunk}
+        batch = OrderItem.objects.filter(order_id__in=list(items)).order_by('order_id', 'id')
+        for item in batch.values('order_id', *ITEM_FIELDS):
+            items[item.pop('order_id')].append(item)
+        for order in chunk:
+            order['items'] = items[order['id']]
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
+        # placed_at >= last first, so the keyset stays an index range.
+        chunk = list(rows.filter(
+            Q(placed_at__gt=last['placed_at']) | Q(placed_at=last['placed_at'], id__gt=last['id']),
+            placed_at__gte=last['placed_at'],
+        )[:chunk_size])
+
+
+def _text(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return _encoder.default(value)
+    return str(value)
+
+
+def render_ndjson(chunk: List[dict]) -> str:
+    return ''.join(json.dumps(order, cls=DjangoJSONEncoder) + '\n' for order in chunk)
+
+
+def render_csv(chunk: List[dict]) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for order in chunk:
+        columns = [_text(order[field]) for field in ORDER_FIELDS]
+        for item in order['items'] or [dict.fromkeys(ITEM_FIELDS)]:
+            writer.writerow(columns + [_text(item[field]) for field in ITEM_FIELDS])
+    return out.getvalue()
+
+
+def stream(queryset: QuerySet, export_format: str = 'ndjson', chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """The export as text, one part per chunk."""
+    if export_format == 'csv':
+        out = io.StringIO()
+        csv.writer(out).writerow(CSV_HEADER)
+        yield out.getvalue()
+    render = render_csv if export_format == 'csv' else render_ndjson
+    for chunk in chunks(queryset, chunk_size):
+        yield render(chunk)
+
+
+async def astream(queryset: QuerySet, export_format: str = 'ndjson', chunk_size: int = CHUNK_SIZE) -> AsyncIterator[str]:
+    """``stream`` for ASGI responses: each chunk is read in a thread and sent from the event loop."""
+    parts = stream(queryset, export_format, chunk_size)
+    next_part = sync_to_async(next)
+    while (part := await next_part(parts, None)) is not None:
+        yield part
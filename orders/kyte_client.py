@@ -1,23 +1,43 @@
 from __future__ import annotations
 
+import http.client
+import json
 import logging
-from typing import Any, Dict, Optional
+import threading
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from django.conf import settings
 
 
 logger = logging.getLogger(__name__)
 
+MOCK_BASE_URL = "https://mock.kyte"
+
+
+class KyteError(Exception):
+    """Raised when Kyte cannot be reached or rejects a request."""
+
 
 class KyteClient:
-    """Mock Kyte service client.
+    """Kyte service client.
 
-    In a real integration, this would perform signed HTTP requests to the Kyte
-    backend. For this case exercise, we simply log the outbound event and
-    return a mocked response structure so the rest of the app can proceed.
+    Without a configured base URL the client stays in mock mode: outbound
+    events are only logged and a mocked response structure is returned so the
+    rest of the app can proceed. With a base URL, ``send_events`` POSTs
+    batches over a kept-alive connection (one per thread) that is reused
+    between calls.
     """
 
-    def __init__(self, base_url: str | None = None, api_key: str | None = None) -> None:
-        self.base_url = base_url or "https://mock.kyte"
+    def __init__(self, base_url: str | None = None, api_key: str | None = None, timeout: float = 5.0) -> None:
+        self.base_url = (base_url or MOCK_BASE_URL).rstrip("/")
         self.api_key = api_key or "mock-key"
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def is_mock(self) -> bool:
+        return self.base_url == MOCK_BASE_URL
 
     def _log(self, event: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         logger.info("KYTE OUTBOUND → %s | payload=%s", event, payload)
@@ -43,8 +63,72 @@ class KyteClient:
     def notify_preparation_done(self, order_id: int) -> Dict[str, Any]:
         return self._log("preparation_done", {"order_id": order_id})
 
-
-# Singleton-style helper so viewsets can reuse a shared client
-kyte_client = KyteClient()
+    # Batched delivery used by the outbox dispatcher
+    def send_events(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Deliver ``[{"id", "event", "payload"}, ...]`` in one request.
+
+        ``id`` is the outbox message id, which Kyte can use to drop redelivered
+        notifications. Raises ``KyteError`` on transport errors and non-2xx
+        responses.
+        """
+        if self.is_mock:
+            for event in events:
+                self._log(event["event"], event["payload"])
+            return {"ok": True, "count": len(events)}
+        return self._request("POST", "/events/batch", {"events": events})
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            url = urlsplit(self.base_url)
+            conn_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+            conn = conn_class(url.hostname, url.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, method: str, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        data = json.dumps(body).encode("utf-8")
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+        }
+        url = urlsplit(self.base_url).path + path
+        return self._send(method, url, data, headers)
+
+    def _send(self, method: str, url: str, data: bytes, headers: Dict[str, str]) -> Dict[str, Any]:
+        # A kept-alive connection may have been closed by the server since the
+        # last call; retry once on a fresh connection before giving up.
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, url, body=data, headers=headers)
+                response = conn.getresponse()
+                raw = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                if attempt:
+                    raise KyteError(f"Kyte request failed: {e}") from e
+                continue
+            if response.will_close:
+                self.close()
+            if not 200 <= response.status < 300:
+                raise KyteError(f"Kyte responded {response.status}: {raw[:200]!r}")
+            try:
+                return json.loads(raw) if raw else {}
+            except ValueError:
+                return {}
+        raise KyteError("Kyte request failed")
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
 
 
+# Singleton-style helper so viewsets can reuse a shared client
+kyte_client = KyteClient(
+    base_url=getattr(settings, "KYTE_BASE_URL", None),
+    api_key=getattr(settings, "KYTE_API_KEY", None),
+    timeout=getattr(settings, "KYTE_TIMEOUT", 5.0),
+)
@@ -0,0 +1,81 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from orders import archive
+
+
+class Command(BaseCommand):
+    help = 'Moves the events of orders closed more than --days ago into the compressed event archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='Archive orders delivered or cancelled more than this many days ago (default: 90)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Orders moved per transaction (default: 1000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the orders that would be archived'
+        )
+        parser.add_argument(
+            '--prune-before',
+            metavar='YYYY-MM',
+            help='Also delete archived orders that closed before this month'
+        )
+        parser.add_argument(
+            '--no-vacuum',
+            action='store_true',
+            help='Skip ANALYZE/VACUUM after archiving'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] <= 0:
+            raise CommandError('--days must not be negative and --batch-size must be positive')
+        prune_before = options['prune_before']
+        if prune_before is not None and not re.fullmatch(r'\d{4}-(0[1-9]|1[0-2])', prune_before):
+            raise CommandError('--prune-before must be a month like 2025-01')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        candidates = archive.candidates(cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'{candidates.count()} order(s) closed before {cutoff:%Y-%m-%d} have events to archive')
+            return
+
+        orders = events = 0
+        last_id = 0
+        while True:
+            # Keyset batches: each transaction stays short and the scan resumes
+            # where the previous batch ended.
+            batch = list(
+                candidates.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            events += archive.archive_orders(batch)
+            orders += len(batch)
+            last_id = batch[-1]
+            self.stdout.write(f'  {orders} orders, {events} events archived')
+
+        pruned = 0
+        if prune_before is not None:
+            pruned = archive.prune(prune_before)
+            self.stdout.write(f'  {pruned} archived orders closed before {prune_before} deleted')
+
+        if (events or pruned) and not options['no_vacuum']:
+            self.stdout.write('Running ANALYZE and VACUUM...')
+            archive.compact()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Archived {events} events of {orders} orders closed before {cutoff:%Y-%m-%d}')
+        )
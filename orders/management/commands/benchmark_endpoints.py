@@ -0,0 +1,185 @@
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils import timezone
+
+from orders import counters
+from orders.benchmarking import compare, measure, scratch_database
+from orders.models import Customer, Restaurant, Order, OrderItem
+
+
+# Order states the transition benchmarks start from.
+STATES = {
+    'pending': (Order.OrderStatus.CREATED, Order.PreparationStatus.PENDING),
+    'accepted': (Order.OrderStatus.CREATED, Order.PreparationStatus.ACCEPTED),
+    'ready': (Order.OrderStatus.READY, Order.PreparationStatus.DONE),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Times every order endpoint (wall time, SQL queries, SQL time) at several dataset sizes '
+        'and optionally compares against a baseline file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000],
+            help='Orders in the generated dataset, one run per size (default: 1000 10000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Timed calls per endpoint (the median wall time is reported)'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Fail if results regress against this file (written by --save-baseline)'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=25.0,
+            help='Allowed wall time growth over the baseline in percent (default: 25); '
+                 'any increase in query count fails'
+        )
+        parser.add_argument(
+            '--save-baseline',
+            help='Write the results to this file'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] <= 0 or any(size <= 0 for size in options['sizes']):
+            raise CommandError('--repeat and --sizes must be positive')
+        results = {}
+        for size in options['sizes']:
+            with scratch_database():
+                dataset = self._build_dataset(size, options['repeat'] + 1)
+                results[str(size)] = self._run(*dataset, options['repeat'])
+            self._report(size, results[str(size)])
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(f'Baseline written to {options["save_baseline"]}')
+
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read baseline {options["baseline"]}: {e}')
+            regressions = compare(results, baseline, options['threshold'])
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(f'  {regression}'))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS(f'✅ No regressions against {options["baseline"]}'))
+
+    def _build_dataset(self, size, per_state):
+        """Seed data plus ``size`` generated orders, and ``per_state`` fresh
+        orders in each state the transition benchmarks start from."""
+        call_command('seed_data', stdout=io.StringIO())
+        call_command(
+            'generate_orders', bulk=True, count=size, seed=42, days=7, with_events=True, stdout=io.StringIO()
+        )
+        restaurant = Restaurant.objects.order_by('id').first()
+        customer = Customer.objects.order_by('id').first()
+        # A generated order, with its lifecycle events, for the detail view.
+        detail_id = Order.objects.filter(restaurant=restaurant).values_list('id', flat=True).first()
+        now = timezone.now()
+
+        pools = {}
+        for state, (order_status, prep_status) in STATES.items():
+            # Several benchmarks consume accepted orders.
+            count = per_state * (4 if state == 'accepted' else 2)
+            orders = Order.objects.bulk_create([
+                Order(
+                    restaurant=restaurant,
+                    customer=customer,
+                    status=order_status,
+                    preparation_status=prep_status,
+                    total_amount=Decimal('30.00'),
+                    placed_at=now - timedelta(seconds=i),
+                )
+                for i in range(count)
+            ])
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, menu_item='Margherita Pizza', quantity=2, unit_price=Decimal('15.00'))
+                for order in orders
+            ])
+            pools[state] = [order.id for order in orders]
+        counters.rebuild([restaurant.id])
+        return restaurant, detail_id, pools
+
+    def _cases(self, restaurant, detail_id, pools):
+        client = Client(HTTP_HOST='localhost')
+        customer_id = Customer.objects.order_by('id').values_list('id', flat=True).first()
+        lists = f'?restaurant_id={restaurant.id}'
+
+        def take(state):
+            return pools[state].pop()
+
+        def created_event():
+            return {'type': 'order_created', 'data': {
+                'restaurant_id': restaurant.id,
+                'customer_id': customer_id,
+                'placed_at': timezone.now().isoformat(),
+                'total_amount': '30.00',
+                'items': [{'menu_item': 'Margherita Pizza', 'quantity': 2, 'unit_price': '15.00'}],
+            }}
+
+        def post(path, data=None):
+            return client.post(path, data or {}, content_type='application/json')
+
+        return [
+            ('list', lambda: client.get(f'/api/orders/{lists}')),
+            ('detail', lambda: client.get(f'/api/orders/{detail_id}/')),
+            ('pending', lambda: client.get(f'/api/orders/pending/{lists}')),
+            ('active', lambda: client.get(f'/api/orders/active/{lists}')),
+            ('cancelled', lambda: client.get(f'/api/orders/cancelled/{lists}')),
+            ('summary', lambda: client.get(f'/api/restaurants/{restaurant.id}/summary/')),
+            ('accept_preparation', lambda: post(f'/api/orders/{take("pending")}/accept_preparation/')),
+            ('reject_preparation', lambda: post(
+                f'/api/orders/{take("pending")}/reject_preparation/', {'reason': 'Closed'}
+            )),
+            ('mark_delayed', lambda: post(
+                f'/api/orders/{take("accepted")}/mark_delayed/', {'delay_minutes': 10, 'reason': 'Busy'}
+            )),
+            ('mark_cancelled', lambda: post(
+                f'/api/orders/{take("accepted")}/mark_cancelled/', {'reason': 'Out of stock'}
+            )),
+            ('mark_done', lambda: post(f'/api/orders/{take("accepted")}/mark_done/')),
+            ('mark_delivered', lambda: post(f'/api/orders/{take("ready")}/mark_delivered/')),
+            ('webhook order_created', lambda: post('/api/kyte/events/', created_event())),
+            ('webhook order_cancelled', lambda: post('/api/kyte/events/', {
+                'type': 'order_cancelled', 'data': {'order_id': take('accepted'), 'reason': 'Customer'},
+            })),
+        ]
+
+    def _run(self, restaurant, detail_id, pools, repeat):
+        results = {}
+        for name, request in self._cases(restaurant, detail_id, pools):
+            def call():
+                response = request()
+                if response.status_code >= 400:
+                    raise CommandError(f'{name} answered {response.status_code}: {response.content[:200]!r}')
+            results[name] = measure(call, repeat=repeat, warmup=1)
+        return results
+
+    def _report(self, size, results):
+        self.stdout.write(f'\n{size} orders')
+        self.stdout.write(f'{"endpoint":<26}{"queries":>10}{"wall ms":>12}{"sql ms":>12}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<26}{result["queries"]:>10}{result["wall_ms"]:>12.2f}{result["sql_ms"]:>12.2f}'
+            )
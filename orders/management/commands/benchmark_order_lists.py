@@ -0,0 +1,100 @@
+import io
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.benchmarking import measure, scratch_database
+from orders.models import Customer, Restaurant, Order, OrderItem, OrderEvent
+from orders.serializers import OrderListSerializer, OrderListRowSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compares query count and wall time of the legacy and annotated order list paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--orders',
+            type=int,
+            default=2000,
+            help='Number of open orders per list for the benchmark restaurant'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per measurement (the median wall time is reported)'
+        )
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            restaurant = self._build_dataset(options['orders'])
+            self._report(restaurant, options['repeat'])
+
+    def _build_dataset(self, count):
+        call_command('seed_data', stdout=io.StringIO())
+        restaurant = Restaurant.objects.order_by('id').first()
+        customers = list(Customer.objects.values_list('id', flat=True))
+        now = timezone.now()
+        rng = random.Random(0)
+
+        orders = []
+        for i in range(count * 3):
+            state = i % 3
+            orders.append(Order(
+                restaurant=restaurant,
+                customer_id=rng.choice(customers),
+                status=Order.OrderStatus.CANCELLED if state == 2 else Order.OrderStatus.CREATED,
+                preparation_status=[
+                    Order.PreparationStatus.PENDING,
+                    Order.PreparationStatus.ACCEPTED,
+                    Order.PreparationStatus.CANCELLED,
+                ][state],
+                cancel_stage=Order.CancelStage.PREPARATION if state == 2 else None,
+                cancel_source=Order.CancelSource.STAFF if state == 2 else None,
+                total_amount=Decimal('30.00'),
+                placed_at=now - timedelta(seconds=i),
+            ))
+        Order.objects.bulk_create(orders, batch_size=500)
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, menu_item=f'Item {n}', quantity=1, unit_price=Decimal('10.00'))
+                for order in orders for n in range(3)
+            ],
+            batch_size=1000,
+        )
+        OrderEvent.objects.bulk_create(
+            [
+                OrderEvent(order=order, event_type=event_type, event_data={})
+                for order in orders for event_type in ('order_created', 'preparation_accepted')
+            ],
+            batch_size=1000,
+        )
+        return restaurant
+
+    def _report(self, restaurant, repeat):
+        legacy = (
+            Order.objects.filter(restaurant=restaurant)
+            .select_related('customer', 'restaurant')
+            .prefetch_related('items', 'events')
+        )
+        annotated = Order.objects.filter(restaurant=restaurant)
+
+        self.stdout.write(f'{"list":<12}{"path":<12}{"rows":>8}{"queries":>10}{"wall ms":>12}{"sql ms":>12}')
+        for name in ('pending', 'active', 'cancelled'):
+            before_qs = getattr(legacy, name)()
+            after_qs = getattr(annotated, name)()
+            rows = after_qs.count()
+            runs = (
+                ('legacy', lambda: OrderListSerializer(before_qs.all(), many=True).data),
+                ('annotated', lambda: OrderListRowSerializer(after_qs.list_rows(), many=True).data),
+            )
+            for label, fn in runs:
+                result = measure(fn, repeat=repeat)
+                self.stdout.write(
+                    f'{name:<12}{label:<12}{rows:>8}{result["queries"]:>10}'
+                    f'{result["wall_ms"]:>12.1f}{result["sql_ms"]:>12.1f}'
+                )
@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from orders import replay
+from orders.benchmarking import process_tree_memory
+
+
+# name -> (command line after the interpreter, extra environment). All run
+# under gunicorn's process manager; uvicorn's own --workers supervisor added
+# ~50 ms to every request in our runs.
+_GUNICORN = ['-m', 'gunicorn', '--bind', '127.0.0.1:{port}', '--workers', '{workers}', '--log-level', 'warning']
+_UVICORN_WORKER = ['backend.asgi:application', '--worker-class', 'uvicorn.workers.UvicornWorker']
+SERVERS = {
+    'wsgi sync': (_GUNICORN + ['backend.wsgi:application'], {'DJANGO_ASYNC_VIEWS': '0'}),
+    'asgi drf views': (_GUNICORN + _UVICORN_WORKER, {'DJANGO_ASYNC_VIEWS': '0'}),
+    'asgi async': (_GUNICORN + _UVICORN_WORKER, {'DJANGO_ASYNC_VIEWS': '1'}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Replays the same traffic against gunicorn sync workers and ASGI workers (with the DRF '
+        'views and with the native async views), optionally under several SQLite profiles, and '
+        'reports requests/s, latency and server memory per concurrent connection'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--traffic',
+            help='JSONL file to replay (see orders/replay.py); default is generated dashboard traffic'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Requests per run when generating traffic (default: 2000)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[1, 8, 32],
+            help='Concurrent clients, one run per value (default: 1 8 32)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Worker processes for each server (default: 2)'
+        )
+        parser.add_argument(
+            '--servers',
+            nargs='+',
+            choices=list(SERVERS),
+            default=list(SERVERS),
+            help='Servers to compare (default: all)'
+        )
+        parser.add_argument(
+            '--db-profiles',
+            nargs='+',
+            choices=['default', 'production'],
+            default=['default'],
+            help='DJANGO_DB_PROFILE values to run each server under (default: default); '
+                 'the journal mode of the database file is switched before each run'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed for generated traffic'
+        )
+        parser.add_argument(
+            '--output',
+            help='Also write the results as JSON to this path'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] <= 0 or options['requests'] <= 0 or any(c <= 0 for c in options['concurrency']):
+            raise CommandError('--workers, --requests and --concurrency must be positive')
+        if not os.path.isdir('/proc'):
+            raise CommandError('Memory is read from /proc; run this on Linux')
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+
+        results = {}
+        for profile in options['db_profiles']:
+            for name in options['servers']:
+                label = f'{name} [{profile}]'
+                results[label] = {}
+                for concurrency in options['concurrency']:
+                    # Fresh traffic per run: earlier runs accepted its pending orders.
+                    calls = self._calls(options)
+                    self.stdout.write(f'{label}: {len(calls)} requests with {concurrency} clients...')
+                    _set_journal_mode(profile)
+                    results[label][str(concurrency)] = self._run(
+                        name, profile, options['workers'], calls, concurrency
+                    )
+        self._report(results)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+    def _calls(self, options):
+        try:
+            if options['traffic']:
+                calls = replay.load(options['traffic'])
+            else:
+                calls = replay.generate(options['requests'], random.Random(options['seed']))
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(str(e))
+        if not calls:
+            raise CommandError('No requests to replay')
+        return calls
+
+    def _run(self, name, profile, workers, calls, concurrency):
+        """Start a fresh server, warm it up, replay ``calls`` and sample its memory meanwhile."""
+        port = _free_port()
+        args, env = SERVERS[name]
+        command = [sys.executable] + [arg.format(port=port, workers=workers) for arg in args]
+        server = subprocess.Popen(command, env={**os.environ, **env, 'DJANGO_DB_PROFILE': profile})
+        try:
+            url = f'http://127.0.0.1:{port}'
+            _wait_until_up(url, server)
+            # Every worker imports its views and opens its connection first.
+            replay.run(calls[:workers * 20], lambda: replay.HttpTransport(url), concurrency=workers)
+            idle = process_tree_memory(server.pid)
+
+            peak = idle
+            done = threading.Event()
+
+            def sample():
+                nonlocal peak
+                while not done.wait(0.05):
+                    peak = max(peak, process_tree_memory(server.pid))
+
+            sampler = threading.Thread(target=sample, daemon=True)
+            sampler.start()
+            report = replay.run(calls, lambda: replay.HttpTransport(url), concurrency=concurrency)
+            done.set()
+            sampler.join()
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+        return {
+            'throughput_rps': report['throughput_rps'],
+            'p50_ms': report['p50_ms'],
+            'p99_ms': report['p99_ms'],
+            'errors': report['errors'],
+            'client_errors': report['client_errors'],
+            'idle_mb': round(idle / 2 ** 20, 1),
+            'peak_mb': round(peak / 2 ** 20, 1),
+            'kb_per_connection': round((peak - idle) / 1024 / concurrency, 1),
+        }
+
+    def _report(self, results):
+        width = max(len(label) for label in results) + 2
+        self.stdout.write(
+            f"\n{'server':<{width}}{'clients':>8}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}"
+            f"{'idle MB':>9}{'peak MB':>9}{'KB/conn':>9}"
+        )
+        for label, runs in results.items():
+            for concurrency, row in runs.items():
+                self.stdout.write(
+                    f"{label:<{width}}{concurrency:>8}{row['throughput_rps']:>9.1f}{row['p50_ms']:>9.2f}"
+                    f"{row['p99_ms']:>9.2f}{row['errors']:>8}{row['idle_mb']:>9.1f}{row['peak_mb']:>9.1f}"
+                    f"{row['kb_per_connection']:>9.1f}"
+                )
+
+
+def _set_journal_mode(profile):
+    """WAL mode is stored in the database file; put it in the mode ``profile`` expects."""
+    mode = settings.SQLITE_PRODUCTION_PRAGMAS['journal_mode'] if profile == 'production' else 'DELETE'
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA journal_mode={mode}')
+    connection.close()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url, server, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise CommandError(f'Server exited with code {server.returncode}')
+        try:
+            with urllib.request.urlopen(f'{url}/api/metrics/', timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Server at {url} did not start within {timeout:.0f}s')
@@ -0,0 +1,83 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from orders import metrics, outbox
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the dispatcher's Kyte delivery metrics to Prometheus on any GET."""
+
+    def do_GET(self):
+        body = metrics.REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Delivers queued Kyte notifications from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain everything that is currently due and exit'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Messages sent per Kyte request'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to sleep when the outbox is empty'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=outbox.MAX_ATTEMPTS,
+            help='Deliveries to try before a message is marked failed'
+        )
+        parser.add_argument(
+            '--metrics-port',
+            type=int,
+            help='Serve Kyte delivery latency and counts for Prometheus on this port'
+        )
+
+    def handle(self, *args, **options):
+        if options['metrics_port'] is not None:
+            server = ThreadingHTTPServer(('0.0.0.0', options['metrics_port']), MetricsHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.stdout.write(f'Serving metrics on port {server.server_address[1]}')
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = outbox.dispatch_batch(
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts'],
+                )
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent}, failed {failed}')
+                    if sent:
+                        continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Outbox dispatcher stopped: {total_sent} sent, {total_failed} failed attempts')
+        )
@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders import export
+from orders.models import Order
+from orders.views import filter_orders, filter_placed
+
+
+class Command(BaseCommand):
+    help = 'Streams orders with their items as NDJSON or CSV, like GET /api/orders/export/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(export.FORMATS), default='ndjson', dest='export_format')
+        parser.add_argument('--output', help='File to write; default is standard output')
+        parser.add_argument('--restaurant-id', type=int)
+        parser.add_argument('--status', choices=Order.OrderStatus.values)
+        parser.add_argument('--preparation-status', choices=Order.PreparationStatus.values)
+        parser.add_argument('--from', dest='start', help='Orders placed at or after this ISO date or datetime')
+        parser.add_argument('--to', dest='end', help='Orders placed before this ISO date or datetime')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=export.CHUNK_SIZE,
+            help=f'Orders read per query (default: {export.CHUNK_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be positive')
+        params = {
+            'restaurant_id': options['restaurant_id'],
+            'status': options['status'],
+            'preparation_status': options['preparation_status'],
+            'from': options['start'],
+            'to': options['end'],
+        }
+        try:
+            queryset = filter_placed(filter_orders(Order.objects.all(), params), params)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        out = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        try:
+            for part in export.stream(queryset, options['export_format'], options['chunk_size']):
+                out.write(part)
+        finally:
+            if options['output']:
+                out.close()
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f'✅ Orders written to {options["output"]}'))
@@ -1,38 +1,237 @@
+import bisect
 import random
-from django.core.management.base import BaseCommand
-from django.utils import timezone
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import timedelta
-from orders.models import Customer, Restaurant, Order, OrderItem
+from decimal import Decimal
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.utils import timezone
+from orders import counters, rollups, sampling
+from orders.models import Customer, Restaurant, Order, OrderItem, OrderEvent
+
+
+MENU_ITEMS = {
+    1: [  # Pizza Paradise
+        ('Large Pepperoni Pizza', 15.99),
+        ('Medium Margherita Pizza', 12.99),
+        ('Garlic Bread', 6.99),
+        ('Caesar Salad', 7.99),
+        ('Buffalo Wings', 10.99),
+        ('Soft Drink', 2.50),
+    ],
+    2: [  # Burger Barn
+        ('Classic Cheeseburger', 12.99),
+        ('BBQ Bacon Burger', 15.99),
+        ('French Fries', 3.99),
+        ('Onion Rings', 4.99),
+        ('Milkshake', 5.99),
+    ],
+    3: [  # Sushi Station
+        ('Dragon Roll', 16.99),
+        ('California Roll', 12.99),
+        ('Salmon Sashimi', 18.99),
+        ('Tuna Roll', 13.99),
+        ('Miso Soup', 4.50),
+        ('Green Tea', 2.99),
+    ],
+}
+
+# Relative order volume per hour of day: lunch and dinner peaks, quiet nights.
+HOUR_WEIGHTS = [
+    1, 1, 1, 1, 1, 1, 2, 3, 4, 4, 5, 8,
+    10, 9, 6, 5, 5, 7, 10, 10, 8, 6, 4, 2,
+]
+
+# Distinct customers generated orders are spread over.
+CUSTOMER_POOL_SIZE = 5000
+
+
+
+def _insert_fields(model, leading):
+    """Column order for raw inserts: ``leading`` first, then the other non-pk fields."""
+    lead = [model._meta.get_field(name) for name in leading]
+    return lead + [field for field in model._meta.concrete_fields if not field.primary_key and field not in lead]
+
+
+def _insert_sql(model, fields):
+    quote = connection.ops.quote_name
+    return 'INSERT INTO %s (%s) VALUES (%s)' % (
+        quote(model._meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+
+
+def _db_values(fields, values, conn):
+    """Values as the database expects them, the conversion Django's inserts apply."""
+    return tuple(
+        field.get_db_prep_save(values[field.attname] if field.attname in values else field.get_default(), conn)
+        for field in fields
+    )
+
+
+# Rows are written with the order id (or the order FK) in the first column.
+ORDER_FIELDS = _insert_fields(Order, ['id'])
+ITEM_FIELDS = _insert_fields(OrderItem, ['order'])
+EVENT_FIELDS = _insert_fields(OrderEvent, ['order'])
+
+
+def _time_sampler(start, span):
+    """Map a uniform draw to a time in ``[start, start + span)`` following HOUR_WEIGHTS.
+
+    One draw per order (no rejection loop) keeps the rest of the RNG stream,
+    and so the generated items and lifecycles, the same from run to run.
+    """
+    end = start + span
+    segments, cumulative, total = [], [], 0.0
+    at = start
+    while at < end:
+        boundary = min(end, at.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1))
+        total += HOUR_WEIGHTS[timezone.localtime(at).hour] * (boundary - at).total_seconds()
+        segments.append((at, boundary - at))
+        cumulative.append(total)
+        at = boundary
+
+    def sample(u):
+        target = u * total
+        index = min(bisect.bisect_left(cumulative, target), len(segments) - 1)
+        before = cumulative[index - 1] if index else 0.0
+        segment_start, length = segments[index]
+        return segment_start + length * ((target - before) / (cumulative[index] - before))
+
+    return sample
+
+
+def _lifecycle(rng, order, placed_at, now):
+    """Walk ``order`` through a plausible history, stopping at ``now``.
+
+    Updates the order field dict in place and returns its events as
+    ``(event_type, created_at, event_data)``. Transitions that would happen
+    after ``now`` are not applied, so recent orders are still open.
+    """
+    events = []
+    clock = [placed_at]
+
+    def step(min_minutes, max_minutes, event_type, data, **changes):
+        at = clock[0] + timedelta(minutes=rng.uniform(min_minutes, max_minutes))
+        if at > now:
+            return False
+        clock[0] = at
+        order.update(changes, updated_at=at)
+        events.append((event_type, at, data(at.isoformat())))
+        return True
+
+    def cancel(min_minutes, max_minutes, event_type, data, source, **changes):
+        stage = Order.CancelStage.READY if order['status'] == Order.OrderStatus.READY else Order.CancelStage.PREPARATION
+        if step(min_minutes, max_minutes, event_type, data,
+                status=Order.OrderStatus.CANCELLED, cancel_stage=stage, cancel_source=source, **changes):
+            order['cancelled_at'] = clock[0]
+
+    outcome = rng.random()
+    if outcome < 0.05:
+        reason = rng.choice(['Kitchen closed', 'Out of stock', 'Too busy'])
+        cancel(1, 4, 'preparation_rejected', lambda at: {'reason': reason, 'rejected_at': at}, Order.CancelSource.STAFF,
+               preparation_status=Order.PreparationStatus.REJECTED, rejection_reason=reason)
+        return events
+    if not step(1, 5, 'preparation_accepted', lambda at: {'accepted_at': at},
+                preparation_status=Order.PreparationStatus.ACCEPTED):
+        return events
+    order['accepted_at'] = clock[0]
+    delay = 0
+    if rng.random() < 0.15:
+        delay = rng.choice([5, 10, 15, 20])
+        reason = rng.choice(['', 'Rush hour', 'Missing ingredient'])
+        if not step(3, 10, 'preparation_delayed',
+                    lambda at: {'delay_minutes': delay, 'reason': reason, 'delayed_at': at},
+                    preparation_status=Order.PreparationStatus.DELAYED, delay_minutes=delay):
+            return events
+    if outcome < 0.08:
+        reason = rng.choice(['Out of stock', 'Equipment failure'])
+        cancel(2, 15, 'preparation_cancelled', lambda at: {'reason': reason, 'cancelled_at': at}, Order.CancelSource.STAFF,
+               preparation_status=Order.PreparationStatus.CANCELLED, rejection_reason=reason)
+        return events
+    if outcome < 0.11:
+        cancel(2, 10, 'order_cancelled', lambda at: {'reason': 'Customer cancelled'},
+               Order.CancelSource.KYTE, preparation_status=Order.PreparationStatus.CANCELLED,
+               rejection_reason='Customer cancelled')
+        return events
+    if not step(10 + delay, 30 + delay, 'preparation_done', lambda at: {'completed_at': at},
+                preparation_status=Order.PreparationStatus.DONE, status=Order.OrderStatus.READY):
+        return events
+    if outcome < 0.13:
+        cancel(1, 10, 'order_cancelled', lambda at: {'reason': 'Courier unavailable'},
+               Order.CancelSource.KYTE, preparation_status=Order.PreparationStatus.CANCELLED,
+               rejection_reason='Courier unavailable')
+        return events
+    if step(5, 30, 'order_delivered', lambda at: {'delivered_at': at}, status=Order.OrderStatus.DELIVERED):
+        order['delivered_at'] = clock[0]
+    return events
+
+
+def generate_chunk(task):
+    """Build one chunk of insert-ready rows (runs in pool workers).
+
+    Each chunk has its own RNG derived from the run seed and the chunk index,
+    and its own slice of the time window, so output does not depend on the
+    number of workers. Values are already converted for the database, which
+    is most of the per-row cost, so the writer only executes inserts. Orders
+    come back sorted by ``placed_at`` so ids grow with time as they do in
+    production; items and events reference their order by position in the
+    chunk.
+    """
+    seed, index, size, start, span, now, menus, customer_ids, with_events = task
+    rng = random.Random(f'{seed}:{index}')
+    conn = connections[DEFAULT_DB_ALIAS]
+    sample = _time_sampler(start, span)
+    placed = sorted(sample(rng.random()) for _ in range(size))
+
+    orders, items, events = [], [], []
+    for position, placed_at in enumerate(placed):
+        restaurant_id, menu = rng.choice(menus)
+        total = Decimal('0')
+        for menu_item, price in rng.sample(menu, min(rng.randint(2, 4), len(menu))):
+            quantity = rng.randint(1, 3)
+            items.append((position, _db_values(ITEM_FIELDS[1:], {
+                'menu_item': menu_item, 'quantity': quantity, 'unit_price': price,
+                'created_at': placed_at, 'updated_at': placed_at,
+            }, conn)))
+            total += price * quantity
+        order = {
+            'restaurant_id': restaurant_id,
+            'customer_id': rng.choice(customer_ids),
+            'status': Order.OrderStatus.CREATED,
+            'preparation_status': Order.PreparationStatus.PENDING,
+            'total_amount': total,
+            'placed_at': placed_at,
+            'created_at': placed_at,
+            'updated_at': placed_at,
+        }
+        history = _lifecycle(rng, order, placed_at, now)
+        orders.append(_db_values(ORDER_FIELDS[1:], order, conn))
+        if with_events:
+            history.insert(0, ('order_created', placed_at, {
+                'restaurant_id': restaurant_id,
+                'customer_id': order['customer_id'],
+                'total_amount': str(total),
+                'placed_at': placed_at.isoformat(),
+            }))
+            events.extend(
+                (at, position, _db_values(EVENT_FIELDS[1:], {
+                    'event_type': event_type, 'event_data': data, 'created_at': at,
+                }, conn))
+                for event_type, at, data in history
+            )
+    events.sort(key=lambda event: event[0])
+    return orders, items, [event[1:] for event in events]
 
 
 class Command(BaseCommand):
     help = 'Generates random orders for testing'
 
-    MENU_ITEMS = {
-        1: [  # Pizza Paradise
-            ('Large Pepperoni Pizza', 15.99),
-            ('Medium Margherita Pizza', 12.99),
-            ('Garlic Bread', 6.99),
-            ('Caesar Salad', 7.99),
-            ('Buffalo Wings', 10.99),
-            ('Soft Drink', 2.50),
-        ],
-        2: [  # Burger Barn
-            ('Classic Cheeseburger', 12.99),
-            ('BBQ Bacon Burger', 15.99),
-            ('French Fries', 3.99),
-            ('Onion Rings', 4.99),
-            ('Milkshake', 5.99),
-        ],
-        3: [  # Sushi Station
-            ('Dragon Roll', 16.99),
-            ('California Roll', 12.99),
-            ('Salmon Sashimi', 18.99),
-            ('Tuna Roll', 13.99),
-            ('Miso Soup', 4.50),
-            ('Green Tea', 2.99),
-        ],
-    }
+    MENU_ITEMS = MENU_ITEMS
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -47,6 +246,40 @@ class Command(BaseCommand):
             default=None,
             help='Restrict generation to a specific restaurant id'
         )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Random seed; the same seed and options produce the same data'
+        )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='High-volume mode: chunked bulk inserts with full order lifecycles'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Orders per chunk (one transaction each) in bulk mode'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes generating chunks in bulk mode; inserts stay in this process'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Spread placed_at over this many days back from now in bulk mode'
+        )
+        parser.add_argument(
+            '--with-events',
+            action='store_true',
+            help='Also write the order_events each lifecycle step would have produced in bulk mode'
+        )
 
     def handle(self, *args, **options):
         count = options['count']
@@ -59,41 +292,50 @@ class Command(BaseCommand):
                 return
         else:
             restaurants = list(Restaurant.objects.all())
-        customers = list(Customer.objects.all())
-        
-        if not restaurants or not customers:
+        # Orders draw their customer from a random pool instead of loading
+        # the whole customers table.
+        customer_ids = sampling.sample_keys(
+            Customer.objects.all(), CUSTOMER_POOL_SIZE, rng=random.Random(options['seed'])
+        )
+
+        if not restaurants or not customer_ids:
             self.stdout.write(self.style.ERROR('No restaurants or customers found. Run seed_data first.'))
             return
-        
+
+        if options['bulk']:
+            self.generate_bulk(restaurants, customer_ids, options)
+            return
+
+        rng = random.Random(options['seed'])
         now = timezone.now()
         orders_created = 0
-        
+
         for _ in range(count):
-            restaurant = random.choice(restaurants)
-            customer = random.choice(customers)
-            
+            restaurant = rng.choice(restaurants)
+            customer_id = rng.choice(customer_ids)
+
             # Random time in the last 1-15 minutes
-            minutes_ago = random.randint(1, 15)
+            minutes_ago = rng.randint(1, 15)
             placed_at = now - timedelta(minutes=minutes_ago)
-            
+
             # Create order
             order = Order.objects.create(
                 restaurant=restaurant,
-                customer=customer,
+                customer_id=customer_id,
                 status=Order.OrderStatus.CREATED,
                 preparation_status=None,
                 placed_at=placed_at,
                 total_amount=0  # Will calculate after items
             )
-            
+
             # Add random items (2-4 items per order)
             menu_items = self.MENU_ITEMS.get(restaurant.id, self.MENU_ITEMS[1])
-            num_items = random.randint(2, 4)
-            selected_items = random.sample(menu_items, min(num_items, len(menu_items)))
-            
+            num_items = rng.randint(2, 4)
+            selected_items = rng.sample(menu_items, min(num_items, len(menu_items)))
+
             total = 0
             for item_name, price in selected_items:
-                quantity = random.randint(1, 3)
+                quantity = rng.randint(1, 3)
                 OrderItem.objects.create(
                     order=order,
                     menu_item=item_name,
@@ -101,14 +343,90 @@ class Command(BaseCommand):
                     unit_price=price
                 )
                 total += price * quantity
-            
+
             # Update total
             order.total_amount = round(total, 2)
             order.save()
-            
+            counters.record(order)
+
             orders_created += 1
-        
+
         self.stdout.write(
             self.style.SUCCESS(f'✅ Successfully generated {orders_created} random orders!')
         )
 
+    def generate_bulk(self, restaurants, customer_ids, options):
+        count, chunk_size, workers = options['count'], options['chunk_size'], options['workers']
+        if chunk_size <= 0 or workers <= 0 or options['days'] <= 0:
+            raise CommandError('--chunk-size, --workers and --days must be positive')
+        if connection.vendor != 'sqlite':
+            # insert_chunks relies on SQLite's single write lock for its ids.
+            raise CommandError('--bulk supports SQLite databases only')
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+
+        now = timezone.now()
+        start = now - timedelta(days=options['days'])
+        window = now - start
+        menus = [
+            (r.id, [(name, Decimal(str(price))) for name, price in self.MENU_ITEMS.get(r.id, self.MENU_ITEMS[1])])
+            for r in restaurants
+        ]
+        # Chunk i covers the share of the time window proportional to its size.
+        tasks = [
+            (
+                seed, index, min(chunk_size, count - offset),
+                start + window * (offset / count), window * (min(chunk_size, count - offset) / count),
+                now, menus, customer_ids, options['with_events'],
+            )
+            for index, offset in enumerate(range(0, count, chunk_size))
+        ]
+
+        self.stdout.write(f'Generating {count} orders in {len(tasks)} chunks (seed {seed})...')
+        began = time.monotonic()
+        totals = {'orders': 0, 'items': 0, 'events': 0}
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+                self.insert_chunks(pool.map(generate_chunk, tasks), totals, began)
+        else:
+            self.insert_chunks(map(generate_chunk, tasks), totals, began)
+
+        counters.rebuild([restaurant_id for restaurant_id, _ in menus])
+        if rollups.updated_through() is not None:
+            # The orders carry back-dated updated_at values, behind the rollup
+            # watermark, so an incremental refresh would never see them.
+            self.stdout.write('Rebuilding hourly rollups...')
+            rollups.refresh(full=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Generated {totals['orders']} orders, {totals['items']} items and "
+            f"{totals['events']} events in {time.monotonic() - began:.1f}s (seed {seed})"
+        ))
+
+    def insert_chunks(self, chunks, totals, began):
+        # Workers only generate; a single writer inserts, which is all SQLite
+        # allows anyway. pool.map yields chunks in order while later ones are
+        # still being generated.
+        #
+        # Order ids come from the database, one chunk at a time: the first
+        # order of a chunk is inserted without an id, which takes SQLite's
+        # write lock and returns the next free id. Other writers (webhook,
+        # simulator) wait for the lock until the chunk commits, so the ids
+        # after it are still free and items and events can reference them
+        # without reading anything back.
+        first_order_sql = _insert_sql(Order, ORDER_FIELDS[1:])
+        order_sql = _insert_sql(Order, ORDER_FIELDS)
+        item_sql = _insert_sql(OrderItem, ITEM_FIELDS)
+        event_sql = _insert_sql(OrderEvent, EVENT_FIELDS)
+        for orders, items, events in chunks:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(first_order_sql, orders[0])
+                first_id = cursor.lastrowid
+                cursor.executemany(order_sql, [(first_id + position, *row) for position, row in enumerate(orders)][1:])
+                cursor.executemany(item_sql, [(first_id + position, *row) for position, row in items])
+                if events:
+                    cursor.executemany(event_sql, [(first_id + position, *row) for position, row in events])
+            totals['orders'] += len(orders)
+            totals['items'] += len(items)
+            totals['events'] += len(events)
+            self.stdout.write(
+                f"  {totals['orders']} orders ({totals['orders'] / (time.monotonic() - began):.0f}/s)"
+            )
@@ -0,0 +1,62 @@
+import json
+import random
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class StubKyteHandler(BaseHTTPRequestHandler):
+    """Accepts Kyte batch notifications and prints what it received."""
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real client expects
+    fail_rate = 0.0
+    stdout = None
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if random.random() < self.fail_rate:
+            self._reply(503, {'ok': False, 'error': 'stub failure'})
+            return
+        events = body.get('events', [])
+        for event in events:
+            self.stdout.write(f"← {event.get('event')} #{event.get('id')} {event.get('payload')}")
+        self._reply(200, {'ok': True, 'count': len(events)})
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Runs a local stub of the Kyte API for testing the outbox dispatcher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+        parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+        parser.add_argument(
+            '--fail-rate',
+            type=float,
+            default=0.0,
+            help='Fraction of requests answered with 503, to exercise retries'
+        )
+
+    def handle(self, *args, **options):
+        handler = type('Handler', (StubKyteHandler,), {
+            'fail_rate': options['fail_rate'],
+            'stdout': self.stdout,
+        })
+        server = ThreadingHTTPServer((options['host'], options['port']), handler)
+        self.stdout.write(f"Kyte stub listening on http://{options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
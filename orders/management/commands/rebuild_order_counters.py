@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders import counters
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the per-restaurant order counters from the orders table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--restaurant-id',
+            type=int,
+            action='append',
+            dest='restaurant_ids',
+            help='Only this restaurant (repeatable); default is all restaurants'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report drift without writing; exits non-zero if any counter is off'
+        )
+
+    def handle(self, *args, **options):
+        restaurant_ids = options['restaurant_ids']
+        if options['check']:
+            actual = counters.compute(restaurant_ids)
+            stored = counters.RestaurantOrderStats.objects.in_bulk(list(actual))
+            drifted = {
+                restaurant_id: counters.drift(stored.get(restaurant_id), stats)
+                for restaurant_id, stats in actual.items()
+            }
+            drifted = {restaurant_id: d for restaurant_id, d in drifted.items() if d}
+        else:
+            drifted = counters.rebuild(restaurant_ids)
+
+        for restaurant_id, differences in sorted(drifted.items()):
+            details = ', '.join(
+                f'{name} {stored} -> {actual}' for name, (stored, actual) in differences.items()
+            )
+            self.stdout.write(f'Restaurant {restaurant_id}: {details}')
+
+        if options['check']:
+            if drifted:
+                raise CommandError(f'{len(drifted)} restaurant(s) have drifted counters')
+            self.stdout.write(self.style.SUCCESS('✅ Counters match the orders table'))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'✅ Counters rebuilt; {len(drifted)} restaurant(s) had drifted')
+            )
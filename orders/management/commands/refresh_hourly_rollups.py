@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from orders import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Brings the hourly order rollups up to date, recomputing only the hours of orders '
+        'changed since the last run'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every hour, e.g. after orders were deleted'
+        )
+
+    def handle(self, *args, **options):
+        hours, rows = rollups.refresh(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Recomputed {hours} hour(s), wrote {rows} rollup row(s); '
+            f'up to date through {rollups.updated_through():%Y-%m-%d %H:%M:%S}'
+        ))
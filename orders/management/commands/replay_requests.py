@@ -0,0 +1,118 @@
+import json
+import logging
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders import replay
+
+
+class Command(BaseCommand):
+    help = (
+        'Replays a JSONL file of API calls and Kyte webhook events and reports throughput '
+        'and p50/p95/p99 latency per endpoint (see orders/replay.py for the file format)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='JSONL file to replay (or to write with --generate)')
+        parser.add_argument(
+            '--url',
+            help='Send over HTTP to this server (e.g. http://127.0.0.1:8000); default is in-process '
+                 'through the WSGI handler against the configured database'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Concurrent clients (default: 4)'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            help='Target requests per second across all clients; default is as fast as possible'
+        )
+        parser.add_argument(
+            '--loops',
+            type=int,
+            default=1,
+            help='Replay the file this many times (default: 1)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Also write the report as JSON to this path'
+        )
+        parser.add_argument(
+            '--generate',
+            type=int,
+            metavar='COUNT',
+            help='Instead of replaying, write COUNT dashboard-like calls for the current data to FILE'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed for --generate'
+        )
+
+    def handle(self, *args, **options):
+        if options['generate'] is not None:
+            self._generate(options)
+            return
+        if options['concurrency'] <= 0 or options['loops'] <= 0 or (options['rate'] or 0) < 0:
+            raise CommandError('--concurrency and --loops must be positive, --rate must not be negative')
+
+        try:
+            calls = replay.load(options['file'])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Cannot read {options["file"]}: {e}')
+        if not calls:
+            raise CommandError(f'{options["file"]} has no requests')
+
+        url = options['url']
+        target = url or 'in-process WSGI'
+        if not url:
+            # Failed requests are counted in the report; their tracebacks
+            # would drown it.
+            logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        self.stdout.write(
+            f'Replaying {len(calls) * options["loops"]} requests against {target} '
+            f'with {options["concurrency"]} clients...'
+        )
+        report = replay.run(
+            calls,
+            (lambda: replay.HttpTransport(url)) if url else replay.InProcessTransport,
+            concurrency=options['concurrency'],
+            rate=options['rate'],
+            loops=options['loops'],
+        )
+        self._print(report)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+    def _generate(self, options):
+        try:
+            calls = replay.generate(options['generate'], random.Random(options['seed']))
+        except ValueError as e:
+            raise CommandError(str(e))
+        with open(options['file'], 'w') as f:
+            for call in calls:
+                f.write(json.dumps(call.to_json()) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'✅ Wrote {len(calls)} requests to {options["file"]}'))
+
+    def _print(self, report):
+        width = max(len(name) for name in report['endpoints'])
+        self.stdout.write(
+            f"{'endpoint':<{width}}  {'requests':>8}  {'errors':>6}  {'4xx':>5}  "
+            f"{'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'max ms':>8}"
+        )
+        rows = list(report['endpoints'].items()) + [('total', report)]
+        for name, row in rows:
+            self.stdout.write(
+                f"{name:<{width}}  {row['requests']:>8}  {row['errors']:>6}  {row['client_errors']:>5}  "
+                f"{row['p50_ms']:>8.2f}  {row['p95_ms']:>8.2f}  {row['p99_ms']:>8.2f}  {row['max_ms']:>8.2f}"
+            )
+        style = self.style.SUCCESS if not report['errors'] else self.style.WARNING
+        self.stdout.write(style(
+            f"{report['requests']} requests in {report['elapsed_s']:.1f}s "
+            f"({report['throughput_rps']:.1f} req/s), {report['errors']} errors"
+        ))
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.replicas import sync_replica
+
+
+class Command(BaseCommand):
+    help = (
+        'Copies the primary SQLite database into every read replica file (DJANGO_REPLICA_PATHS), '
+        'once or every --interval seconds'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Repeat every this many seconds until interrupted; default is a single sync'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('No replicas configured; set DJANGO_REPLICA_PATHS')
+        if options['interval'] is not None and options['interval'] <= 0:
+            raise CommandError('--interval must be positive')
+        primary = str(settings.DATABASES['default']['NAME'])
+
+        while True:
+            for alias in settings.REPLICA_DATABASES:
+                replica = str(settings.DATABASES[alias]['NAME'])
+                seconds = sync_replica(primary, replica)
+                self.stdout.write(f'{alias}: synced {replica} in {seconds:.2f}s')
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
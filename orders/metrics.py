@@ -0,0 +1,248 @@
+"""Per-request timings, exposed as ``Server-Timing`` and Prometheus histograms.
+
+``RequestMetricsMiddleware`` measures every request: DB queries and their
+time (through an execute wrapper on each connection), time in the view and
+response rendering (DRF serializes to JSON there). The numbers go out in a
+``Server-Timing`` header and into in-process histograms keyed by route name
+(e.g. ``order-accept-preparation``, ``kyte-webhook``), which
+``GET /api/metrics/`` renders in the Prometheus text format.
+
+Requests never call Kyte: notifications go through the outbox. The outbox
+dispatcher records each Kyte request with ``observe_dispatch`` instead, and
+``manage.py dispatch_kyte_outbox --metrics-port`` serves that process's
+registry.
+
+The middleware works in both handler modes, so under ASGI it does not force
+async views into a thread. Connections are per thread, and async views run
+their queries in worker threads, so the wrapper is installed on every
+connection when it connects and reports to the current request's
+``Timings`` found through a context variable, which follows the request
+into those threads.
+
+Histograms are per process; with several gunicorn workers each one reports
+its own share. With ``REQUEST_METRICS_ENABLED = False`` the middleware
+removes itself at startup and nothing is measured.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+# Seconds; Prometheus ``le`` bounds, +Inf is implicit.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PHASES = ('db', 'view', 'render')
+
+_current: ContextVar[Optional['Timings']] = ContextVar('request_timings', default=None)
+
+
+class Timings:
+    """What one request spent where. Also the execute wrapper that times its queries."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.view_started = self.view_returned = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds['db'] += time.perf_counter() - start
+
+    def finish(self, started: float, ended: float) -> None:
+        """Split the request into view and render time once the response is out."""
+        if self.view_started is None:
+            return
+        view_ended = self.view_returned or ended
+        self.seconds['view'] = view_ended - self.view_started
+        self.seconds['render'] = ended - view_ended
+
+    def header(self, total: float) -> str:
+        parts = [f'db;dur={self.seconds["db"] * 1000:.2f};desc="{self.queries} queries"']
+        parts += [f'{phase};dur={self.seconds[phase] * 1000:.2f}' for phase in PHASES[1:]]
+        parts.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(parts)
+
+
+def _time_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def _install(connection, **kwargs) -> None:
+    if _time_query not in connection.execute_wrappers:
+        # First, so the pop() of an enclosing execute_wrapper() block still
+        # removes its own wrapper.
+        connection.execute_wrappers.insert(0, _time_query)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """In-process request metrics, safe to update from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.durations: Dict[str, Histogram] = {}
+            self.phases: Dict[Tuple[str, str], Histogram] = {}
+            self.requests: Dict[Tuple[str, str], int] = {}
+            self.queries: Dict[str, int] = {}
+            self.dispatches: Dict[str, Histogram] = {}
+            self.dispatched: Dict[str, int] = {}
+
+    def observe(self, route: str, status_code: int, total: float, timings: Timings) -> None:
+        status_class = f'{status_code // 100}xx'
+        with self._lock:
+            self.durations.setdefault(route, Histogram()).observe(total)
+            for phase in PHASES:
+                self.phases.setdefault((route, phase), Histogram()).observe(timings.seconds[phase])
+            self.requests[route, status_class] = self.requests.get((route, status_class), 0) + 1
+            self.queries[route] = self.queries.get(route, 0) + timings.queries
+
+    def observe_dispatch(self, outcome: str, seconds: float, messages: int) -> None:
+        """One outbox delivery to Kyte: ``outcome`` is ``sent`` or ``failed``."""
+        with self._lock:
+            self.dispatches.setdefault(outcome, Histogram()).observe(seconds)
+            self.dispatched[outcome] = self.dispatched.get(outcome, 0) + messages
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            _histogram(lines, 'http_request_duration_seconds', 'Request latency by route', {
+                (('route', route),): h for route, h in self.durations.items()
+            })
+            _histogram(lines, 'http_request_phase_seconds', 'Request time by route and phase', {
+                (('route', route), ('phase', phase)): h for (route, phase), h in self.phases.items()
+            })
+            lines += ['# HELP http_requests_total Requests by route and status class',
+                      '# TYPE http_requests_total counter']
+            for (route, status_class), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{_labels((("route", route), ("status", status_class)))} {count}')
+            lines += ['# HELP http_request_db_queries_total SQL queries by route',
+                      '# TYPE http_request_db_queries_total counter']
+            for route, count in sorted(self.queries.items()):
+                lines.append(f'http_request_db_queries_total{_labels((("route", route),))} {count}')
+            _histogram(lines, 'kyte_dispatch_duration_seconds', 'Outbox requests to Kyte by outcome', {
+                (('outcome', outcome),): h for outcome, h in self.dispatches.items()
+            })
+            lines += ['# HELP kyte_dispatch_messages_total Outbox messages delivered to Kyte by outcome',
+                      '# TYPE kyte_dispatch_messages_total counter']
+            for outcome, count in sorted(self.dispatched.items()):
+                lines.append(f'kyte_dispatch_messages_total{_labels((("outcome", outcome),))} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(pairs) -> str:
+    def escape(value):
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def _histogram(lines: List[str], name: str, help_text: str, series: Dict[tuple, Histogram]) -> None:
+    lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for labels, histogram in sorted(series.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), histogram.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{name}_bucket{_labels(labels + (("le", le),))} {cumulative}')
+        lines.append(f'{name}_sum{_labels(labels)} {histogram.sum:.6f}')
+        lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+
+REGISTRY = Registry()
+
+
+class RequestMetricsMiddleware:
+    """Times each request; place it first in ``MIDDLEWARE`` so it sees all of it."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        connection_created.connect(_install, dispatch_uid='orders.metrics')
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            # Django would run sync hooks of an async middleware in a thread.
+            self.process_view = self._aprocess_view
+            self.process_template_response = self._aprocess_template_response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = Timings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        timings = Timings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, started)
+
+    def _finish(self, request, response, timings, started):
+        ended = time.perf_counter()
+        timings.finish(started, ended)
+        match = request.resolver_match
+        REGISTRY.observe(match.view_name if match else 'unmatched', response.status_code, ended - started, timings)
+        response['Server-Timing'] = timings.header(ended - started)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = _current.get()
+        if timings is not None:
+            timings.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Called after the view returns and before the response is rendered.
+        timings = _current.get()
+        if timings is not None:
+            timings.view_returned = time.perf_counter()
+        return response
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        RequestMetricsMiddleware.process_view(self, request, view_func, view_args, view_kwargs)
+
+    async def _aprocess_template_response(self, request, response):
+        return RequestMetricsMiddleware.process_template_response(self, request, response)
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_kyte_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KyteWebhookDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=255, unique=True)),
+                ('event_type', models.CharField(max_length=100)),
+                ('response', models.JSONField()),
+                ('status_code', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'kyte_webhook_deliveries',
+            },
+        ),
+    ]
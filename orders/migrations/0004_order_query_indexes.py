@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_kyte_webhook_deliveries'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_restaur_9cd040_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_custome_6c3a7f_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_status_762191_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['restaurant', 'placed_at'], name='orders_rest_placed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['restaurant', 'status', 'placed_at'], name='orders_rest_status_placed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('preparation_status__isnull', True), ('preparation_status', 'pending'), _connector='OR'), fields=['restaurant', 'placed_at'], name='orders_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('preparation_status', 'accepted'), ('preparation_status', 'delayed'), _connector='OR'), fields=['restaurant', 'placed_at'], name='orders_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'placed_at'], name='orders_status_placed_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:13
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def backfill_cancel_origin(apps, schema_editor):
+    """Derive stage/source of existing cancellations from the event log.
+
+    Same rules the cancelled feed used to apply with joins: a
+    'preparation_done' event makes it a ready-level cancellation, an
+    'order_cancelled' event (from the Kyte webhook) makes Kyte the source.
+    """
+    Order = apps.get_model('orders', 'Order')
+    OrderEvent = apps.get_model('orders', 'OrderEvent')
+    cancelled = Order.objects.filter(status='cancelled')
+
+    def has_event(event_type):
+        return Exists(OrderEvent.objects.filter(order_id=OuterRef('pk'), event_type=event_type))
+
+    cancelled.filter(has_event('preparation_done')).update(cancel_stage='ready')
+    cancelled.filter(~has_event('preparation_done')).update(cancel_stage='preparation')
+    cancelled.filter(has_event('order_cancelled')).update(cancel_source='kyte')
+    cancelled.filter(~has_event('order_cancelled')).update(cancel_source='staff')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='cancel_source',
+            field=models.CharField(blank=True, choices=[('kyte', 'Kyte'), ('staff', 'Staff')], max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='cancel_stage',
+            field=models.CharField(blank=True, choices=[('preparation', 'Preparation'), ('ready', 'Ready')], max_length=20, null=True),
+        ),
+        # Backfill before the indexes exist so each is built once.
+        migrations.RunPython(backfill_cancel_origin, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('cancel_stage__isnull', False)), fields=['restaurant', 'cancel_stage', 'placed_at'], name='orders_cancel_stage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('cancel_source__isnull', False)), fields=['restaurant', 'cancel_source', 'placed_at'], name='orders_cancel_source_idx'),
+        ),
+    ]
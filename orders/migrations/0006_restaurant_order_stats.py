@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_cancel_origin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantOrderStats',
+            fields=[
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='order_stats', serialize=False, to='orders.restaurant')),
+                ('status_created', models.IntegerField(default=0)),
+                ('status_accepted', models.IntegerField(default=0)),
+                ('status_preparing', models.IntegerField(default=0)),
+                ('status_ready', models.IntegerField(default=0)),
+                ('status_delivered', models.IntegerField(default=0)),
+                ('status_cancelled', models.IntegerField(default=0)),
+                ('prep_none', models.IntegerField(default=0)),
+                ('prep_pending', models.IntegerField(default=0)),
+                ('prep_accepted', models.IntegerField(default=0)),
+                ('prep_rejected', models.IntegerField(default=0)),
+                ('prep_delayed', models.IntegerField(default=0)),
+                ('prep_cancelled', models.IntegerField(default=0)),
+                ('prep_done', models.IntegerField(default=0)),
+                ('revenue_date', models.DateField(blank=True, null=True)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'restaurant_order_stats',
+            },
+        ),
+    ]
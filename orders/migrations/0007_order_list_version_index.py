@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_restaurant_order_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['restaurant', 'updated_at'], name='orders_rest_updated_idx'),
+        ),
+    ]
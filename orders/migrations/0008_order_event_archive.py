@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_list_version_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEventArchive',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='event_archive', serialize=False, to='orders.order')),
+                ('period', models.CharField(db_index=True, max_length=7)),
+                ('event_count', models.IntegerField()),
+                ('data', models.BinaryField()),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'order_event_archive',
+            },
+        ),
+    ]
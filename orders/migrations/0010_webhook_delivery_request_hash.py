@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_hourly_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kytewebhookdelivery',
+            name='request_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
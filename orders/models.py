@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import Count, F, OuterRef, Prefetch, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Concat
+from django.utils import timezone
 
 
 class Customer(models.Model):
@@ -28,6 +31,91 @@ class Restaurant(models.Model):
         return self.name
 
 
+class OrderQuerySet(models.QuerySet):
+    """Named filters for the dashboard order lists"""
+
+    # pending() and active() must render exactly like the conditions of
+    # orders_pending_idx / orders_active_idx or SQLite won't use those partial
+    # indexes; that is also why active() is an OR and not an IN.
+    def pending(self):
+        return self.filter(PENDING_CONDITION)
+
+    def active(self):
+        return self.filter(ACTIVE_CONDITION)
+
+    def cancelled(self):
+        return self.filter(status=Order.OrderStatus.CANCELLED)
+
+    def ready(self):
+        return self.filter(status=Order.OrderStatus.READY)
+
+    def open(self):
+        return self.exclude(status__in=[Order.OrderStatus.DELIVERED, Order.OrderStatus.CANCELLED])
+
+    def list_rows(self):
+        """Project orders onto the flat list shape as plain dicts.
+
+        Names and the item count are computed in SQL, so a page of rows costs
+        one query and no model instances. The count is a correlated subquery
+        rather than a join + GROUP BY so the outer query stays a plain range
+        scan that can stop at the page limit.
+        """
+        items_count = (
+            OrderItem.objects.filter(order=OuterRef('pk'))
+            .order_by()
+            .values('order')
+            .annotate(count=Count('id'))
+            .values('count')
+        )
+        return (
+            self.select_related(None)
+            .prefetch_related(None)
+            .annotate(
+                customer_name=Concat(
+                    F('customer__first_name'), Value(' '), F('customer__second_name'),
+                    output_field=models.CharField(),
+                ),
+                restaurant_name=F('restaurant__name'),
+                items_count=Coalesce(Subquery(items_count), 0),
+            )
+            .values(*ORDER_LIST_FIELDS)
+        )
+
+    def with_latest_events(self, limit):
+        """Prefetch only the ``limit`` newest events of each order, as ``latest_events``.
+
+        The sliced prefetch is a ``ROW_NUMBER()`` window per order, so orders
+        with a long history cost no more than ``limit`` rows each.
+        """
+        return self.prefetch_related(Prefetch(
+            'events', queryset=OrderEvent.objects.order_by('-created_at', '-id')[:limit], to_attr='latest_events'
+        ))
+
+    def with_events_count(self):
+        """Annotate ``events_count``: live events plus those moved to the event archive."""
+        live = (
+            OrderEvent.objects.filter(order=OuterRef('pk'))
+            .order_by()
+            .values('order')
+            .annotate(count=Count('id'))
+            .values('count')
+        )
+        return self.annotate(
+            events_count=Coalesce(Subquery(live), 0) + Coalesce(F('event_archive__event_count'), 0)
+        )
+
+
+ORDER_LIST_FIELDS = (
+    'id', 'restaurant_name', 'customer_name', 'status',
+    'preparation_status', 'total_amount', 'placed_at',
+    'items_count', 'delay_minutes',
+)
+
+
+PENDING_CONDITION = Q(preparation_status__isnull=True) | Q(preparation_status='pending')
+ACTIVE_CONDITION = Q(preparation_status='accepted') | Q(preparation_status='delayed')
+
+
 class Order(models.Model):
     """Order model for managing restaurant orders"""
     
@@ -48,6 +136,16 @@ class Order(models.Model):
         DELAYED = 'delayed', 'Delayed'
         CANCELLED = 'cancelled', 'Cancelled'
         DONE = 'done', 'Done'
+
+    # Where and by whom an order was cancelled, recorded at cancellation time
+    # so the cancelled feed can filter on columns instead of the event log.
+    class CancelStage(models.TextChoices):
+        PREPARATION = 'preparation', 'Preparation'
+        READY = 'ready', 'Ready'
+
+    class CancelSource(models.TextChoices):
+        KYTE = 'kyte', 'Kyte'
+        STAFF = 'staff', 'Staff'
     
     restaurant = models.ForeignKey(
         Restaurant,
@@ -73,6 +171,8 @@ class Order(models.Model):
     rejection_reason = models.TextField(null=True, blank=True)
     delay_minutes = models.IntegerField(null=True, blank=True)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    cancel_stage = models.CharField(max_length=20, choices=CancelStage.choices, null=True, blank=True)
+    cancel_source = models.CharField(max_length=20, choices=CancelSource.choices, null=True, blank=True)
     
     # Timestamps
     placed_at = models.DateTimeField()
@@ -81,20 +181,56 @@ class Order(models.Model):
     cancelled_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = OrderQuerySet.as_manager()
     
     class Meta:
         db_table = 'orders'
         ordering = ['-placed_at']
+        # Matched to the dashboard query shapes (restaurant filter + status
+        # filter, newest first); orders/tests.py checks the plans.
         indexes = [
-            models.Index(fields=['restaurant']),
-            models.Index(fields=['customer']),
-            models.Index(fields=['status']),
+            models.Index(fields=['restaurant', 'placed_at'], name='orders_rest_placed_idx'),
+            # Latest updated_at per restaurant, for the list ETags.
+            models.Index(fields=['restaurant', 'updated_at'], name='orders_rest_updated_idx'),
+            models.Index(fields=['restaurant', 'status', 'placed_at'], name='orders_rest_status_placed_idx'),
+            models.Index(
+                fields=['restaurant', 'placed_at'], condition=PENDING_CONDITION, name='orders_pending_idx'
+            ),
+            models.Index(
+                fields=['restaurant', 'placed_at'], condition=ACTIVE_CONDITION, name='orders_active_idx'
+            ),
+            models.Index(
+                fields=['restaurant', 'cancel_stage', 'placed_at'],
+                condition=Q(cancel_stage__isnull=False),
+                name='orders_cancel_stage_idx',
+            ),
+            models.Index(
+                fields=['restaurant', 'cancel_source', 'placed_at'],
+                condition=Q(cancel_source__isnull=False),
+                name='orders_cancel_source_idx',
+            ),
+            models.Index(fields=['status', 'placed_at'], name='orders_status_placed_idx'),
             models.Index(fields=['placed_at']),
         ]
     
     def __str__(self):
         return f"Order #{self.id} - {self.restaurant.name} - {self.status}"
 
+    def set_cancel_origin(self, source):
+        """Record stage and source of a cancellation; call before changing statuses.
+
+        An order whose preparation was done is a ready-level cancellation.
+        Both values are sticky, so cancelling an already-cancelled order keeps
+        a ready stage and a Kyte source.
+        """
+        if self.preparation_status == self.PreparationStatus.DONE or self.cancel_stage == self.CancelStage.READY:
+            self.cancel_stage = self.CancelStage.READY
+        else:
+            self.cancel_stage = self.CancelStage.PREPARATION
+        if self.cancel_source != self.CancelSource.KYTE:
+            self.cancel_source = source
+
 
 class OrderItem(models.Model):
     """Order items for storing individual menu items in an order"""
@@ -142,3 +278,172 @@ class OrderEvent(models.Model):
     
     def __str__(self):
         return f"{self.event_type} - Order #{self.order.id}"
+
+
+class KyteOutboxMessage(models.Model):
+    """Outbound Kyte notification written in the same transaction as the
+    order change that caused it and delivered later by the dispatcher"""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    event = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.IntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'kyte_outbox'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event} #{self.id} ({self.status})"
+
+
+class KyteWebhookDelivery(models.Model):
+    """Processed inbound Kyte event, keyed by the event id or the
+    ``Idempotency-Key`` header, so retried deliveries replay the response"""
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    # SHA-256 of the event type and data, to tell a redelivery from a key
+    # reused for a different event; empty on rows recorded before it existed.
+    request_hash = models.CharField(max_length=64, blank=True, default='')
+    response = models.JSONField()
+    status_code = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'kyte_webhook_deliveries'
+
+    def __str__(self):
+        return f"{self.event_type} [{self.idempotency_key}]"
+
+
+class RestaurantOrderStats(models.Model):
+    """Per-restaurant order counters for the dashboard badges.
+
+    Maintained incrementally by ``orders.counters`` in the transaction of
+    every order change; ``manage.py rebuild_order_counters`` recomputes them
+    from the orders table. Column names are ``status_<value>`` and
+    ``prep_<value>`` (``prep_none`` for orders without a preparation status).
+    """
+    restaurant = models.OneToOneField(
+        Restaurant,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='order_stats'
+    )
+    status_created = models.IntegerField(default=0)
+    status_accepted = models.IntegerField(default=0)
+    status_preparing = models.IntegerField(default=0)
+    status_ready = models.IntegerField(default=0)
+    status_delivered = models.IntegerField(default=0)
+    status_cancelled = models.IntegerField(default=0)
+    prep_none = models.IntegerField(default=0)
+    prep_pending = models.IntegerField(default=0)
+    prep_accepted = models.IntegerField(default=0)
+    prep_rejected = models.IntegerField(default=0)
+    prep_delayed = models.IntegerField(default=0)
+    prep_cancelled = models.IntegerField(default=0)
+    prep_done = models.IntegerField(default=0)
+    # Total of today's non-cancelled orders; stale once revenue_date is past.
+    revenue_date = models.DateField(null=True, blank=True)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'restaurant_order_stats'
+
+    def __str__(self):
+        return f"Order stats for restaurant #{self.restaurant_id}"
+
+    @staticmethod
+    def status_column(value):
+        return f'status_{value}'
+
+    @staticmethod
+    def prep_column(value):
+        return f"prep_{value or 'none'}"
+
+    def revenue_today(self):
+        return self.revenue if self.revenue_date == timezone.localdate() else 0
+
+
+class OrderEventArchive(models.Model):
+    """Events of a closed order, moved out of ``order_events``.
+
+    One row per order with its events as zlib-compressed JSON (see
+    ``archive.ZDICT``). ``period`` is the month the order closed
+    (``YYYY-MM``), so a month can be exported or dropped as a unit. Written
+    by ``manage.py archive_order_events`` and read through ``orders.archive``.
+    """
+    order = models.OneToOneField(
+        Order,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='event_archive'
+    )
+    period = models.CharField(max_length=7, db_index=True)
+    event_count = models.IntegerField()
+    data = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'order_event_archive'
+
+    def __str__(self):
+        return f"Archived events of order #{self.order_id} ({self.period})"
+
+
+class HourlyRollup(models.Model):
+    """Order totals of one restaurant for the orders placed in one UTC hour.
+
+    Refreshed incrementally by ``orders.rollups`` (``manage.py
+    refresh_hourly_rollups``) and served by the analytics endpoint. An order
+    counts towards the hour it was placed in, also when it is cancelled or
+    prepared later. Prep time runs from ``accepted_at`` to the
+    ``preparation_done`` event and is only summed over orders that have both.
+    """
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name='hourly_rollups'
+    )
+    hour = models.DateTimeField()
+    order_count = models.IntegerField(default=0)
+    cancelled_count = models.IntegerField(default=0)
+    # Total of the orders that were not cancelled.
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    prepared_count = models.IntegerField(default=0)
+    prep_seconds = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'order_hourly_rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'hour'], name='order_hourly_rollups_unique'),
+        ]
+
+    def __str__(self):
+        return f"Rollup of restaurant #{self.restaurant_id} at {self.hour:%Y-%m-%d %H:00}"
+
+
+class RollupWatermark(models.Model):
+    """Time up to which order changes are reflected in a rollup table."""
+    name = models.CharField(max_length=50, primary_key=True)
+    updated_through = models.DateTimeField()
+
+    class Meta:
+        db_table = 'rollup_watermarks'
+
+    def __str__(self):
+        return f"{self.name} through {self.updated_through}"
@@ -0,0 +1,98 @@
+"""Transactional outbox for outbound Kyte notifications.
+
+Views call ``enqueue`` inside the transaction that updates the order, so a
+notification is stored if and only if the order change commits. The
+dispatcher (``manage.py dispatch_kyte_outbox``) drains pending messages in
+batches and retries failed deliveries with exponential backoff. Delivery is
+at-least-once; every message carries its outbox id so Kyte can de-duplicate.
+
+Run a single dispatcher per database: messages are not leased, so two
+dispatchers could pick up the same batch.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import time
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.db.models import F
+from django.utils import timezone
+
+from .kyte_client import KyteClient, KyteError, kyte_client
+from .metrics import REGISTRY
+from .models import KyteOutboxMessage
+
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 2
+BACKOFF_MAX_SECONDS = 300
+MAX_ATTEMPTS = 10
+
+
+def enqueue(event: str, payload: Dict[str, Any]) -> KyteOutboxMessage:
+    """Queue a notification; call this inside the order's transaction."""
+    return KyteOutboxMessage.objects.create(event=event, payload=payload)
+
+
+def enqueue_many(messages: Iterable[Tuple[str, Dict[str, Any]]]) -> list[KyteOutboxMessage]:
+    return KyteOutboxMessage.objects.bulk_create(
+        [KyteOutboxMessage(event=event, payload=payload) for event, payload in messages]
+    )
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    """Exponential backoff with full jitter, capped at ``BACKOFF_MAX_SECONDS``."""
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=random.uniform(ceiling / 2, ceiling))
+
+
+def dispatch_batch(
+    client: Optional[KyteClient] = None,
+    batch_size: int = 100,
+    max_attempts: int = MAX_ATTEMPTS,
+) -> Tuple[int, int]:
+    """Deliver up to ``batch_size`` due messages in one Kyte request.
+
+    Returns ``(sent, failed)`` for the batch; ``(0, 0)`` means nothing was due.
+    """
+    client = client or kyte_client
+    now = timezone.now()
+    messages = list(
+        KyteOutboxMessage.objects.filter(
+            status=KyteOutboxMessage.Status.PENDING,
+            available_at__lte=now,
+        ).order_by('id')[:batch_size]
+    )
+    if not messages:
+        return 0, 0
+
+    events = [{'id': message.id, 'event': message.event, 'payload': message.payload} for message in messages]
+    started = time.perf_counter()
+    try:
+        client.send_events(events)
+    except KyteError as e:
+        REGISTRY.observe_dispatch('failed', time.perf_counter() - started, len(messages))
+        logger.warning('Kyte outbox delivery of %d messages failed: %s', len(messages), e)
+        for message in messages:
+            message.attempts += 1
+            message.last_error = str(e)
+            if message.attempts >= max_attempts:
+                message.status = KyteOutboxMessage.Status.FAILED
+            else:
+                message.available_at = now + backoff_delay(message.attempts)
+        KyteOutboxMessage.objects.bulk_update(
+            messages, ['attempts', 'last_error', 'status', 'available_at']
+        )
+        return 0, len(messages)
+    REGISTRY.observe_dispatch('sent', time.perf_counter() - started, len(messages))
+
+    KyteOutboxMessage.objects.filter(id__in=[message.id for message in messages]).update(
+        status=KyteOutboxMessage.Status.SENT,
+        sent_at=timezone.now(),
+        attempts=F('attempts') + 1,
+        last_error=None,
+    )
+    return len(messages), 0
@@ -0,0 +1,132 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class OrderCursorPagination(BasePagination):
+    """Keyset pagination over ``(placed_at, id)``, newest first.
+
+    Pages are fetched with a range predicate on the sort key instead of
+    ``OFFSET``, and no ``COUNT(*)`` is ever issued, so page cost does not grow
+    with table size or page depth. Cursors are opaque base64 tokens; rows may
+    be model instances or ``values()`` dicts.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    def page_queryset(self, queryset, request):
+        """The query for the requested page (one row more than fits, to detect
+        a next page); pass its rows to ``set_page``. Split out so async views
+        can iterate it."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.limit = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        queryset = queryset.order_by('-placed_at', '-id')
+        if self.cursor is not None:
+            placed_at, pk, reverse = self.cursor
+            # The leading placed_at bound is what the index range scan uses;
+            # the OR only breaks ties within that boundary timestamp.
+            if reverse:
+                queryset = queryset.filter(
+                    Q(placed_at__gte=placed_at) & (Q(placed_at__gt=placed_at) | Q(id__gt=pk))
+                ).order_by('placed_at', 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(placed_at__lte=placed_at) & (Q(placed_at__lt=placed_at) | Q(id__lt=pk))
+                )
+        return queryset[:self.limit + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.cursor is not None and self.cursor[2]:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            placed_at = parse_datetime(payload['p'])
+            pk = int(payload['i'])
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise ParseError(self.invalid_cursor_message)
+        # An id past 64 bits would overflow in the SQLite driver.
+        if placed_at is None or not -2 ** 63 <= pk < 2 ** 63:
+            raise ParseError(self.invalid_cursor_message)
+        return placed_at, pk, reverse
+
+    def encode_cursor(self, row, reverse):
+        if isinstance(row, dict):
+            placed_at, pk = row['placed_at'], row['id']
+        else:
+            placed_at, pk = row.placed_at, row.pk
+        payload = {'p': placed_at.isoformat(), 'i': pk}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('ascii'))
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.decode('ascii'))
@@ -0,0 +1,237 @@
+"""Replay of API traffic from a JSONL file, for load tests.
+
+Each line is one request::
+
+    {"method": "GET", "path": "/api/orders/pending/?restaurant_id=1"}
+    {"method": "POST", "path": "/api/orders/7/accept_preparation/", "body": {}}
+    {"type": "order_created", "data": {...}}
+
+A line with ``type`` and no ``path`` is a Kyte webhook event and is posted
+to ``/api/kyte/events/``. ``headers`` and ``name`` are optional; ``name``
+groups the request in the report (default: method and path with numeric
+segments replaced by ``{id}``).
+
+Requests are sent by a pool of threads, either in-process through the WSGI
+handler or over HTTP to a running server. With a target rate, request ``i``
+is due at ``i / rate`` seconds and its latency counts from that moment, so a
+stalled server shows up as latency instead of a lower send rate.
+"""
+from __future__ import annotations
+
+import http.client
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from django.test import Client
+from django.utils import timezone
+
+from . import sampling
+from .benchmarking import percentile
+from .models import Customer, Order, Restaurant
+
+
+WEBHOOK_PATH = '/api/kyte/events/'
+_NUMERIC_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def endpoint_name(method: str, path: str) -> str:
+    return f"{method} {_NUMERIC_SEGMENT.sub('/{id}', urlsplit(path).path)}"
+
+
+@dataclass
+class Call:
+    method: str
+    path: str
+    body: Optional[object] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    name: str = ''
+
+    @classmethod
+    def from_json(cls, line: dict) -> 'Call':
+        if 'path' not in line and 'type' in line:
+            line = {'method': 'POST', 'path': WEBHOOK_PATH, 'body': line}
+        method = line.get('method', 'GET').upper()
+        return cls(
+            method=method,
+            path=line['path'],
+            body=line.get('body'),
+            headers=line.get('headers') or {},
+            name=line.get('name') or endpoint_name(method, line['path']),
+        )
+
+    def to_json(self) -> dict:
+        line = {'method': self.method, 'path': self.path}
+        if self.body is not None:
+            line['body'] = self.body
+        if self.headers:
+            line['headers'] = self.headers
+        return line
+
+
+def load(path: str) -> List[Call]:
+    with open(path) as f:
+        return [Call.from_json(json.loads(line)) for line in f if line.strip()]
+
+
+def generate(count: int, rng: random.Random) -> List[Call]:
+    """A dashboard-like mix of reads, webhook writes and kitchen accepts against the current data."""
+    restaurant_ids = list(Restaurant.objects.values_list('id', flat=True))
+    customer_ids = sampling.sample_keys(Customer.objects.all(), 1000, rng=rng)
+    order_ids = sampling.sample_keys(Order.objects.all(), 1000, rng=rng)
+    # Each pending order is accepted once; later picks fall back to new orders.
+    pending_ids = sampling.sample_keys(Order.objects.pending(), 1000, rng=rng)
+    rng.shuffle(pending_ids)
+    if not restaurant_ids or not customer_ids:
+        raise ValueError('No restaurants or customers found. Run seed_data first.')
+
+    def order_created(restaurant_id):
+        return Call('POST', WEBHOOK_PATH, body={'type': 'order_created', 'data': {
+            'restaurant_id': restaurant_id,
+            'customer_id': rng.choice(customer_ids),
+            'placed_at': timezone.now().isoformat(),
+            'total_amount': '24.50',
+            'items': [{'menu_item': 'Margherita Pizza', 'quantity': 1, 'unit_price': '24.50'}],
+        }})
+
+    mix = [
+        (25, lambda r: Call('GET', f'/api/orders/pending/?restaurant_id={r}')),
+        (20, lambda r: Call('GET', f'/api/orders/active/?restaurant_id={r}')),
+        (10, lambda r: Call('GET', f'/api/orders/?restaurant_id={r}')),
+        (10, lambda r: Call('GET', f'/api/restaurants/{r}/summary/')),
+        (15, lambda r: Call('GET', f'/api/orders/{rng.choice(order_ids)}/') if order_ids else order_created(r)),
+        (20, order_created),
+        (10, lambda r: Call('POST', f'/api/orders/{pending_ids.pop()}/accept_preparation/', body={})
+            if pending_ids else order_created(r)),
+    ]
+    weights, builders = zip(*mix)
+    return [rng.choices(builders, weights)[0](rng.choice(restaurant_ids)) for _ in range(count)]
+
+
+class InProcessTransport:
+    """Sends requests through Django's WSGI handler in this process."""
+
+    def __init__(self):
+        self.client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+
+    def send(self, call: Call) -> int:
+        body = json.dumps(call.body) if call.body is not None else ''
+        response = self.client.generic(
+            call.method, call.path, body, content_type='application/json', headers=call.headers
+        )
+        return response.status_code
+
+
+class HttpTransport:
+    """Sends requests over one keep-alive HTTP connection."""
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.connection = None
+
+    def send(self, call: Call) -> int:
+        body = json.dumps(call.body).encode() if call.body is not None else None
+        headers = {'Content-Type': 'application/json', **call.headers}
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            self.connection.request(call.method, call.path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+
+
+@dataclass
+class Samples:
+    latencies: List[float] = field(default_factory=list)
+    client_errors: int = 0
+    errors: int = 0
+
+
+def run(calls: List[Call], transport_factory, concurrency: int = 4, rate: Optional[float] = None,
+        loops: int = 1) -> dict:
+    """Send ``calls`` ``loops`` times from ``concurrency`` threads and summarize.
+
+    ``transport_factory`` is called once per thread. Errors are exceptions and
+    5xx responses; 4xx responses are counted separately.
+    """
+    total = len(calls) * loops
+    counter = itertools.count()
+    lock = threading.Lock()
+    samples: Dict[str, Samples] = defaultdict(Samples)
+    start = time.perf_counter()
+
+    def worker():
+        transport = transport_factory()
+        while True:
+            with lock:
+                index = next(counter)
+            if index >= total:
+                return
+            call = calls[index % len(calls)]
+            began = time.perf_counter()
+            if rate:
+                due = start + index / rate
+                if due > began:
+                    time.sleep(due - began)
+                began = due
+            try:
+                status_code = transport.send(call)
+            except Exception:
+                status_code = None
+            latency = time.perf_counter() - began
+            with lock:
+                bucket = samples[call.name]
+                bucket.latencies.append(latency)
+                if status_code is None or status_code >= 500:
+                    bucket.errors += 1
+                elif status_code >= 400:
+                    bucket.client_errors += 1
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, time.perf_counter() - start)
+
+
+def _latency_stats(latencies: List[float]) -> dict:
+    latencies = sorted(latencies)
+    stats = {f'p{p}_ms': round(percentile(latencies, p) * 1000, 2) for p in (50, 95, 99)}
+    stats['max_ms'] = round(latencies[-1] * 1000, 2) if latencies else 0.0
+    return stats
+
+
+def summarize(samples: Dict[str, Samples], elapsed: float) -> dict:
+    endpoints = {
+        name: {
+            'requests': len(bucket.latencies),
+            'errors': bucket.errors,
+            'client_errors': bucket.client_errors,
+            **_latency_stats(bucket.latencies),
+        }
+        for name, bucket in sorted(samples.items())
+    }
+    requests = sum(e['requests'] for e in endpoints.values())
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'requests': requests,
+        'throughput_rps': round(requests / elapsed, 1) if elapsed else 0.0,
+        'errors': sum(e['errors'] for e in endpoints.values()),
+        'client_errors': sum(e['client_errors'] for e in endpoints.values()),
+        **_latency_stats([latency for bucket in samples.values() for latency in bucket.latencies]),
+        'endpoints': endpoints,
+    }
@@ -0,0 +1,128 @@
+"""Read replicas for dashboard traffic.
+
+``ReplicaRoutingMiddleware`` picks one replica per safe request (GET, HEAD,
+OPTIONS) and ``PrimaryReplicaRouter`` sends that request's reads there.
+Everything else stays on the primary:
+
+- writes, and every query of a request with an unsafe method;
+- reads made after a write within the same request;
+- requests from a client that wrote within the last
+  ``REPLICA_STICKY_SECONDS``, so a dashboard sees its own accept or cancel
+  even though replicas lag. Write responses carry the end of that window in
+  the ``DB-Primary-Until`` header (Unix seconds) for the cross-origin
+  dashboard to echo on its reads, and in a cookie for same-origin clients
+  like the admin; the cookie alone would never reach the dashboard;
+- code outside requests: management commands, the outbox dispatcher, the
+  order stream poller.
+
+Each request reads one replica, so its ETag version and the page it renders
+come from the same snapshot. Replicas are configured as database aliases
+listed in ``REPLICA_DATABASES``. Their connections are ``query_only``, and
+they are never migrated: their schema comes with the copy.
+
+For local setups ``manage.py sync_replicas`` keeps SQLite replica files in
+sync with the primary through SQLite's online backup API.
+"""
+from __future__ import annotations
+
+import random
+import sqlite3
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+
+PRIMARY = 'default'
+STICKY_COOKIE = 'db_primary'
+STICKY_HEADER = 'DB-Primary-Until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_replica: ContextVar[Optional[str]] = ContextVar('read_replica', default=None)
+
+
+class PrimaryReplicaRouter:
+    """Reads go to the replica chosen for the current request, if any."""
+
+    def db_for_read(self, model, **hints):
+        return _replica.get() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        # Reads after a write in the same request must see it.
+        _replica.set(None)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+class ReplicaRoutingMiddleware:
+    """Chooses the database a request reads from; place it before anything that queries."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REPLICA_DATABASES', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = _replica.set(self._replica_for(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica.reset(token)
+        return self._stick(request, response)
+
+    async def __acall__(self, request):
+        token = _replica.set(self._replica_for(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica.reset(token)
+        return self._stick(request, response)
+
+    def _replica_for(self, request) -> Optional[str]:
+        if request.method not in SAFE_METHODS or STICKY_COOKIE in request.COOKIES:
+            return None
+        try:
+            if time.time() < float(request.headers.get(STICKY_HEADER, 0)):
+                return None
+        except ValueError:
+            pass
+        return random.choice(settings.REPLICA_DATABASES)
+
+    def _stick(self, request, response):
+        if request.method not in SAFE_METHODS:
+            seconds = settings.REPLICA_STICKY_SECONDS
+            response[STICKY_HEADER] = str(int(time.time()) + seconds + 1)
+            response.set_cookie(STICKY_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+        return response
+
+
+def sync_replica(primary_path: str, replica_path: str) -> float:
+    """Copy the primary database file into a replica file; returns the seconds taken.
+
+    The backup reads a consistent snapshot of the primary without blocking
+    its writers. Readers of the replica see either the old or the new copy.
+    """
+    started = time.perf_counter()
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return time.perf_counter() - started
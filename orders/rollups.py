@@ -0,0 +1,227 @@
+"""Hourly order rollups behind the analytics endpoint.
+
+``HourlyRollup`` holds, per restaurant and UTC hour, the order count,
+cancellations, revenue and prep time of the orders placed in that hour.
+Answering a time range from it reads at most one row per hour, not the
+order history.
+
+``refresh`` keeps the table current incrementally. Orders changed since the
+watermark (``orders.updated_at``; every transition and webhook bumps it)
+mark their placed hour dirty. Each dirty hour is recomputed from its orders
+and replaced, so a refresh can run any number of times. Prep time needs the
+``preparation_done`` event, read from ``order_events`` and, for orders whose
+events were archived, from the event archive.
+
+Deleted orders do not bump anything; ``refresh(full=True)`` (``manage.py
+refresh_hourly_rollups --full``) recomputes every hour.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import archive, transitions
+from .models import HourlyRollup, Order, OrderEvent, OrderEventArchive, Restaurant, RollupWatermark
+
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+WATERMARK = 'hourly_rollups'
+# updated_at is taken before the writing transaction commits, so a change can
+# become visible after a refresh that already moved past its timestamp. Each
+# refresh rescans this far behind the watermark to pick those up.
+OVERLAP = timedelta(minutes=5)
+DONE_EVENT = transitions.DONE.event
+BUCKETS = {'hour': (HOUR, timedelta(days=1)), 'day': (DAY, timedelta(days=30))}
+MAX_RANGE = timedelta(days=366)
+CENT = Decimal('0.01')
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _ranges(hours: Iterable[datetime]) -> List[Tuple[datetime, datetime]]:
+    """Consecutive hours merged into ``[start, end)`` ranges."""
+    ranges: List[Tuple[datetime, datetime]] = []
+    for hour in sorted(hours):
+        if ranges and ranges[-1][1] == hour:
+            ranges[-1] = (ranges[-1][0], hour + HOUR)
+        else:
+            ranges.append((hour, hour + HOUR))
+    return ranges
+
+
+def dirty_hours(since: Optional[datetime]) -> Dict[int, Set[datetime]]:
+    """Placed hours, per restaurant, of the orders changed since ``since`` (all if None)."""
+    dirty: Dict[int, Set[datetime]] = defaultdict(set)
+    for restaurant_id in Restaurant.objects.values_list('id', flat=True):
+        # Per restaurant, so the scan is a range of orders_rest_updated_idx.
+        orders = Order.objects.filter(restaurant_id=restaurant_id).order_by()
+        if since is not None:
+            orders = orders.filter(updated_at__gte=since)
+        for placed_at in orders.values_list('placed_at', flat=True).iterator(chunk_size=5000):
+            dirty[restaurant_id].add(floor_hour(placed_at))
+    return dirty
+
+
+def _archived_done_at(order_ids: List[int]) -> Dict[int, datetime]:
+    done_at = {}
+    for offset in range(0, len(order_ids), 500):
+        archived = OrderEventArchive.objects.filter(order_id__in=order_ids[offset:offset + 500])
+        for order_id, data in archived.values_list('order_id', 'data'):
+            times = [e.created_at for e in archive.unpack(order_id, data) if e.event_type == DONE_EVENT]
+            if times:
+                done_at[order_id] = min(times)
+    return done_at
+
+
+def compute(restaurant_id: int, hours: Iterable[datetime]) -> List[HourlyRollup]:
+    """Rollups of ``hours`` recomputed from the orders, as unsaved rows; empty hours are left out."""
+    done_at = (
+        OrderEvent.objects.filter(order_id=OuterRef('pk'), event_type=DONE_EVENT)
+        .order_by('created_at')
+        .values('created_at')[:1]
+    )
+    rows = []
+    for start, end in _ranges(hours):
+        rows += (
+            Order.objects.filter(restaurant_id=restaurant_id, placed_at__gte=start, placed_at__lt=end)
+            .order_by()
+            .annotate(done_at=Subquery(done_at))
+            .values_list('id', 'placed_at', 'status', 'preparation_status', 'total_amount', 'accepted_at', 'done_at')
+        )
+    archived = _archived_done_at([
+        row[0] for row in rows
+        if row[3] == Order.PreparationStatus.DONE and row[5] is not None and row[6] is None
+    ])
+
+    rollups: Dict[datetime, HourlyRollup] = {}
+    for order_id, placed_at, order_status, _, total, accepted_at, done in rows:
+        hour = floor_hour(placed_at)
+        rollup = rollups.get(hour)
+        if rollup is None:
+            rollup = rollups[hour] = HourlyRollup(
+                restaurant_id=restaurant_id, hour=hour, revenue=Decimal('0'), prep_seconds=0.0
+            )
+        rollup.order_count += 1
+        if order_status == Order.OrderStatus.CANCELLED:
+            rollup.cancelled_count += 1
+        else:
+            rollup.revenue += total or Decimal('0')
+        done = done or archived.get(order_id)
+        if accepted_at is not None and done is not None and done >= accepted_at:
+            rollup.prepared_count += 1
+            rollup.prep_seconds += (done - accepted_at).total_seconds()
+    return list(rollups.values())
+
+
+def updated_through() -> Optional[datetime]:
+    """Order changes up to this time are reflected in the rollups; None before the first refresh."""
+    return RollupWatermark.objects.filter(pk=WATERMARK).values_list('updated_through', flat=True).first()
+
+
+def refresh(full: bool = False, now: Optional[datetime] = None) -> Tuple[int, int]:
+    """Recompute the hours touched since the last refresh, or all hours with ``full``.
+
+    Without a watermark (first run) every hour is computed. Returns
+    ``(hours recomputed, rollup rows written)``.
+    """
+    now = now or timezone.now()
+    watermark = None if full else updated_through()
+    since = watermark - OVERLAP if watermark is not None else None
+    dirty = dirty_hours(since)
+    # Read everything first; the write transaction only deletes and inserts.
+    rollups = [rollup for restaurant_id, hours in dirty.items() for rollup in compute(restaurant_id, hours)]
+
+    with transaction.atomic():
+        if since is None:
+            HourlyRollup.objects.all().delete()
+        else:
+            for restaurant_id, hours in dirty.items():
+                for start, end in _ranges(hours):
+                    HourlyRollup.objects.filter(restaurant_id=restaurant_id, hour__gte=start, hour__lt=end).delete()
+        HourlyRollup.objects.bulk_create(rollups, batch_size=1000)
+        RollupWatermark.objects.update_or_create(pk=WATERMARK, defaults={'updated_through': now})
+    return sum(len(hours) for hours in dirty.values()), len(rollups)
+
+
+def parse_bound(params, name: str) -> Optional[datetime]:
+    """Query parameter ``name`` as an aware datetime (dates are midnight UTC); None if absent."""
+    value = params.get(name)
+    if not value:
+        return None
+    parsed = None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None and parse_date(value) is not None:
+            parsed = datetime.combine(parse_date(value), time.min)
+    except ValueError:
+        pass
+    if parsed is None:
+        raise ValueError(f'{name} must be an ISO 8601 date or datetime')
+    return parsed if timezone.is_aware(parsed) else parsed.replace(tzinfo=dt_timezone.utc)
+
+
+def parse_range(params, now: Optional[datetime] = None) -> Tuple[datetime, datetime, str]:
+    """``(start, end, bucket)`` from the ``from``/``to``/``bucket`` query parameters.
+
+    ``start`` is rounded down and ``end`` (exclusive) up to whole buckets.
+    Defaults to the last 24 hours by hour, or the last 30 days by day.
+    ValueError with the API message on bad input.
+    """
+    bucket = params.get('bucket') or 'hour'
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}")
+    size, default_range = BUCKETS[bucket]
+
+    def floor(value):
+        value = floor_hour(value)
+        return value.replace(hour=0) if bucket == 'day' else value
+
+    end = parse_bound(params, 'to') or (now or timezone.now())
+    end = floor(end) + size if floor(end) != end else end
+    start = parse_bound(params, 'from')
+    start = floor(start) if start is not None else end - default_range
+    if start >= end:
+        raise ValueError('from must be before to')
+    if end - start > MAX_RANGE:
+        raise ValueError(f'The range must not exceed {MAX_RANGE.days} days')
+    return start, end, bucket
+
+
+def _summary(rows: List[dict]) -> dict:
+    orders = sum(row['order_count'] for row in rows)
+    cancelled = sum(row['cancelled_count'] for row in rows)
+    prepared = sum(row['prepared_count'] for row in rows)
+    prep_seconds = sum(row['prep_seconds'] for row in rows)
+    return {
+        'orders': orders,
+        'cancelled': cancelled,
+        'cancellation_rate': round(cancelled / orders, 4) if orders else 0.0,
+        'revenue': sum((row['revenue'] for row in rows), Decimal('0')).quantize(CENT),
+        'prepared': prepared,
+        'avg_prep_seconds': round(prep_seconds / prepared, 1) if prepared else None,
+    }
+
+
+def series(restaurant_id: int, start: datetime, end: datetime, bucket: str = 'hour') -> Tuple[List[dict], dict]:
+    """Per-bucket figures (buckets without orders are left out) and the totals of ``[start, end)``."""
+    rows = list(
+        HourlyRollup.objects.filter(restaurant_id=restaurant_id, hour__gte=start, hour__lt=end)
+        .order_by('hour')
+        .values('hour', 'order_count', 'cancelled_count', 'revenue', 'prepared_count', 'prep_seconds')
+    )
+    grouped: Dict[datetime, List[dict]] = defaultdict(list)
+    for row in rows:
+        key = row['hour'] if bucket == 'hour' else floor_hour(row['hour']).replace(hour=0)
+        grouped[key].append(row)
+    buckets = [{'start': key, **_summary(group)} for key, group in grouped.items()]
+    return buckets, _summary(rows)
@@ -0,0 +1,64 @@
+"""Random rows without ``ORDER BY RANDOM()`` or loading whole tables.
+
+``ORDER BY RANDOM()`` reads and sorts every matching row. Here a pick costs
+three index seeks whatever the table size: the lowest and the highest key of
+the matching rows, then the first row at or after a random key between them.
+``key`` must be the column an index orders the matching rows by: the
+primary key for a whole table, ``placed_at`` for the per-restaurant order
+indexes.
+
+Picks are uniform over the key range rather than over rows, so a row after a
+gap in the keys is picked more often. That is fine for driving load.
+"""
+from __future__ import annotations
+
+import random
+from typing import Any, List, Optional, Tuple
+
+from django.db.models import QuerySet
+
+
+def key_range(queryset: QuerySet, key: str = 'pk') -> Optional[Tuple[Any, Any]]:
+    """Lowest and highest ``key`` of ``queryset`` (two seeks), or None if empty."""
+    low = queryset.order_by(key).values_list(key, flat=True).first()
+    if low is None:
+        return None
+    return low, queryset.order_by(f'-{key}').values_list(key, flat=True).first()
+
+
+def _draw(low, high, rng):
+    if isinstance(low, int):
+        return rng.randint(low, high)
+    return low + (high - low) * rng.random()
+
+
+def _probe(queryset: QuerySet, key: str, bounds, rng) -> QuerySet:
+    return queryset.filter(**{f'{key}__gte': _draw(*bounds, rng)}).order_by(key)
+
+
+def random_row(queryset: QuerySet, key: str = 'pk', rng=random):
+    """A random row of ``queryset``, or None if it is empty."""
+    bounds = key_range(queryset, key)
+    if bounds is None:
+        return None
+    # Rows deleted since the range was read can leave nothing above the draw.
+    return _probe(queryset, key, bounds, rng).first() or queryset.order_by(key).first()
+
+
+def sample_keys(queryset: QuerySet, size: int, key: str = 'pk', rng=random) -> List[Any]:
+    """Up to ``size`` distinct random keys, for picking many rows from a pool.
+
+    Small tables are returned whole; otherwise one seek per key.
+    """
+    head = list(queryset.order_by(key).values_list(key, flat=True)[:size + 1])
+    if len(head) <= size:
+        return head
+    bounds = (head[0], queryset.order_by(f'-{key}').values_list(key, flat=True).first())
+    keys = set()
+    # Collisions are retried, but the number of seeks stays bounded.
+    for _ in range(size * 2):
+        keys.add(_probe(queryset, key, bounds, rng).values_list(key, flat=True).first())
+        if len(keys) >= size:
+            break
+    keys.discard(None)
+    return sorted(keys)
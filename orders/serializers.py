@@ -1,5 +1,7 @@
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Customer, Restaurant, Order, OrderItem, OrderEvent
+from .models import Customer, Restaurant, Order, OrderItem, OrderEvent, RestaurantOrderStats
 
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -36,23 +38,84 @@ class OrderEventSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
+# Events embedded in the order detail; the rest are behind ``events_url``.
+ORDER_DETAIL_EVENTS = 20
+
+
 class OrderSerializer(serializers.ModelSerializer):
-    """Serializer for Order model with nested items"""
+    """Serializer for Order model with nested items
+
+    ``events`` holds the ``ORDER_DETAIL_EVENTS`` newest events, taken from
+    ``Order.objects.with_latest_events()`` when prefetched, and ``events_url``
+    links to the full, paginated timeline. ``fields`` (see ``order_fields``)
+    limits the output to those fields.
+    """
     items = OrderItemSerializer(many=True, read_only=True)
     customer = CustomerSerializer(read_only=True)
     restaurant = RestaurantSerializer(read_only=True)
-    events = OrderEventSerializer(many=True, read_only=True)
+    events = serializers.SerializerMethodField()
+    events_count = serializers.SerializerMethodField()
+    events_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Order
         fields = [
             'id', 'restaurant', 'customer', 'status', 'preparation_status',
             'rejection_reason', 'delay_minutes', 'total_amount',
-            'placed_at', 'accepted_at', 'delivered_at', 'cancelled_at',
-            'created_at', 'updated_at', 'items', 'events'
+            'cancel_stage', 'cancel_source', 'placed_at', 'accepted_at', 'delivered_at', 'cancelled_at',
+            'created_at', 'updated_at', 'items', 'events', 'events_count', 'events_url'
         ]
         read_only_fields = ['created_at', 'updated_at']
 
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def get_events(self, obj):
+        events = getattr(obj, 'latest_events', None)
+        if events is None:
+            events = obj.events.order_by('-created_at', '-id')[:ORDER_DETAIL_EVENTS]
+        return OrderEventSerializer(events, many=True).data
+
+    def get_events_count(self, obj):
+        count = getattr(obj, 'events_count', None)
+        return obj.events.count() if count is None else count
+
+    def get_events_url(self, obj):
+        url = f"{reverse('orderevent-list')}?order_id={obj.pk}&include_archived=true"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+# Fields of OrderSerializer that nest related rows, rendered only on request
+# once ?fields= or ?expand= is used.
+ORDER_NESTED_FIELDS = ('restaurant', 'customer', 'items', 'events')
+# Fields that are not Order columns.
+ORDER_COMPUTED_FIELDS = ('events_count', 'events_url')
+
+
+def order_fields(params):
+    """``OrderSerializer`` fields asked for with ``?fields=`` and ``?expand=``; None for all of them.
+
+    ``fields`` picks top-level fields and defaults to every field that does
+    not nest related rows. ``expand`` adds nested ones; a nested field listed
+    in ``fields`` is expanded too. ValueError for unknown names.
+    """
+    if 'fields' not in params and 'expand' not in params:
+        return None
+
+    def names(key):
+        return {name.strip() for name in params.get(key, '').split(',') if name.strip()}
+
+    fields = names('fields') or {name for name in OrderSerializer.Meta.fields if name not in ORDER_NESTED_FIELDS}
+    expand = names('expand')
+    unknown = (fields - set(OrderSerializer.Meta.fields)) | (expand - set(ORDER_NESTED_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return [name for name in OrderSerializer.Meta.fields if name in fields or name in expand]
+
 
 class OrderListSerializer(serializers.ModelSerializer):
     """Simplified serializer for order list view"""
@@ -76,3 +139,83 @@ class OrderListSerializer(serializers.ModelSerializer):
     
     def get_items_count(self, obj):
         return obj.items.count()
+
+
+class OrderListRowSerializer(serializers.Serializer):
+    """Read-only serializer for ``Order.objects.list_rows()`` dicts.
+
+    Produces the same shape as ``OrderListSerializer`` without touching model
+    instances or related managers.
+    """
+    id = serializers.IntegerField()
+    restaurant_name = serializers.CharField()
+    customer_name = serializers.CharField()
+    status = serializers.CharField()
+    preparation_status = serializers.CharField(allow_null=True)
+    total_amount = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
+    placed_at = serializers.DateTimeField()
+    items_count = serializers.IntegerField()
+    delay_minutes = serializers.IntegerField(allow_null=True)
+
+
+class RestaurantOrderStatsSerializer(serializers.ModelSerializer):
+    """Counters for the dashboard badges of one restaurant"""
+    restaurant_id = serializers.IntegerField(read_only=True)
+    badges = serializers.SerializerMethodField()
+    status = serializers.SerializerMethodField()
+    preparation_status = serializers.SerializerMethodField()
+    date = serializers.SerializerMethodField()
+    revenue_today = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = RestaurantOrderStats
+        fields = [
+            'restaurant_id', 'badges', 'status', 'preparation_status',
+            'date', 'revenue_today', 'updated_at'
+        ]
+
+    def get_badges(self, obj):
+        # Same conditions as the pending/active/cancelled lists
+        return {
+            'pending': obj.prep_none + obj.prep_pending,
+            'active': obj.prep_accepted + obj.prep_delayed,
+            'cancelled': obj.status_cancelled,
+        }
+
+    def get_status(self, obj):
+        return {value: getattr(obj, obj.status_column(value)) for value in Order.OrderStatus.values}
+
+    def get_preparation_status(self, obj):
+        counts = {'none': obj.prep_none}
+        counts.update(
+            (value, getattr(obj, obj.prep_column(value))) for value in Order.PreparationStatus.values
+        )
+        return counts
+
+    def get_date(self, obj):
+        return timezone.localdate()
+
+
+class AnalyticsFiguresSerializer(serializers.Serializer):
+    """Order figures of a time range, from the hourly rollups"""
+    orders = serializers.IntegerField()
+    cancelled = serializers.IntegerField()
+    cancellation_rate = serializers.FloatField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    prepared = serializers.IntegerField()
+    avg_prep_seconds = serializers.FloatField(allow_null=True)
+
+
+class AnalyticsBucketSerializer(AnalyticsFiguresSerializer):
+    start = serializers.DateTimeField()
+
+
+class RestaurantAnalyticsSerializer(serializers.Serializer):
+    """Analytics of one restaurant, by hour or day"""
+    restaurant_id = serializers.IntegerField()
+    bucket = serializers.CharField()
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    updated_through = serializers.DateTimeField(allow_null=True)
+    totals = AnalyticsFiguresSerializer()
+    buckets = AnalyticsBucketSerializer(many=True)
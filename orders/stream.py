@@ -0,0 +1,245 @@
+"""Server-Sent Events change feed for restaurant dashboards.
+
+Every order change writes an ``OrderEvent`` row, so the event table doubles as
+a change log. Each worker process runs one poller task that reads rows past
+its cursor (a primary-key range scan) and fans them out to the asyncio queues
+of the connected dashboards for that restaurant. Idle connections are just
+suspended coroutines: no thread per connection, and the database cost is one
+query per poll interval per worker regardless of how many screens listen.
+Because the poller reads the database, changes made by other workers or by
+the webhook reach every subscriber.
+
+``sse_application`` serves the feed as a plain ASGI app that ``backend.asgi``
+routes to ahead of Django: Django's request handler gives every in-flight
+request its own thread for the sync middleware hooks, which is exactly the
+thread-per-connection cost the stream must avoid.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import aclosing, suppress
+from typing import AsyncIterator, Dict, List, Optional, Set
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http.request import split_domain_port, validate_host
+
+from .models import OrderEvent
+from .views import _parse_id
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = '/api/orders/stream/'
+POLL_BATCH_SIZE = 500
+QUEUE_SIZE = 1000
+RESYNC = object()
+
+_DELTA_FIELDS = (
+    'id', 'event_type', 'created_at', 'order_id', 'order__restaurant_id',
+    'order__status', 'order__preparation_status', 'order__delay_minutes',
+    'order__total_amount', 'order__placed_at',
+)
+
+
+def _delta(row: dict) -> dict:
+    return {
+        'event_id': row['id'],
+        'event_type': row['event_type'],
+        'created_at': row['created_at'],
+        'order': {
+            'id': row['order_id'],
+            'status': row['order__status'],
+            'preparation_status': row['order__preparation_status'],
+            'delay_minutes': row['order__delay_minutes'],
+            'total_amount': row['order__total_amount'],
+            'placed_at': row['order__placed_at'],
+        },
+    }
+
+
+def _fetch_after(cursor: int, restaurant_ids: List[int]) -> List[dict]:
+    return list(
+        OrderEvent.objects.filter(id__gt=cursor, order__restaurant_id__in=restaurant_ids)
+        .order_by('id')
+        .values(*_DELTA_FIELDS)[:POLL_BATCH_SIZE]
+    )
+
+
+def _latest_event_id() -> int:
+    return OrderEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+class OrderChangeFeed:
+    """Per-process fan-out of order changes to SSE subscribers."""
+
+    def __init__(self, poll_interval: float = 1.0) -> None:
+        self.poll_interval = poll_interval
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._cursor: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def subscribe(self, restaurant_id: int) -> asyncio.Queue:
+        if self._cursor is None:
+            self._cursor = await sync_to_async(_latest_event_id)()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers[restaurant_id].add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll())
+        return queue
+
+    def unsubscribe(self, restaurant_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(restaurant_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[restaurant_id]
+
+    async def _poll(self) -> None:
+        while self._subscribers:
+            try:
+                rows = await sync_to_async(_fetch_after)(self._cursor, list(self._subscribers))
+            except Exception:
+                # Every subscriber of this worker shares the poller: a failed
+                # poll (e.g. "database is locked") is retried, not fatal.
+                logger.exception('Order stream poll failed')
+                await asyncio.sleep(self.poll_interval)
+                continue
+            for row in rows:
+                self._publish(row['order__restaurant_id'], _delta(row))
+            if rows:
+                self._cursor = rows[-1]['id']
+            if len(rows) < POLL_BATCH_SIZE:
+                await asyncio.sleep(self.poll_interval)
+        # Forget the cursor so the next subscriber starts from "now".
+        self._cursor = None
+
+    def _publish(self, restaurant_id: int, delta: dict) -> None:
+        for queue in list(self._subscribers.get(restaurant_id, ())):
+            try:
+                queue.put_nowait(delta)
+            except asyncio.QueueFull:
+                # A client that cannot keep up is told to refetch its lists
+                # instead of buffering deltas without bound.
+                self.unsubscribe(restaurant_id, queue)
+                queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    async def stream(
+        self, restaurant_id: int, last_event_id: Optional[int] = None, heartbeat: float = 15.0
+    ) -> AsyncIterator[str]:
+        """Yield SSE frames for ``restaurant_id`` until the client disconnects.
+
+        With ``last_event_id`` (the ``Last-Event-ID`` header on reconnect) the
+        changes missed while disconnected are replayed first.
+        """
+        queue = await self.subscribe(restaurant_id)
+        try:
+            yield f'retry: {int(self.poll_interval * 1000)}\n\n'
+            if last_event_id is not None:
+                missed = await sync_to_async(_fetch_after)(last_event_id, [restaurant_id])
+                for row in missed:
+                    yield _frame(_delta(row))
+                if len(missed) == POLL_BATCH_SIZE:
+                    yield 'event: resync\ndata: {}\n\n'
+                    return
+                seen = missed[-1]['id'] if missed else last_event_id
+            else:
+                seen = 0
+            while True:
+                try:
+                    delta = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                if delta is RESYNC:
+                    yield 'event: resync\ndata: {}\n\n'
+                    return
+                if delta['event_id'] > seen:
+                    yield _frame(delta)
+        finally:
+            self.unsubscribe(restaurant_id, queue)
+
+
+def _frame(delta: dict) -> str:
+    data = json.dumps(delta, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f"id: {delta['event_id']}\ndata: {data}\n\n"
+
+
+feed = OrderChangeFeed(poll_interval=getattr(settings, 'ORDER_STREAM_POLL_INTERVAL', 1.0))
+
+
+async def _send_json(send, status: int, body: dict, headers: list) -> None:
+    data = json.dumps(body).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers + [(b'content-type', b'application/json'), (b'content-length', str(len(data)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': data})
+
+
+async def sse_application(scope, receive, send) -> None:
+    """ASGI app for ``GET /api/orders/stream/?restaurant_id=<id>``."""
+    headers = {key.decode('latin1').lower(): value.decode('latin1') for key, value in scope['headers']}
+    query = parse_qs(scope.get('query_string', b'').decode('latin1'))
+
+    domain, _ = split_domain_port(headers.get('host', ''))
+    if not domain or not validate_host(domain, settings.ALLOWED_HOSTS):
+        await _send_json(send, 400, {'error': 'Invalid host'}, [])
+        return
+
+    response_headers = []
+    origin = headers.get('origin')
+    if origin and origin in getattr(settings, 'CORS_ALLOWED_ORIGINS', ()):
+        response_headers += [(b'access-control-allow-origin', origin.encode('latin1')), (b'vary', b'Origin')]
+
+    if scope['method'] != 'GET':
+        await _send_json(send, 405, {'error': 'Method not allowed'}, response_headers)
+        return
+    if 'restaurant_id' not in query:
+        await _send_json(send, 400, {'error': 'restaurant_id is required'}, response_headers)
+        return
+    try:
+        restaurant_id = _parse_id(query['restaurant_id'][0])
+    except ValueError:
+        await _send_json(send, 400, {'error': 'restaurant_id must be an integer'}, response_headers)
+        return
+    last_event_id = headers.get('last-event-id') or query.get('last_event_id', [None])[0]
+    try:
+        last_event_id = _parse_id(last_event_id) if last_event_id else None
+    except ValueError:
+        await _send_json(send, 400, {'error': 'Invalid Last-Event-ID'}, response_headers)
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': response_headers + [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+
+    async def pump():
+        async with aclosing(feed.stream(restaurant_id, last_event_id)) as frames:
+            async for frame in frames:
+                await send({'type': 'http.response.body', 'body': frame.encode('utf-8'), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    pump_task = asyncio.create_task(pump())
+    disconnect_task = asyncio.create_task(wait_for_disconnect())
+    await asyncio.wait((pump_task, disconnect_task), return_when=asyncio.FIRST_COMPLETED)
+    for task in (pump_task, disconnect_task):
+        task.cancel()
+        with suppress(asyncio.CancelledError, OSError):
+            await task
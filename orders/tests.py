@@ -1 +1,1541 @@
-"""Tests placeholder file: intentionally empty."""
+import asyncio
+import base64
+import csv
+import dataclasses
+import io
+import json
+import random
+import sqlite3
+import tempfile
+import threading
+import zlib
+from asyncio import iscoroutinefunction
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from http.server import ThreadingHTTPServer
+from unittest import mock
+from urllib.request import urlopen
+
+from asgiref.sync import async_to_sync, sync_to_async
+from corsheaders.middleware import CorsMiddleware
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from django.utils import timezone
+
+from . import (
+    archive, benchmarking, counters, export, metrics, outbox, replay, replicas, rollups, sampling, stream,
+    transitions, views,
+)
+from .kyte_client import KyteClient
+from .management.commands import dispatch_kyte_outbox, generate_orders
+from .management.commands.kyte_stub_server import StubKyteHandler
+from .models import (
+    Customer, Restaurant, Order, OrderItem, OrderEvent, OrderEventArchive, HourlyRollup, KyteOutboxMessage,
+    KyteWebhookDelivery,
+)
+from .pagination import OrderCursorPagination
+from .serializers import ORDER_DETAIL_EVENTS, OrderSerializer
+
+
+class QueryPlanTests(TestCase):
+    """Checks that the hot order queries are index range scans.
+
+    Builds a dataset large enough for SQLite's planner to make realistic
+    choices (after ANALYZE), runs each endpoint, and EXPLAINs every query it
+    issued with its real bound parameters. A query fails the suite if it
+    scans a whole order table or sorts through a temp B-tree.
+    """
+    ORDERS = 30000
+    RESTAURANTS = 20
+    HOT_TABLES = ('orders', 'order_items', 'order_events')
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        restaurants = Restaurant.objects.bulk_create(
+            [Restaurant(name=f'Restaurant {i}') for i in range(cls.RESTAURANTS)]
+        )
+        customers = Customer.objects.bulk_create(
+            [Customer(first_name=f'First {i}', second_name=f'Last {i}', phone_number='0') for i in range(50)]
+        )
+        # Mostly history (delivered/cancelled), a small open tail per
+        # restaurant, like production.
+        lifecycle = [
+            (Order.OrderStatus.DELIVERED, Order.PreparationStatus.DONE, 70),
+            (Order.OrderStatus.CANCELLED, Order.PreparationStatus.CANCELLED, 10),
+            (Order.OrderStatus.CANCELLED, Order.PreparationStatus.REJECTED, 5),
+            (Order.OrderStatus.READY, Order.PreparationStatus.DONE, 4),
+            (Order.OrderStatus.CREATED, Order.PreparationStatus.ACCEPTED, 4),
+            (Order.OrderStatus.CREATED, Order.PreparationStatus.DELAYED, 2),
+            (Order.OrderStatus.CREATED, Order.PreparationStatus.PENDING, 3),
+            (Order.OrderStatus.CREATED, None, 2),
+        ]
+        states = [(s, p) for s, p, weight in lifecycle for _ in range(weight)]
+        now = timezone.now()
+        orders = []
+        for i in range(cls.ORDERS):
+            order_status, prep_status = rng.choice(states)
+            cancelled = order_status == Order.OrderStatus.CANCELLED
+            orders.append(Order(
+                restaurant=rng.choice(restaurants),
+                customer=rng.choice(customers),
+                status=order_status,
+                preparation_status=prep_status,
+                cancel_stage=rng.choice(Order.CancelStage.values) if cancelled else None,
+                cancel_source=rng.choice(Order.CancelSource.values) if cancelled else None,
+                total_amount=Decimal('20.00'),
+                placed_at=now - timedelta(minutes=i),
+            ))
+        Order.objects.bulk_create(orders, batch_size=1000)
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, menu_item='Pizza', quantity=1, unit_price=Decimal('10.00'))
+                for order in orders for _ in range(2)
+            ],
+            batch_size=2000,
+        )
+        counters.rebuild()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.restaurant_id = restaurants[0].id
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+
+    def capture(self, fn):
+        """Run ``fn`` and return the ``(sql, params)`` of every query it ran."""
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            fn()
+        return queries
+
+    def assertIndexedPlan(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[3] for row in cursor.fetchall()]
+        for step in plan:
+            self.assertNotIn('TEMP B-TREE', step, f'Sort without index:\n{sql}\n{plan}')
+            for table in self.HOT_TABLES:
+                self.assertFalse(
+                    step.startswith(f'SCAN {table}'),
+                    f'Full scan of {table}:\n{sql}\n{plan}',
+                )
+
+    def assertEndpointIndexed(self, url):
+        response = None
+
+        def fetch():
+            nonlocal response
+            response = self.client.get(url)
+
+        queries = self.capture(fetch)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertTrue(queries)
+        for sql, params in queries:
+            self.assertIndexedPlan(sql, params)
+        return response.json()
+
+    def assertPagesIndexed(self, url):
+        """First page and the keyset predicate of the next page."""
+        page = self.assertEndpointIndexed(url)
+        self.assertTrue(page['results'])
+        self.assertIsNotNone(page['next'])
+        self.assertEndpointIndexed(page['next'])
+
+    def test_list_by_restaurant(self):
+        self.assertPagesIndexed(f'/api/orders/?restaurant_id={self.restaurant_id}')
+
+    def test_list_by_restaurant_and_status(self):
+        self.assertPagesIndexed(f'/api/orders/?restaurant_id={self.restaurant_id}&status=delivered')
+
+    def test_list_by_restaurant_and_preparation_status(self):
+        self.assertPagesIndexed(f'/api/orders/?restaurant_id={self.restaurant_id}&preparation_status=done')
+
+    def test_list_by_status(self):
+        self.assertPagesIndexed('/api/orders/?status=ready')
+
+    def test_pending(self):
+        self.assertPagesIndexed(f'/api/orders/pending/?restaurant_id={self.restaurant_id}')
+
+    def test_active(self):
+        self.assertPagesIndexed(f'/api/orders/active/?restaurant_id={self.restaurant_id}')
+
+    def test_cancelled(self):
+        self.assertPagesIndexed(f'/api/orders/cancelled/?restaurant_id={self.restaurant_id}')
+
+    def test_cancelled_by_stage(self):
+        self.assertPagesIndexed(f'/api/orders/cancelled/?restaurant_id={self.restaurant_id}&stage=ready')
+
+    def test_cancelled_by_source(self):
+        self.assertPagesIndexed(f'/api/orders/cancelled/?restaurant_id={self.restaurant_id}&source=kyte')
+
+    def test_cancelled_by_stage_and_source(self):
+        self.assertPagesIndexed(
+            f'/api/orders/cancelled/?restaurant_id={self.restaurant_id}&stage=preparation&source=staff'
+        )
+
+    def test_simulate_cancel_candidates(self):
+        orders = Order.objects.filter(restaurant_id=self.restaurant_id)
+        for candidates in (orders.ready(), orders.active().open(), orders.pending().open()):
+            queries = self.capture(lambda: sampling.random_row(candidates, key='placed_at'))
+            self.assertEqual(len(queries), 3)
+            for sql, params in queries:
+                self.assertIndexedPlan(sql, params)
+
+
+class SamplingTests(TestCase):
+    """Random picks stay inside the queryset and need no full read."""
+
+    def setUp(self):
+        Customer.objects.bulk_create(
+            [Customer(first_name=f'First {i}', second_name='Last', phone_number='0') for i in range(40)]
+        )
+        self.customers = Customer.objects.filter(first_name__endswith='7')
+
+    def test_random_row(self):
+        rng = random.Random(1)
+        with self.assertNumQueries(3):
+            customer = sampling.random_row(self.customers, rng=rng)
+        self.assertIn(customer, self.customers)
+        self.assertIsNone(sampling.random_row(Customer.objects.none(), rng=rng))
+
+    def test_sample_keys(self):
+        rng = random.Random(1)
+        all_ids = sorted(Customer.objects.values_list('id', flat=True))
+        self.assertEqual(sampling.sample_keys(Customer.objects.all(), 100, rng=rng), all_ids)
+        sample = sampling.sample_keys(Customer.objects.all(), 10, rng=rng)
+        self.assertEqual(len(sample), 10)
+        self.assertTrue(set(sample) <= set(all_ids))
+
+
+class CancelOriginTests(TestCase):
+    """Cancellation stage/source are recorded by every cancel path."""
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+        restaurant = Restaurant.objects.create(name='Restaurant')
+        customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+        self.order = Order.objects.create(
+            restaurant=restaurant,
+            customer=customer,
+            preparation_status=Order.PreparationStatus.ACCEPTED,
+            placed_at=timezone.now(),
+        )
+
+    def test_staff_cancel_during_preparation(self):
+        self.client.post(f'/api/orders/{self.order.id}/mark_cancelled/', {'reason': 'Out of stock'})
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.cancel_stage, Order.CancelStage.PREPARATION)
+        self.assertEqual(self.order.cancel_source, Order.CancelSource.STAFF)
+
+    def test_kyte_cancel_after_preparation_done(self):
+        self.client.post(f'/api/orders/{self.order.id}/mark_done/')
+        self.client.post(
+            '/api/kyte/events/',
+            {'type': 'order_cancelled', 'id': 'evt-1', 'data': {'order_id': self.order.id}},
+            content_type='application/json',
+        )
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.OrderStatus.CANCELLED)
+        self.assertEqual(self.order.cancel_stage, Order.CancelStage.READY)
+        self.assertEqual(self.order.cancel_source, Order.CancelSource.KYTE)
+
+
+class OrderCountersTests(TestCase):
+    """Incremental counters stay equal to a recount after every write path."""
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+        self.restaurant = Restaurant.objects.create(name='Restaurant')
+        self.customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+
+    def create_order(self, total='10.00'):
+        response = self.client.post('/api/kyte/events/', {'type': 'order_created', 'data': {
+            'restaurant_id': self.restaurant.id,
+            'customer_id': self.customer.id,
+            'placed_at': timezone.now().isoformat(),
+            'total_amount': total,
+        }}, content_type='application/json')
+        return response.json()['order_id']
+
+    def assertCountersExact(self):
+        stored = counters.get_stats(self.restaurant.id)
+        actual = counters.compute([self.restaurant.id])[self.restaurant.id]
+        self.assertEqual(counters.drift(stored, actual), {})
+
+    def test_counters_follow_transitions(self):
+        first, second, third = self.create_order('10.00'), self.create_order('20.00'), self.create_order('5.50')
+        self.client.post(f'/api/orders/{first}/accept_preparation/')
+        self.client.post(f'/api/orders/{first}/mark_delayed/', {'delay_minutes': 5})
+        self.client.post(f'/api/orders/{first}/mark_done/')
+        self.client.post(f'/api/orders/{first}/mark_delivered/')
+        self.client.post(f'/api/orders/{second}/reject_preparation/', {'reason': 'Closed'})
+        self.client.post('/api/kyte/events/', {'type': 'order_cancelled', 'data': {'order_id': third}},
+                         content_type='application/json')
+        self.assertCountersExact()
+
+        with self.assertNumQueries(1):
+            summary = self.client.get(f'/api/restaurants/{self.restaurant.id}/summary/').json()
+        self.assertEqual(summary['badges'], {'pending': 0, 'active': 0, 'cancelled': 2})
+        self.assertEqual(summary['status']['delivered'], 1)
+        self.assertEqual(summary['revenue_today'], '10.00')
+
+    def test_counters_follow_batches_and_deletes(self):
+        existing = self.create_order()
+        events = [
+            {'type': 'order_created', 'data': {
+                'restaurant_id': self.restaurant.id,
+                'customer_id': self.customer.id,
+                'placed_at': timezone.now().isoformat(),
+                'total_amount': '7.25',
+            }}
+            for _ in range(3)
+        ]
+        events.append({'type': 'order_cancelled', 'data': {'order_id': existing}})
+        self.client.post('/api/kyte/events/', events, content_type='application/json')
+        self.assertCountersExact()
+
+        self.assertEqual(self.client.delete(f'/api/orders/{existing}/').status_code, 204)
+        self.assertCountersExact()
+        summary = self.client.get(f'/api/restaurants/{self.restaurant.id}/summary/').json()
+        self.assertEqual(summary['badges']['pending'], 3)
+        self.assertEqual(summary['revenue_today'], '21.75')
+
+    def test_summary_of_unknown_restaurant(self):
+        for pk in (999, 10 ** 20):
+            self.assertEqual(self.client.get(f'/api/restaurants/{pk}/summary/').status_code, 404)
+
+
+class HourlyRollupTests(TestCase):
+    """Rollups match the orders of each hour and follow later changes incrementally."""
+    HOUR = datetime(2026, 3, 10, 14, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+        self.restaurant = Restaurant.objects.create(name='Restaurant')
+        customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+
+        def order(minutes, total, **fields):
+            return Order.objects.create(
+                restaurant=self.restaurant, customer=customer, total_amount=Decimal(total),
+                placed_at=self.HOUR + timedelta(minutes=minutes), **fields
+            )
+
+        order(5, '10.00', preparation_status=Order.PreparationStatus.PENDING)
+        order(50, '20.00', status=Order.OrderStatus.CANCELLED, preparation_status=Order.PreparationStatus.CANCELLED)
+        accepted_at = self.HOUR + timedelta(minutes=25)
+        self.prepared = order(
+            20, '5.00', status=Order.OrderStatus.READY, preparation_status=Order.PreparationStatus.DONE,
+            accepted_at=accepted_at,
+        )
+        done = OrderEvent.objects.create(order=self.prepared, event_type='preparation_done')
+        OrderEvent.objects.filter(pk=done.pk).update(created_at=accepted_at + timedelta(minutes=12))
+        self.next_hour = order(70, '15.50')
+        # Changed well before the first refresh's watermark
+        Order.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def analytics(self, query='?from=2026-03-10&to=2026-03-11'):
+        return self.client.get(f'/api/restaurants/{self.restaurant.id}/analytics/{query}')
+
+    def test_refresh_and_analytics(self):
+        self.assertEqual(rollups.refresh(now=timezone.now() - timedelta(minutes=30)), (2, 2))
+        with self.assertNumQueries(3):
+            data = self.analytics().json()
+        self.assertEqual(data['totals'], {
+            'orders': 4, 'cancelled': 1, 'cancellation_rate': 0.25, 'revenue': '30.50',
+            'prepared': 1, 'avg_prep_seconds': 720.0,
+        })
+        self.assertEqual(
+            [(bucket['start'], bucket['orders']) for bucket in data['buckets']],
+            [('2026-03-10T14:00:00Z', 3), ('2026-03-10T15:00:00Z', 1)],
+        )
+
+        # Only the hour of the changed order is recomputed.
+        transitions.apply(self.next_hour.id, transitions.CANCEL, reason='Closed')
+        self.assertEqual(rollups.refresh(), (1, 1))
+        data = self.analytics('?from=2026-03-10&to=2026-03-11&bucket=day').json()
+        self.assertEqual(len(data['buckets']), 1)
+        self.assertEqual(data['totals']['cancelled'], 2)
+        self.assertEqual(data['totals']['revenue'], '15.00')
+
+    def test_prep_time_of_archived_events(self):
+        archive.archive_orders([self.prepared.id])
+        rollups.refresh(full=True)
+        self.assertEqual(self.analytics().json()['totals']['avg_prep_seconds'], 720.0)
+
+    def test_bad_parameters(self):
+        for query in ('?bucket=week', '?from=yesterday', '?from=2026-03-11&to=2026-03-10', '?from=2020-01-01'):
+            response = self.analytics(query)
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', response.json())
+        self.assertEqual(self.client.get('/api/restaurants/999/analytics/').status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    """ETags for order detail and restaurant lists."""
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+        self.restaurant = Restaurant.objects.create(name='Restaurant')
+        customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+        self.order = Order.objects.create(
+            restaurant=self.restaurant,
+            customer=customer,
+            preparation_status=Order.PreparationStatus.PENDING,
+            total_amount=Decimal('10.00'),
+            placed_at=timezone.now(),
+        )
+        self.item = OrderItem.objects.create(order=self.order, menu_item='Pizza', unit_price=Decimal('10.00'))
+
+    def assertRevalidates(self, url, change):
+        etag = self.client.get(url)['ETag']
+        self.assertTrue(etag.startswith('"'))
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail(self):
+        self.assertRevalidates(
+            f'/api/orders/{self.order.id}/',
+            lambda: self.client.post(f'/api/orders/{self.order.id}/accept_preparation/'),
+        )
+
+    def test_detail_after_item_change(self):
+        self.assertRevalidates(
+            f'/api/orders/{self.order.id}/',
+            lambda: self.client.patch(
+                f'/api/order-items/{self.item.id}/', {'quantity': 2}, content_type='application/json'
+            ),
+        )
+
+    def test_pending_list(self):
+        self.assertRevalidates(
+            f'/api/orders/pending/?restaurant_id={self.restaurant.id}',
+            lambda: self.client.post(f'/api/orders/{self.order.id}/accept_preparation/'),
+        )
+
+    def test_lists_have_distinct_etags(self):
+        base = f'?restaurant_id={self.restaurant.id}'
+        tags = {self.client.get(f'/api/orders/{path}{base}')['ETag'] for path in ('', 'pending/', 'active/')}
+        self.assertEqual(len(tags), 3)
+
+    def test_unknown_restaurant(self):
+        for name in ('', 'pending/', 'active/', 'cancelled/'):
+            response = self.client.get(f'/api/orders/{name}?restaurant_id=999999')
+            self.assertEqual((response.status_code, response.json()['results']), (200, []), name)
+            self.assertFalse(response.has_header('ETag'))
+
+    def test_invalid_restaurant_id(self):
+        for url in ('/api/orders/?restaurant_id=abc', '/api/orders/pending/?restaurant_id=abc',
+                    f'/api/orders/pending/?restaurant_id={10 ** 30}', '/api/orders/export/?restaurant_id=abc',
+                    f'/api/orders/{self.order.id}/?restaurant_id=1.5'):
+            response = self.client.get(url)
+            self.assertEqual((response.status_code, response.json()),
+                             (400, {'error': 'restaurant_id must be an integer'}), url)
+
+
+class OrderFieldsTests(TestCase):
+    """?fields= and ?expand= shape the order payload and what is queried for it."""
+
+    def setUp(self):
+        restaurant = Restaurant.objects.create(name='Restaurant')
+        customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+        self.order = Order.objects.create(
+            restaurant=restaurant, customer=customer, preparation_status=Order.PreparationStatus.PENDING,
+            total_amount=Decimal('10.00'), placed_at=timezone.now(),
+        )
+        OrderItem.objects.create(order=self.order, menu_item='Pizza', unit_price=Decimal('10.00'))
+        OrderEvent.objects.create(order=self.order, event_type='order_created', event_data={})
+        self.url = f'/api/orders/{self.order.id}/'
+
+    def test_sparse_detail(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url + '?fields=id,status')
+        self.assertEqual(response.json(), {'id': self.order.id, 'status': 'created'})
+        revalidated = self.client.get(self.url + '?fields=id,status', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+
+        # The order with its customer, then its items
+        with self.assertNumQueries(2):
+            data = self.client.get(self.url + '?fields=id&expand=customer,items').json()
+        self.assertEqual(list(data), ['id', 'customer', 'items'])
+        data = self.client.get(self.url + '?expand=events').json()
+        self.assertNotIn('items', data)
+        self.assertEqual(len(data['events']), 1)
+        self.assertIn('preparation_status', data)
+        self.assertEqual(set(self.client.get(self.url).json()), set(OrderSerializer.Meta.fields))
+
+        for query in ('?fields=secret', '?expand=status'):
+            response = self.client.get(self.url + query)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Unknown field(s)', response.json()['error'])
+
+    def test_event_window(self):
+        OrderEvent.objects.bulk_create([
+            OrderEvent(order=self.order, event_type='preparation_delayed', event_data={'n': i})
+            for i in range(ORDER_DETAIL_EVENTS + 4)
+        ])
+        newest = list(
+            OrderEvent.objects.filter(order=self.order).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        # Version, order with its events count, items, the window of events
+        with self.assertNumQueries(4):
+            data = self.client.get(self.url).json()
+        self.assertEqual([event['id'] for event in data['events']], newest[:ORDER_DETAIL_EVENTS])
+        self.assertEqual(data['events_count'], len(newest))
+
+        timeline = self.client.get(data['events_url']).json()
+        self.assertEqual(timeline['count'], len(newest))
+        self.assertEqual([event['id'] for event in timeline['results']], newest[:10])
+
+        archive.archive_orders([self.order.id])
+        # Archived events are counted and stay in the timeline, not in the window.
+        data = self.client.get(self.url + '?fields=events_count,events_url&expand=events').json()
+        self.assertEqual((data['events'], data['events_count']), ([], len(newest)))
+        self.assertEqual(self.client.get(data['events_url']).json()['count'], len(newest))
+
+    def test_sparse_transition_response(self):
+        response = self.client.post(self.url + 'accept_preparation/?fields=id,preparation_status')
+        self.assertEqual(response.json(), {'id': self.order.id, 'preparation_status': 'accepted'})
+
+
+class EventArchiveTests(TestCase):
+    """Events of long-closed orders move to the archive and stay readable."""
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+        restaurant = Restaurant.objects.create(name='Restaurant')
+        customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+        self.old, self.recent = [
+            Order.objects.create(
+                restaurant=restaurant, customer=customer,
+                status=Order.OrderStatus.DELIVERED, placed_at=timezone.now(),
+            )
+            for _ in range(2)
+        ]
+        for order in (self.old, self.recent):
+            for event_type in ('order_created', 'order_delivered'):
+                OrderEvent.objects.create(order=order, event_type=event_type, event_data={'order': order.id})
+        Order.objects.filter(pk=self.old.pk).update(updated_at=timezone.now() - timedelta(days=100))
+
+    def events(self, order, **params):
+        response = self.client.get('/api/order-events/', {'order_id': order.id, **params})
+        return [event['event_type'] for event in response.json()['results']]
+
+    def test_archive_and_read_back(self):
+        call_command('archive_order_events', days=90, no_vacuum=True, stdout=io.StringIO())
+        self.assertFalse(OrderEvent.objects.filter(order=self.old).exists())
+        self.assertEqual(OrderEvent.objects.filter(order=self.recent).count(), 2)
+
+        row = OrderEventArchive.objects.get(order=self.old)
+        self.assertEqual((row.event_count, row.period), (2, (timezone.now() - timedelta(days=100)).strftime('%Y-%m')))
+        self.assertEqual(self.events(self.old), [])
+        self.assertEqual(
+            self.events(self.old, include_archived='true'), ['order_delivered', 'order_created']
+        )
+
+    def test_late_events_are_merged(self):
+        call_command('archive_order_events', days=90, no_vacuum=True, stdout=io.StringIO())
+        OrderEvent.objects.create(order=self.old, event_type='note', event_data={})
+        call_command('archive_order_events', days=90, no_vacuum=True, stdout=io.StringIO())
+        self.assertEqual(OrderEventArchive.objects.get(order=self.old).event_count, 3)
+        self.assertEqual(
+            self.events(self.old, include_archived='1'), ['note', 'order_delivered', 'order_created']
+        )
+
+    def test_invalid_order_id(self):
+        for order_id in ('abc', 10 ** 20):
+            for params in ({}, {'include_archived': 'true'}):
+                response = self.client.get('/api/order-events/', {'order_id': order_id, **params})
+                self.assertEqual((response.status_code, response.json()['results']), (200, []))
+
+    def test_preset_dictionary(self):
+        # Archived rows can only be read with the dictionary they were packed with.
+        self.assertEqual(zlib.adler32(archive.ZDICT), 0xd122a2b4)
+        events = [
+            {'id': 1, 'event_type': 'order_created', 'created_at': timezone.now(), 'event_data': {
+                'restaurant_id': 7, 'customer_id': 3, 'placed_at': timezone.now().isoformat(),
+                'total_amount': '24.50', 'items': [{'menu_item': 'Soup', 'quantity': 2, 'unit_price': '12.25'}],
+            }},
+            {'id': 2, 'event_type': 'preparation_accepted', 'created_at': timezone.now(),
+             'event_data': {'accepted_at': timezone.now().isoformat()}},
+        ]
+        plain = zlib.compress(json.dumps(events, cls=DjangoJSONEncoder).encode(), 9)
+        self.assertLess(len(archive.pack(events)), len(plain) * 0.75)
+        self.assertEqual(
+            [event.event_type for event in archive.unpack(self.old.id, plain)],
+            ['order_created', 'preparation_accepted'],
+        )
+
+        # A row packed before the dictionary existed still merges with late events.
+        OrderEventArchive.objects.create(order=self.old, period='2020-01', event_count=2, data=plain)
+        archive.archive_orders([self.old.id])
+        self.assertEqual(
+            [event.id for event in archive.archived_events(self.old.id)][:2], [1, 2]
+        )
+        self.assertEqual(OrderEventArchive.objects.get(order=self.old).event_count, 4)
+
+    def test_prune_before(self):
+        call_command('archive_order_events', days=0, no_vacuum=True, stdout=io.StringIO())
+        OrderEventArchive.objects.filter(order=self.old).update(period='2020-01')
+        with self.assertRaises(CommandError):
+            call_command('archive_order_events', prune_before='2020-13', stdout=io.StringIO())
+
+        call_command('archive_order_events', prune_before='2020-02', no_vacuum=True, stdout=io.StringIO())
+        self.assertEqual(list(OrderEventArchive.objects.values_list('order', flat=True)), [self.recent.id])
+
+
+class ReplayTests(TestCase):
+    """The replay harness groups calls per endpoint and counts failures."""
+
+    def test_report(self):
+        calls = [
+            replay.Call.from_json({'method': 'get', 'path': '/api/orders/12/?x=1'}),
+            replay.Call.from_json({'type': 'order_cancelled', 'data': {'order_id': 3}}),
+            replay.Call.from_json({'path': '/api/orders/pending/', 'name': 'pending'}),
+        ]
+        self.assertEqual(
+            [call.name for call in calls],
+            ['GET /api/orders/{id}/', 'POST /api/kyte/events/', 'pending'],
+        )
+
+        class Transport:
+            def send(self, call):
+                if call.name == 'pending':
+                    raise OSError('connection reset')
+                return 404 if call.method == 'GET' else 200
+
+        report = replay.run(calls, Transport, concurrency=2, loops=3)
+        self.assertEqual((report['requests'], report['errors'], report['client_errors']), (9, 3, 3))
+        self.assertEqual(report['endpoints']['GET /api/orders/{id}/']['client_errors'], 3)
+        self.assertEqual(report['endpoints']['pending']['errors'], 3)
+        self.assertLessEqual(report['p50_ms'], report['p99_ms'])
+
+
+class BenchmarkBaselineTests(TestCase):
+    """Benchmark results regress on extra queries or slower wall time."""
+
+    def test_compare(self):
+        baseline = {'1000': {
+            'list': {'queries': 2, 'wall_ms': 10.0},
+            'detail': {'queries': 4, 'wall_ms': 10.0},
+            'summary': {'queries': 1, 'wall_ms': 1.0},
+        }}
+        results = {'1000': {
+            'list': {'queries': 3, 'wall_ms': 10.0},
+            'detail': {'queries': 4, 'wall_ms': 14.0},
+            'summary': {'queries': 1, 'wall_ms': 1.8},
+            'mark_done': {'queries': 8, 'wall_ms': 9.0},
+        }}
+        regressions = benchmarking.compare(results, baseline, threshold_pct=25)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn('list @ 1000: 2 -> 3 queries', regressions)
+        self.assertTrue(regressions[1].startswith('detail @ 1000'))
+
+
+class RequestMetricsTests(TestCase):
+    """Requests report their timings and feed the per-route histograms."""
+
+    def setUp(self):
+        metrics.REGISTRY.reset()
+        restaurant = Restaurant.objects.create(name='Restaurant')
+        customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+        self.order = Order.objects.create(restaurant=restaurant, customer=customer, placed_at=timezone.now())
+
+    def test_server_timing_and_metrics(self):
+        client = Client(HTTP_HOST='localhost')
+        response = client.post(f'/api/orders/{self.order.id}/accept_preparation/')
+        timing = response['Server-Timing']
+        for phase in ('db;dur=', 'queries"', 'view;dur=', 'render;dur=', 'total;dur='):
+            self.assertIn(phase, timing)
+        # Kyte is only called by the outbox dispatcher, never during a request.
+        self.assertNotIn('kyte', timing)
+
+        body = client.get('/api/metrics/').content.decode()
+        self.assertIn('http_request_duration_seconds_count{route="order-accept-preparation"} 1', body)
+        self.assertIn('http_requests_total{route="order-accept-preparation",status="2xx"} 1', body)
+        self.assertIn('http_request_phase_seconds_bucket{route="order-accept-preparation",phase="db",le="+Inf"} 1', body)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled(self):
+        response = Client(HTTP_HOST='localhost').get(f'/api/orders/{self.order.id}/')
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(metrics.REGISTRY.durations, {})
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    """The production profile configures each new connection."""
+
+    def test_production_options(self):
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper(
+                {**connection.settings_dict, 'NAME': f'{directory}/db.sqlite3',
+                 'OPTIONS': settings.SQLITE_PRODUCTION_OPTIONS},
+                alias='production',
+            )
+            try:
+                with wrapper.cursor() as cursor:
+                    pragmas = {}
+                    for name in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size'):
+                        cursor.execute(f'PRAGMA {name}')
+                        pragmas[name] = cursor.fetchone()[0]
+            finally:
+                wrapper.close()
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 20000,
+                                   'mmap_size': 256 * 2 ** 20})
+        self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+
+
+@override_settings(REPLICA_DATABASES=['replica1'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Safe requests read from a replica unless they, or the client shortly before, wrote."""
+    router = replicas.PrimaryReplicaRouter()
+
+    def route(self, method, cookies=None, write=False):
+        """The read databases a request's view sees before and after an optional write."""
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Order))
+            if write:
+                self.assertEqual(self.router.db_for_write(Order), 'default')
+            seen.append(self.router.db_for_read(Order))
+            return HttpResponse()
+
+        request = RequestFactory().generic(method, '/api/orders/')
+        request.COOKIES.update(cookies or {})
+        response = replicas.ReplicaRoutingMiddleware(view)(request)
+        return seen, response
+
+    def test_routing(self):
+        seen, response = self.route('GET')
+        self.assertEqual(seen, ['replica1', 'replica1'])
+        self.assertNotIn(replicas.STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.route('GET', write=True)[0], ['replica1', 'default'])
+        self.assertEqual(self.route('GET', cookies={replicas.STICKY_COOKIE: '1'})[0], ['default', 'default'])
+
+        seen, response = self.route('POST', write=True)
+        self.assertEqual(seen, ['default', 'default'])
+        self.assertEqual(response.cookies[replicas.STICKY_COOKIE]['max-age'], 5)
+        # Outside a request, e.g. in management commands
+        self.assertEqual(self.router.db_for_read(Order), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'orders'))
+        self.assertTrue(self.router.allow_migrate('default', 'orders'))
+
+    def test_cross_origin_dashboard(self):
+        # The dashboard's origin never gets the cookie back; it echoes the header instead.
+        seen = []
+
+        def view(request):
+            if request.method == 'POST':
+                self.router.db_for_write(Order)
+            seen.append(self.router.db_for_read(Order))
+            return HttpResponse()
+
+        app = CorsMiddleware(replicas.ReplicaRoutingMiddleware(view))
+        factory = RequestFactory(HTTP_ORIGIN='http://localhost:5173')
+        response = app(factory.post('/api/orders/1/accept_preparation/'))
+        until = response[replicas.STICKY_HEADER]
+        self.assertIn(replicas.STICKY_HEADER, response['Access-Control-Expose-Headers'])
+
+        preflight = app(factory.options(
+            '/api/orders/', HTTP_ACCESS_CONTROL_REQUEST_METHOD='GET',
+            HTTP_ACCESS_CONTROL_REQUEST_HEADERS='db-primary-until',
+        ))
+        self.assertIn('db-primary-until', preflight['Access-Control-Allow-Headers'])
+
+        app(factory.get('/api/orders/', HTTP_DB_PRIMARY_UNTIL=until))
+        with mock.patch('orders.replicas.time.time', return_value=float(until)):
+            app(factory.get('/api/orders/', HTTP_DB_PRIMARY_UNTIL=until))
+        app(factory.get('/api/orders/', HTTP_DB_PRIMARY_UNTIL='soon'))
+        self.assertEqual(seen, ['default', 'default', 'replica1', 'replica1'])
+
+    def test_sync_replica(self):
+        with tempfile.TemporaryDirectory() as directory:
+            primary, replica = f'{directory}/primary.sqlite3', f'{directory}/replica.sqlite3'
+            db = sqlite3.connect(primary)
+            with db:
+                db.execute('CREATE TABLE t (x)')
+                db.execute('INSERT INTO t VALUES (1)')
+            db.close()
+            replicas.sync_replica(primary, replica)
+            db = sqlite3.connect(replica)
+            try:
+                self.assertEqual(db.execute('SELECT x FROM t').fetchall(), [(1,)])
+            finally:
+                db.close()
+
+
+# URLconf with the async views in front, as under backend.asgi
+urlpatterns = [
+    path('api/', include('orders.async_views')),
+    path('', include('backend.urls')),
+]
+ASYNC_URLCONF = __name__
+
+
+class AsyncViewTests(TestCase):
+    """The async views (enabled under ASGI) answer exactly like the DRF views."""
+
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name='Restaurant')
+        self.customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+        now = timezone.now()
+        self.order = Order.objects.create(
+            restaurant=self.restaurant, customer=self.customer, preparation_status=Order.PreparationStatus.PENDING,
+            total_amount=Decimal('10.00'), placed_at=now,
+        )
+        OrderItem.objects.create(order=self.order, menu_item='Pizza', unit_price=Decimal('10.00'))
+        OrderEvent.objects.create(order=self.order, event_type='order_created', event_data={})
+        for i in range(3):
+            Order.objects.create(
+                restaurant=self.restaurant, customer=self.customer, status=Order.OrderStatus.CANCELLED,
+                cancel_source=Order.CancelSource.KYTE, placed_at=now - timedelta(minutes=i + 1),
+            )
+
+    async def test_reads_match_drf(self):
+        base = f'?restaurant_id={self.restaurant.id}'
+        paths = [
+            f'/api/orders/{base}', f'/api/orders/pending/{base}', f'/api/orders/active/{base}',
+            f'/api/orders/cancelled/{base}&source=kyte&page_size=2', f'/api/orders/{self.order.id}/',
+            '/api/orders/999999/', f'/api/restaurants/{self.restaurant.id}/summary/',
+            f'/api/restaurants/{10 ** 20}/summary/', f'/api/orders/{10 ** 20}/',
+            f'/api/orders/pending/{base}&cursor=invalid',
+            f'/api/orders/{self.order.id}/?fields=id,status&expand=items',
+            '/api/orders/?restaurant_id=999999', '/api/orders/pending/?restaurant_id=abc',
+        ]
+        for url in paths:
+            expected = await sync_to_async(self.client.get)(url)
+            with self.settings(ROOT_URLCONF=ASYNC_URLCONF):
+                response = await self.async_client.get(url)
+                self.assertTrue(iscoroutinefunction(response.resolver_match.func))
+                if response.has_header('ETag'):
+                    revalidated = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+                    self.assertEqual(revalidated.status_code, 304)
+            self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content), url)
+            self.assertEqual(response.get('ETag'), expected.get('ETag'), url)
+
+    async def test_webhook(self):
+        event = {'id': 'evt-1', 'type': 'order_created', 'data': {
+            'restaurant_id': self.restaurant.id, 'customer_id': self.customer.id,
+            'placed_at': timezone.now().isoformat(), 'items': [],
+        }}
+        with self.settings(ROOT_URLCONF=ASYNC_URLCONF):
+            first = await self.async_client.post('/api/kyte/events/', event, content_type='application/json')
+            second = await self.async_client.post('/api/kyte/events/', event, content_type='application/json')
+            invalid = await self.async_client.post('/api/kyte/events/', {'data': {}}, content_type='application/json')
+            reused = await self.async_client.post(
+                '/api/kyte/events/', {**event, 'data': {**event['data'], 'total_amount': '1.00'}},
+                content_type='application/json',
+            )
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((second.status_code, second.json()), (201, first.json()))
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(reused.status_code, 422)
+        self.assertEqual(await Order.objects.filter(restaurant=self.restaurant).acount(), 5)
+        self.assertEqual(invalid.json(), {'error': 'Missing event type'})
+        # The metrics middleware sees queries run in sync_to_async threads.
+        self.assertRegex(first['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+
+class OrderExportTests(TestCase):
+    """The export streams every matching order once, with its items, in chunks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        restaurant = Restaurant.objects.create(name='Restaurant')
+        other = Restaurant.objects.create(name='Other')
+        customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+        placed_at = datetime(2026, 3, 10, 14, tzinfo=dt_timezone.utc)
+        # Equal placed_at values straddle chunk boundaries.
+        cls.orders = Order.objects.bulk_create([
+            Order(restaurant=restaurant, customer=customer, total_amount=Decimal('10.00'),
+                  placed_at=placed_at + timedelta(minutes=i // 3))
+            for i in range(7)
+        ])
+        Order.objects.create(restaurant=other, customer=customer, placed_at=placed_at)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=name, quantity=1, unit_price=Decimal('5.00'))
+            for order in cls.orders[:-1] for name in ('Pizza', 'Soda')
+        ])
+        cls.url = f'/api/orders/export/?restaurant_id={restaurant.id}'
+
+    def test_chunks(self):
+        queryset = Order.objects.filter(restaurant_id=self.orders[0].restaurant_id)
+        # Two queries per chunk of 3, plus the empty read after the last full chunk
+        with self.assertNumQueries(6):
+            chunks = list(export.chunks(queryset, chunk_size=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+        self.assertEqual([order['id'] for chunk in chunks for order in chunk], [order.id for order in self.orders])
+        self.assertEqual(chunks[0][0]['items'], [
+            {'menu_item': 'Pizza', 'quantity': 1, 'unit_price': Decimal('5.00')},
+            {'menu_item': 'Soda', 'quantity': 1, 'unit_price': Decimal('5.00')},
+        ])
+
+        async def collect():
+            return [part async for part in export.astream(queryset, 'csv', chunk_size=3)]
+        self.assertEqual(async_to_sync(collect)(), list(export.stream(queryset, 'csv', chunk_size=3)))
+
+    def test_endpoint(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 7)
+        first = json.loads(lines[0])
+        self.assertEqual((first['restaurant_name'], first['customer_name'], first['total_amount']),
+                         ('Restaurant', 'First Last', '10.00'))
+
+        response = self.client.get(self.url + '&format=csv&to=2026-03-10T14:01:00Z')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], list(export.CSV_HEADER))
+        # Three orders with two items each
+        self.assertEqual(len(rows), 1 + 6)
+        self.assertEqual(rows[1][-3:], ['Pizza', '1', '5.00'])
+
+        self.assertEqual(self.client.get(self.url + '&format=xml').status_code, 400)
+        self.assertEqual(self.client.get(self.url + '&from=yesterday').status_code, 400)
+
+
+class TransitionTests(TestCase):
+    """Transitions are compare-and-set updates that answer 409 on conflicts."""
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+        restaurant = Restaurant.objects.create(name='Restaurant')
+        customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+        self.order = Order.objects.create(
+            restaurant=restaurant, customer=customer,
+            preparation_status=Order.PreparationStatus.PENDING, placed_at=timezone.now(),
+        )
+        counters.rebuild()
+
+    def post(self, action, data=None):
+        return self.client.post(
+            f'/api/orders/{self.order.id}/{action}/', data or {}, content_type='application/json'
+        )
+
+    def test_wrong_state_is_a_conflict(self):
+        self.assertEqual(self.post('accept_preparation').status_code, 200)
+        response = self.post('accept_preparation')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'error': 'Only pending orders can be accepted'})
+        self.assertEqual(self.post('mark_delivered').status_code, 409)
+        self.assertEqual(self.order.events.filter(event_type='preparation_accepted').count(), 1)
+
+    def test_unknown_order(self):
+        for pk in (999999, 10 ** 20):
+            response = self.client.post(f'/api/orders/{pk}/accept_preparation/')
+            self.assertEqual(response.status_code, 404)
+
+    def test_concurrent_change_is_a_conflict(self):
+        def racing_build(order, now):
+            # Another request rejects the order between the read and the update.
+            Order.objects.filter(pk=order.pk).update(preparation_status=Order.PreparationStatus.REJECTED)
+            return transitions.ACCEPT.build(order, now)
+
+        with self.assertRaises(transitions.Conflict):
+            transitions.apply(self.order.id, dataclasses.replace(transitions.ACCEPT, build=racing_build))
+        self.assertFalse(self.order.events.exists())
+        self.assertFalse(KyteOutboxMessage.objects.exists())
+        self.assertEqual(counters.get_stats(self.order.restaurant_id).prep_pending, 1)
+
+    def test_update_writes_only_changed_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            transitions.apply(self.order.id, transitions.ACCEPT)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "orders"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('total_amount', updates[0].split('WHERE')[0])
+        self.assertIn('"preparation_status" = \'pending\'', updates[0].split('WHERE')[1])
+
+    def test_delays_accumulate(self):
+        self.post('accept_preparation')
+        self.post('mark_delayed', {'delay_minutes': 10})
+        response = self.post('mark_delayed', {'delay_minutes': 5, 'reason': 'Busy'})
+        self.assertEqual(response.json()['delay_minutes'], 15)
+        self.assertEqual(len(response.json()['events']), 3)
+        stats = counters.get_stats(self.order.restaurant_id)
+        self.assertEqual((stats.prep_pending, stats.prep_delayed), (0, 1))
+
+    def test_bulk_transition(self):
+        pending = [
+            Order.objects.create(
+                restaurant_id=self.order.restaurant_id, customer_id=self.order.customer_id,
+                preparation_status=Order.PreparationStatus.PENDING, placed_at=timezone.now(),
+            ).id
+            for _ in range(10)
+        ]
+        self.post('accept_preparation')
+        order_ids = [pending[0], self.order.id, 999999] + pending[1:]
+
+        with self.assertNumQueries(7):
+            response = self.client.post(
+                '/api/orders/bulk_transition/',
+                {'action': 'accept_preparation', 'order_ids': order_ids},
+                content_type='application/json',
+            )
+        body = response.json()
+        self.assertEqual((body['processed'], body['failed']), (10, 2))
+        self.assertEqual(body['results'][0], {'order_id': pending[0], 'status': 'ok'})
+        self.assertEqual(body['results'][1]['error'], 'Only pending orders can be accepted')
+        self.assertEqual(body['results'][2]['error'], 'Order not found')
+        self.assertEqual(
+            Order.objects.filter(pk__in=pending, preparation_status=Order.PreparationStatus.ACCEPTED).count(), 10
+        )
+        self.assertEqual(OrderEvent.objects.filter(event_type='preparation_accepted').count(), 11)
+        self.assertEqual(KyteOutboxMessage.objects.count(), 11)
+        self.assertEqual(counters.get_stats(self.order.restaurant_id).prep_accepted, 11)
+
+    def test_bulk_transition_validates_params(self):
+        response = self.client.post(
+            '/api/orders/bulk_transition/',
+            {'action': 'mark_cancelled', 'order_ids': [self.order.id]},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Cancellation reason is required'})
+
+        for order_ids in ([self.order.id, 10 ** 20], [True], []):
+            response = self.client.post(
+                '/api/orders/bulk_transition/',
+                {'action': 'accept_preparation', 'order_ids': order_ids},
+                content_type='application/json',
+            )
+            self.assertEqual(response.json(), {'error': 'order_ids must be a non-empty list of ids'})
+        self.assertFalse(self.order.events.exists())
+
+
+class WebhookBatchTests(TestCase):
+    """A batch reports bad events in ``results`` and costs the same queries at any size."""
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+        self.restaurant = Restaurant.objects.create(name='Restaurant')
+        self.customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+
+    def created(self, **data):
+        return {'type': 'order_created', 'data': {
+            'restaurant_id': self.restaurant.id,
+            'customer_id': self.customer.id,
+            'placed_at': '2026-03-10T12:00:00Z',
+            'total_amount': '12.50',
+            'items': [{'menu_item': 'Pizza', 'quantity': 2, 'unit_price': 6.25}],
+            **data,
+        }}
+
+    def post(self, events):
+        return self.client.post('/api/kyte/events/', events, content_type='application/json')
+
+    def test_bad_events_do_not_reject_the_batch(self):
+        bad = [
+            self.created(total_amount='NaN'),
+            self.created(total_amount='1e12'),
+            self.created(total_amount='10.005'),
+            self.created(items=[{'menu_item': None}]),
+            self.created(items=[{'menu_item': 'Pizza', 'unit_price': 1e15}]),
+            self.created(items='Pizza'),
+            self.created(restaurant_id=10 ** 30),
+            self.created(placed_at='2026-13-45T00:00:00'),
+            {'type': 'order_cancelled', 'data': {'order_id': 10 ** 30}},
+        ]
+        response = self.post([self.created()] + bad)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['processed'], body['failed']), (1, len(bad)))
+        self.assertEqual([result['status'] for result in body['results'][1:]], ['error'] * len(bad))
+        self.assertIn('total_amount', body['results'][2]['error'])
+        self.assertIn('items[0].menu_item', body['results'][4]['error'])
+
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount, Decimal('12.50'))
+        self.assertEqual(list(order.items.values_list('unit_price', flat=True)), [Decimal('6.25')])
+        response = self.client.get(f'/api/orders/?restaurant_id={self.restaurant.id}')
+        self.assertEqual(response.status_code, 200)
+
+    def test_single_event_is_validated(self):
+        response = self.client.post('/api/kyte/events/', self.created(total_amount='1e12'),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/kyte/events/', {'type': 'order_cancelled', 'data': {'order_id': 10 ** 30}},
+                                    content_type='application/json')
+        self.assertEqual(response.json(), {'error': 'Order not found'})
+        self.assertFalse(Order.objects.exists())
+
+    def test_queries_per_batch(self):
+        def batch(size):
+            existing = [self.post(self.created()).json()['order_id'] for _ in range(size)]
+            events = [self.created() for _ in range(size)]
+            events += [{'type': 'order_cancelled', 'data': {'order_id': order_id}} for order_id in existing]
+            events += [self.created(total_amount='NaN')]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.post(events).json()['failed'], 1)
+            return len(queries)
+
+        # Lookups, bulk writes, counters and savepoints; none per event.
+        self.assertEqual(batch(2), 12)
+        self.assertEqual(batch(20), 12)
+
+
+class OrderPaginationTests(TestCase):
+    """Keyset pages over ``(placed_at, id)`` round-trip through next and previous links."""
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+        restaurant = Restaurant.objects.create(name='Restaurant')
+        customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+        base = datetime(2026, 3, 10, 12, tzinfo=dt_timezone.utc)
+        # Runs of equal timestamps, so page boundaries fall inside ties.
+        Order.objects.bulk_create([
+            Order(restaurant=restaurant, customer=customer, placed_at=base + timedelta(minutes=n // 3))
+            for n in range(11)
+        ])
+        self.expected = list(Order.objects.order_by('-placed_at', '-id').values_list('id', flat=True))
+
+    def page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [row['id'] for row in data['results']], data['next'], data['previous']
+
+    def test_next_and_previous_round_trip(self):
+        pages, url = [], '/api/orders/?page_size=2'
+        while url:
+            ids, url, previous = self.page(url)
+            pages.append((ids, previous))
+        self.assertEqual([id_ for ids, _ in pages for id_ in ids], self.expected)
+        self.assertEqual([len(ids) for ids, _ in pages], [2, 2, 2, 2, 2, 1])
+        self.assertIsNone(pages[0][1])
+
+        back, url = [], pages[-1][1]
+        while url:
+            ids, _, url = self.page(url)
+            back.append(ids)
+        self.assertEqual(back, [ids for ids, _ in pages[-2::-1]])
+
+    def test_page_size_is_clamped(self):
+        self.assertEqual(len(self.page('/api/orders/?page_size=0')[0]), 10)
+        self.assertEqual(len(self.page('/api/orders/?page_size=abc')[0]), 10)
+        with mock.patch.object(OrderCursorPagination, 'max_page_size', 4):
+            self.assertEqual(len(self.page('/api/orders/?page_size=1000')[0]), 4)
+
+    def test_invalid_cursors(self):
+        def cursor(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        for value in ('not-base64!', cursor(['x']), cursor({'p': 'yesterday', 'i': 1}),
+                      cursor({'p': '2026-03-10T12:00:00Z', 'i': 10 ** 30}), cursor({'p': '2026-03-10T12:00:00Z'})):
+            response = self.client.get(f'/api/orders/pending/?cursor={value}')
+            self.assertEqual((response.status_code, response.json()), (400, {'detail': 'Invalid cursor'}), value)
+
+    def test_no_count_query(self):
+        # Each page, first or deep, is its one keyset query.
+        with self.assertNumQueries(1):
+            _, next_url, _ = self.page('/api/orders/?page_size=2')
+        with self.assertNumQueries(1):
+            self.page(next_url)
+
+
+class KyteOutboxTests(TestCase):
+    """Outbox messages commit with the order and reach the stub Kyte server in batches."""
+
+    def setUp(self):
+        restaurant = Restaurant.objects.create(name='Restaurant')
+        customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+        self.order = Order.objects.create(
+            restaurant=restaurant, customer=customer,
+            preparation_status=Order.PreparationStatus.PENDING, placed_at=timezone.now(),
+        )
+        counters.rebuild()
+
+    def start_stub(self, fail_rate=0.0):
+        """The ``kyte_stub_server`` handler on a free port; returns ``(client, requests)``."""
+        requests = []
+
+        class Handler(StubKyteHandler):
+            stdout = io.StringIO()
+
+            def do_POST(self):
+                requests.append(self.client_address)
+                super().do_POST()
+
+        Handler.fail_rate = fail_rate
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        client = KyteClient(base_url=f'http://127.0.0.1:{server.server_port}', timeout=5)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.addCleanup(client.close)
+        return client, requests
+
+    def test_enqueued_in_the_order_transaction(self):
+        with mock.patch.object(counters, 'apply', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                transitions.apply(self.order.id, transitions.ACCEPT)
+        self.assertFalse(KyteOutboxMessage.objects.exists())
+
+        transitions.apply(self.order.id, transitions.ACCEPT)
+        message = KyteOutboxMessage.objects.get()
+        self.assertEqual((message.event, message.payload), ('preparation_accepted', {'order_id': self.order.id}))
+
+    def test_delivery_in_batches(self):
+        client, requests = self.start_stub()
+        outbox.enqueue_many([('preparation_done', {'order_id': n}) for n in range(5)])
+        self.assertEqual(outbox.dispatch_batch(client, batch_size=2), (2, 0))
+        self.assertEqual(outbox.dispatch_batch(client, batch_size=2), (2, 0))
+        self.assertEqual(outbox.dispatch_batch(client, batch_size=2), (1, 0))
+        self.assertEqual(outbox.dispatch_batch(client, batch_size=2), (0, 0))
+
+        sent = KyteOutboxMessage.objects.all()
+        self.assertEqual({(m.status, m.attempts) for m in sent}, {(KyteOutboxMessage.Status.SENT, 1)})
+        self.assertTrue(all(m.sent_at for m in sent))
+        # One kept-alive connection (same client port) for all three requests.
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(len(set(requests)), 1)
+
+    def test_non_2xx_is_retried_with_backoff(self):
+        client, requests = self.start_stub(fail_rate=1.0)
+        outbox.enqueue('preparation_done', {'order_id': self.order.id})
+        before = timezone.now()
+        with self.assertLogs('orders.outbox', 'WARNING'):
+            self.assertEqual(outbox.dispatch_batch(client), (0, 1))
+
+        message = KyteOutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), (KyteOutboxMessage.Status.PENDING, 1))
+        self.assertIn('503', message.last_error)
+        delay = (message.available_at - before).total_seconds()
+        self.assertTrue(outbox.BACKOFF_BASE_SECONDS / 2 <= delay <= outbox.BACKOFF_BASE_SECONDS + 1, delay)
+        # Not due again until the backoff has passed.
+        self.assertEqual(outbox.dispatch_batch(client), (0, 0))
+        self.assertEqual(len(requests), 1)
+
+    def test_failed_after_max_attempts(self):
+        client, requests = self.start_stub(fail_rate=1.0)
+        outbox.enqueue('preparation_done', {'order_id': self.order.id})
+        for _ in range(3):
+            KyteOutboxMessage.objects.update(available_at=timezone.now())
+            with self.assertLogs('orders.outbox', 'WARNING'):
+                self.assertEqual(outbox.dispatch_batch(client, max_attempts=3), (0, 1))
+        message = KyteOutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), (KyteOutboxMessage.Status.FAILED, 3))
+        KyteOutboxMessage.objects.update(available_at=timezone.now())
+        self.assertEqual(outbox.dispatch_batch(client, max_attempts=3), (0, 0))
+        self.assertEqual(len(requests), 3)
+
+    def test_dispatch_metrics(self):
+        metrics.REGISTRY.reset()
+        self.addCleanup(metrics.REGISTRY.reset)
+        outbox.enqueue_many([('preparation_done', {'order_id': n}) for n in range(3)])
+        outbox.dispatch_batch(self.start_stub()[0])
+        outbox.enqueue('preparation_done', {'order_id': self.order.id})
+        with self.assertLogs('orders.outbox', 'WARNING'):
+            outbox.dispatch_batch(self.start_stub(fail_rate=1.0)[0])
+
+        # Served by the dispatcher process, which has no Django views.
+        server = ThreadingHTTPServer(('127.0.0.1', 0), dispatch_kyte_outbox.MetricsHandler)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        with urlopen(f'http://127.0.0.1:{server.server_port}/metrics') as response:
+            body = response.read().decode()
+        for line in (
+            'kyte_dispatch_duration_seconds_count{outcome="sent"} 1',
+            'kyte_dispatch_duration_seconds_count{outcome="failed"} 1',
+            'kyte_dispatch_messages_total{outcome="sent"} 3',
+            'kyte_dispatch_messages_total{outcome="failed"} 1',
+        ):
+            self.assertIn(line, body)
+
+
+class WebhookIdempotencyTests(TestCase):
+    """Each idempotency key runs its event once; redeliveries replay the stored response."""
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+        self.restaurant = Restaurant.objects.create(name='Restaurant')
+        self.customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+
+    def event(self, event_id=None, **data):
+        event = {'type': 'order_created', 'data': {
+            'restaurant_id': self.restaurant.id, 'customer_id': self.customer.id,
+            'placed_at': '2026-03-10T12:00:00Z', 'total_amount': '10.00', **data,
+        }}
+        if event_id:
+            event['id'] = event_id
+        return event
+
+    def post(self, body, key=None):
+        headers = {'Idempotency-Key': key} if key else {}
+        return self.client.post('/api/kyte/events/', body, content_type='application/json', headers=headers)
+
+    def test_replay_writes_nothing(self):
+        first = self.post(self.event('evt-1'))
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(1):
+            second = self.post(self.event('evt-1'))
+        self.assertEqual((second.status_code, second.json()), (201, first.json()))
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_header_takes_precedence_over_body_id(self):
+        first = self.post(self.event('evt-1'), key='key-1')
+        self.assertEqual(KyteWebhookDelivery.objects.get().idempotency_key, 'key-1')
+        # Same header, another body id: still the same delivery.
+        self.assertEqual(self.post(self.event('evt-2'), key='key-1').json(), first.json())
+        # The body id alone was never recorded, so this is a new event.
+        self.assertEqual(self.post(self.event('evt-1')).status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_key_reused_for_another_event(self):
+        self.post(self.event('evt-1'))
+        response = self.post(self.event('evt-1', total_amount='99.00'))
+        self.assertEqual((response.status_code, response.json()), (422, {'error': views.KEY_REUSED}))
+        self.assertNotIn('Idempotent-Replayed', response)
+
+        batch = self.post([self.event('evt-1'), self.event('evt-1', total_amount='99.00'),
+                           self.event('evt-2'), self.event('evt-2', total_amount='5.00')]).json()
+        self.assertEqual([r['status'] for r in batch['results']], ['ok', 'error', 'ok', 'error'])
+        self.assertTrue(batch['results'][0]['replayed'])
+        self.assertEqual(batch['results'][3]['error'], views.KEY_REUSED)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_concurrent_duplicate_replays_the_winner(self):
+        winner = self.post(self.event('evt-1')).json()
+        # A duplicate that passed the lookup before the winner committed: its
+        # delivery insert hits the unique key and its writes roll back.
+        call = views.parse_webhook(self.event('evt-1'))
+        self.assertEqual(views.run_webhook(call), (winner, 201, True))
+        self.assertEqual(Order.objects.count(), 1)
+
+        other = views.parse_webhook(self.event('evt-1', total_amount='99.00'))
+        self.assertEqual(views.run_webhook(other)[1:], (422, False))
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class SSEClient:
+    """Drives ``stream.sse_application`` like an ASGI server would for one connection."""
+
+    def __init__(self, query='', headers=(), host=b'localhost'):
+        self.messages = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': stream.STREAM_PATH, 'query_string': query.encode(),
+            'headers': [(b'host', host), *headers],
+        }
+        self.task = asyncio.create_task(stream.sse_application(scope, self.receive, self.messages.put))
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def start(self):
+        message = await asyncio.wait_for(self.messages.get(), 5)
+        return message['status'], dict(message['headers'])
+
+    async def frame(self):
+        """The next SSE frame, skipping keep-alives; '' once the stream has ended."""
+        while True:
+            message = await asyncio.wait_for(self.messages.get(), 5)
+            text = message['body'].decode()
+            if not text.startswith(':'):
+                return text
+
+    async def close(self):
+        self.disconnected.set()
+        await asyncio.wait_for(self.task, 5)
+
+
+class OrderStreamTests(TestCase):
+    """The SSE feed delivers each restaurant its own changes, replays and resyncs."""
+
+    def setUp(self):
+        customer = Customer.objects.create(first_name='First', second_name='Last', phone_number='0')
+        self.orders = [
+            Order.objects.create(
+                restaurant=Restaurant.objects.create(name=name), customer=customer, placed_at=timezone.now(),
+            )
+            for name in ('Restaurant', 'Other')
+        ]
+        self.restaurant_id = self.orders[0].restaurant_id
+        self.feed = stream.OrderChangeFeed(poll_interval=0.01)
+        patcher = mock.patch.object(stream, 'feed', self.feed)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def change(self, order, event_type='preparation_accepted', count=1):
+        """Record ``count`` events in one statement; returns the id of the last."""
+        events = [OrderEvent(order=order, event_type=event_type, event_data={}) for _ in range(count)]
+        return (await OrderEvent.objects.abulk_create(events))[-1].id
+
+    async def connect(self, headers=()):
+        client = SSEClient(f'restaurant_id={self.restaurant_id}', headers)
+        status_code, headers = await client.start()
+        self.assertEqual((status_code, headers[b'content-type']), (200, b'text/event-stream'))
+        self.assertTrue((await client.frame()).startswith('retry: '))
+        return client
+
+    async def disconnect(self, client):
+        await client.close()
+        # The poller stops once its last subscriber has gone.
+        await asyncio.wait_for(self.feed._task, 5)
+
+    def event_id(self, frame):
+        self.assertTrue(frame.startswith('id: '), frame)
+        return json.loads(frame.split('data: ', 1)[1])['event_id']
+
+    async def test_deltas_per_restaurant(self):
+        client = await self.connect()
+        await self.change(self.orders[1])
+        mine = await self.change(self.orders[0])
+        frame = await client.frame()
+        self.assertEqual(self.event_id(frame), mine)
+        self.assertEqual(json.loads(frame.split('data: ', 1)[1])['order']['id'], self.orders[0].id)
+        await self.disconnect(client)
+
+    async def test_replay_from_last_event_id(self):
+        seen = await self.change(self.orders[0])
+        missed = [await self.change(order) for order in (self.orders[0], self.orders[1], self.orders[0])]
+        client = await self.connect([(b'last-event-id', str(seen).encode())])
+        self.assertEqual([self.event_id(await client.frame()) for _ in range(2)], [missed[0], missed[2]])
+        live = await self.change(self.orders[0], 'preparation_done')
+        self.assertEqual(self.event_id(await client.frame()), live)
+        await self.disconnect(client)
+
+    async def test_resync_when_the_queue_overflows(self):
+        with mock.patch.object(stream, 'QUEUE_SIZE', 2):
+            client = await self.connect()
+        last = await self.change(self.orders[0], count=3)
+        # One poll publishes all three: the oldest is dropped for the resync marker.
+        self.assertEqual(self.event_id(await client.frame()), last - 1)
+        self.assertEqual(await client.frame(), 'event: resync\ndata: {}\n\n')
+        self.assertEqual(await client.frame(), '')
+        await self.disconnect(client)
+
+    async def test_poll_failures_are_retried(self):
+        fetch_after = stream._fetch_after
+        failures = [OperationalError('database is locked')]
+
+        def flaky(*args):
+            if failures:
+                raise failures.pop()
+            return fetch_after(*args)
+
+        with mock.patch.object(stream, '_fetch_after', flaky), self.assertLogs('orders.stream', 'ERROR'):
+            client = await self.connect()
+            mine = await self.change(self.orders[0])
+            self.assertEqual(self.event_id(await client.frame()), mine)
+        self.assertEqual(failures, [])
+        await self.disconnect(client)
+
+    async def test_rejected_requests(self):
+        for client, expected in [
+            (SSEClient(f'restaurant_id={self.restaurant_id}', host=b'evil.example'), {'error': 'Invalid host'}),
+            (SSEClient(''), {'error': 'restaurant_id is required'}),
+            (SSEClient(f'restaurant_id={10 ** 20}'), {'error': 'restaurant_id must be an integer'}),
+            (SSEClient(f'restaurant_id={self.restaurant_id}', [(b'last-event-id', str(10 ** 20).encode())]),
+             {'error': 'Invalid Last-Event-ID'}),
+            (SSEClient('restaurant_id=abc', [(b'origin', b'http://localhost:5173')]),
+             {'error': 'restaurant_id must be an integer'}),
+        ]:
+            await client.task
+            status_code, headers = await client.start()
+            self.assertEqual((status_code, json.loads((await client.messages.get())['body'])), (400, expected))
+        self.assertEqual(headers[b'access-control-allow-origin'], b'http://localhost:5173')
+        self.assertIsNone(self.feed._task)
+
+
+class GenerateOrdersTests(TestCase):
+    """``generate_orders --bulk`` is reproducible from its seed and writes consistent orders."""
+
+    def setUp(self):
+        for name in ('Pizza Paradise', 'Burger Barn'):
+            Restaurant.objects.create(name=name)
+        Customer.objects.bulk_create(
+            Customer(first_name=f'First {n}', second_name='Last', phone_number=str(n)) for n in range(20)
+        )
+        self.now = datetime(2026, 3, 10, 12, tzinfo=dt_timezone.utc)
+
+    def generate(self, **options):
+        with mock.patch.object(timezone, 'now', return_value=self.now):
+            call_command('generate_orders', bulk=True, count=60, chunk_size=25, seed=7, days=2,
+                         with_events=True, stdout=io.StringIO(), **options)
+
+    def snapshot(self):
+        """Generated data without ids, which depend on what the table held before."""
+        orders = Order.objects.order_by('id').prefetch_related('items', 'events')
+        return [
+            (
+                order.restaurant_id, order.customer_id, order.status, order.preparation_status,
+                order.total_amount, order.placed_at, order.accepted_at, order.cancelled_at, order.updated_at,
+                [(item.menu_item, item.quantity, item.unit_price) for item in order.items.all()],
+                sorted((event.event_type, event.created_at) for event in order.events.all()),
+            )
+            for order in orders
+        ]
+
+    def test_same_seed_same_data(self):
+        self.generate()
+        first = self.snapshot()
+        Order.objects.all().delete()
+        self.generate()
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(len(first), 60)
+
+    def test_totals_match_items(self):
+        self.generate()
+        for order in Order.objects.prefetch_related('items'):
+            items = list(order.items.all())
+            self.assertTrue(items)
+            self.assertEqual(order.total_amount, sum(item.quantity * item.unit_price for item in items))
+            created = order.events.get(event_type='order_created')
+            self.assertEqual(created.event_data['total_amount'], str(order.total_amount))
+
+    def test_rollups_include_bulk_orders(self):
+        with mock.patch.object(timezone, 'now', return_value=self.now):
+            rollups.refresh()
+        self.generate()
+        self.assertEqual(sum(HourlyRollup.objects.values_list('order_count', flat=True)), 60)
+        self.assertEqual(
+            sum(HourlyRollup.objects.values_list('revenue', flat=True)),
+            sum(Order.objects.exclude(status=Order.OrderStatus.CANCELLED).values_list('total_amount', flat=True)),
+        )
+
+    def test_orders_written_between_chunks(self):
+        # Another writer (here: the webhook) inserting while chunks are
+        # written must neither collide with nor shift the generated ids.
+        command = generate_orders.Command(stdout=io.StringIO())
+        restaurant = Restaurant.objects.first()
+        customer = Customer.objects.first()
+        tasks = [
+            (7, index, 10, self.now - timedelta(days=1), timedelta(hours=1), self.now,
+             [(restaurant.id, [('Pizza', Decimal('10.00'))])], [customer.id], True)
+            for index in range(3)
+        ]
+
+        def chunks():
+            for task in tasks:
+                yield generate_orders.generate_chunk(task)
+                Order.objects.create(restaurant=restaurant, customer=customer, placed_at=self.now)
+
+        command.insert_chunks(chunks(), {'orders': 0, 'items': 0, 'events': 0}, 0)
+        self.assertEqual(Order.objects.count(), 33)
+        self.assertFalse(Order.objects.filter(items__isnull=True).exclude(placed_at=self.now).exists())
+        self.assertFalse(Order.objects.filter(placed_at=self.now, items__isnull=False).exists())
@@ -0,0 +1,230 @@
+"""Order state transitions as compare-and-set UPDATEs.
+
+A transition reads the few columns it depends on, checks that it applies to
+that state, then writes only the columns it changes with
+``UPDATE ... WHERE id = ? AND status = ? AND preparation_status = ?``. If a
+concurrent request moved the order first, no row matches and the transition
+fails with ``Conflict`` instead of overwriting it. The order event, the Kyte
+outbox message and the counters are written in the same transaction.
+
+The read happens before the transaction, so the transaction opens with its
+write; the UPDATE's condition is what guarantees the state it was checked
+against. The old state has to be read at all because the counters need it,
+and SQLite's ``RETURNING`` only sees new values.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.expressions import Combinable
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import counters, outbox
+from .models import Order, OrderEvent
+
+
+# Columns a transition decides on or the counters need.
+STATE_FIELDS = (
+    'restaurant_id', 'status', 'preparation_status', 'placed_at', 'total_amount',
+    'cancel_stage', 'cancel_source',
+)
+CLOSED_STATUSES = (Order.OrderStatus.DELIVERED, Order.OrderStatus.CANCELLED)
+Prep = Order.PreparationStatus
+
+# (column changes, event data, Kyte notification payload or None)
+Changes = Tuple[Dict[str, Any], Dict[str, Any], Optional[Dict[str, Any]]]
+
+
+class Conflict(Exception):
+    """The order is not in a state the transition applies to (any more)."""
+
+
+@dataclass(frozen=True)
+class Transition:
+    """``build(order, now, **params)`` returns the ``Changes`` for ``order``."""
+    event: str
+    allowed: Callable[[Order], bool]
+    error: str
+    build: Callable[..., Changes]
+
+
+def _open(order: Order) -> bool:
+    return order.status not in CLOSED_STATUSES
+
+
+def _pending(order: Order) -> bool:
+    return _open(order) and order.preparation_status in (None, Prep.PENDING)
+
+
+def _in_preparation(order: Order) -> bool:
+    return _open(order) and order.preparation_status in (Prep.ACCEPTED, Prep.DELAYED)
+
+
+def _accept(order, now):
+    return (
+        {'preparation_status': Prep.ACCEPTED, 'accepted_at': now},
+        {'accepted_at': now.isoformat()},
+        {'order_id': order.pk},
+    )
+
+
+def _reject(order, now, reason):
+    order.set_cancel_origin(Order.CancelSource.STAFF)
+    return (
+        {
+            'preparation_status': Prep.REJECTED,
+            'rejection_reason': reason,
+            'status': Order.OrderStatus.CANCELLED,
+            'cancelled_at': now,
+            'cancel_stage': order.cancel_stage,
+            'cancel_source': order.cancel_source,
+        },
+        {'reason': reason, 'rejected_at': now.isoformat()},
+        {'order_id': order.pk, 'reason': reason},
+    )
+
+
+def _delay(order, now, delay_minutes, reason=''):
+    notification = {'order_id': order.pk, 'delay_minutes': delay_minutes}
+    if reason:
+        notification['reason'] = reason
+    return (
+        {
+            'preparation_status': Prep.DELAYED,
+            # Added in SQL: two delays of the same order must both count.
+            'delay_minutes': Coalesce(F('delay_minutes'), Value(0)) + delay_minutes,
+        },
+        {'delay_minutes': delay_minutes, 'reason': reason, 'delayed_at': now.isoformat()},
+        notification,
+    )
+
+
+def _cancel(order, now, reason):
+    order.set_cancel_origin(Order.CancelSource.STAFF)
+    return (
+        {
+            'preparation_status': Prep.CANCELLED,
+            'status': Order.OrderStatus.CANCELLED,
+            'cancelled_at': now,
+            'rejection_reason': reason,
+            'cancel_stage': order.cancel_stage,
+            'cancel_source': order.cancel_source,
+        },
+        {'reason': reason, 'cancelled_at': now.isoformat()},
+        {'order_id': order.pk, 'reason': reason},
+    )
+
+
+def _done(order, now):
+    return (
+        {'preparation_status': Prep.DONE, 'status': Order.OrderStatus.READY},
+        {'completed_at': now.isoformat()},
+        {'order_id': order.pk},
+    )
+
+
+def _deliver(order, now):
+    return (
+        {'status': Order.OrderStatus.DELIVERED, 'delivered_at': now},
+        {'delivered_at': now.isoformat()},
+        None,
+    )
+
+
+ACCEPT = Transition('preparation_accepted', _pending, 'Only pending orders can be accepted', _accept)
+REJECT = Transition('preparation_rejected', _pending, 'Only pending orders can be rejected', _reject)
+DELAY = Transition(
+    'preparation_delayed', _in_preparation, 'Only orders in preparation can be delayed', _delay
+)
+CANCEL = Transition('preparation_cancelled', _open, 'Order is already closed', _cancel)
+DONE = Transition(
+    'preparation_done', _in_preparation, 'Order must be accepted before marking as done', _done
+)
+DELIVER = Transition(
+    'order_delivered',
+    lambda order: order.status == Order.OrderStatus.READY,
+    'Order must be ready before marking as delivered',
+    _deliver,
+)
+
+
+NOT_FOUND = 'Order not found'
+CHANGED = 'Order was changed by another request'
+
+
+def apply(order_id: int, transition: Transition, now: Optional[datetime] = None, **params) -> None:
+    """Run ``transition`` on one order.
+
+    Raises ``Order.DoesNotExist`` for an unknown order and ``Conflict`` if the
+    order is, or concurrently became, in a state the transition does not apply to.
+    """
+    error = apply_many([order_id], transition, now, **params)[order_id]
+    if error == NOT_FOUND:
+        raise Order.DoesNotExist(error)
+    if error:
+        raise Conflict(error)
+
+
+def apply_many(order_ids: List[int], transition: Transition, now: Optional[datetime] = None,
+               **params) -> Dict[int, Optional[str]]:
+    """Run ``transition`` on several orders; returns ``{order_id: error or None}``.
+
+    The orders are read with one query. Orders in the same state are updated
+    with a single UPDATE, and the events, outbox messages and counters are
+    written in bulk, all in one transaction. An order that fails does not
+    stop the others.
+    """
+    now = now or timezone.now()
+    orders = Order.objects.only(*STATE_FIELDS).in_bulk(order_ids)
+    errors: Dict[int, Optional[str]] = {order_id: NOT_FOUND for order_id in order_ids if order_id not in orders}
+    built = {}
+    # Orders with equal state inputs get equal changes: one UPDATE per group.
+    groups: Dict[tuple, List[int]] = defaultdict(list)
+    for order in orders.values():
+        if not transition.allowed(order):
+            errors[order.pk] = transition.error
+            continue
+        key = (order.status, order.preparation_status, order.cancel_stage, order.cancel_source)
+        before = counters.state(order)
+        built[order.pk] = (order, before, *transition.build(order, now, **params))
+        groups[key].append(order.pk)
+    if not groups:
+        return errors
+
+    with transaction.atomic():
+        applied = []
+        for (order_status, preparation_status, _, _), ids in groups.items():
+            changes = built[ids[0]][2]
+            updated = Order.objects.filter(
+                pk__in=ids, status=order_status, preparation_status=preparation_status,
+            ).update(updated_at=now, **changes)
+            if updated < len(ids):
+                # Rows we updated carry our timestamp; the rest changed meanwhile.
+                ours = set(Order.objects.filter(pk__in=ids, updated_at=now).values_list('pk', flat=True))
+                errors.update({pk: CHANGED for pk in ids if pk not in ours})
+                ids = [pk for pk in ids if pk in ours]
+            applied += ids
+
+        OrderEvent.objects.bulk_create([
+            OrderEvent(order_id=pk, event_type=transition.event, event_data=built[pk][3]) for pk in applied
+        ])
+        outbox.enqueue_many([
+            (transition.event, built[pk][4]) for pk in applied if built[pk][4] is not None
+        ])
+        counter_changes = []
+        for pk in applied:
+            order, before, changes = built[pk][:3]
+            for name, value in changes.items():
+                if not isinstance(value, Combinable):
+                    setattr(order, name, value)
+            counter_changes.append((before, counters.state(order)))
+        counters.apply(counter_changes)
+
+    errors.update({pk: None for pk in applied})
+    return errors
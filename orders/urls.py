@@ -1,8 +1,9 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     CustomerViewSet, RestaurantViewSet, OrderViewSet,
-    OrderItemViewSet, OrderEventViewSet, KyteWebhookView
+    OrderItemViewSet, OrderEventViewSet, KyteWebhookView, order_export, order_stream, metrics_view
 )
 
 # Create a router and register our viewsets
@@ -14,7 +15,13 @@ router.register(r'order-items', OrderItemViewSet, basename='orderitem')
 router.register(r'order-events', OrderEventViewSet, basename='orderevent')
 
 urlpatterns = [
+    # Before the router so 'stream' and 'export' are not taken for an order pk
+    path('orders/stream/', order_stream, name='order-stream'),
+    path('orders/export/', order_export, name='order-export'),
+    # Under ASGI the same URLs go to async views first (see orders.async_views)
+    *([path('', include('orders.async_views'))] if settings.ASYNC_VIEWS else []),
     path('', include(router.urls)),
     path('kyte/events/', KyteWebhookView.as_view(), name='kyte-webhook'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
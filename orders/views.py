@@ -1,19 +1,31 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.response import Response
 from rest_framework.views import APIView
+import hashlib
+import json
 import random
+from typing import Any, Callable, NamedTuple, Optional
+from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.db import IntegrityError, transaction
 from django.core.management import call_command
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 import io
 
-from .models import Customer, Restaurant, Order, OrderItem, OrderEvent
+from .models import Customer, Restaurant, Order, OrderItem, OrderEvent, KyteWebhookDelivery
 from .serializers import (
     CustomerSerializer, RestaurantSerializer, OrderSerializer,
-    OrderItemSerializer, OrderEventSerializer, OrderListSerializer
+    OrderItemSerializer, OrderEventSerializer, OrderListSerializer,
+    OrderListRowSerializer, RestaurantOrderStatsSerializer, RestaurantAnalyticsSerializer,
+    ORDER_COMPUTED_FIELDS, ORDER_DETAIL_EVENTS, ORDER_NESTED_FIELDS, order_fields,
 )
-from .kyte_client import kyte_client
+from . import archive, counters, etags, export, metrics, rollups, sampling, transitions
+from .pagination import OrderCursorPagination
 
 class CustomerViewSet(viewsets.ModelViewSet):
     """ViewSet for Customer model"""
@@ -26,47 +38,251 @@ class RestaurantViewSet(viewsets.ModelViewSet):
     queryset = Restaurant.objects.all()
     serializer_class = RestaurantSerializer
 
+    @action(detail=True, methods=['get'])
+    def summary(self, request, pk=None):
+        """Badge counts by status and today's revenue, read from the counters row."""
+        try:
+            stats = counters.get_stats(_parse_id(pk))
+        except ValueError:
+            stats = None
+        if stats is None:
+            raise NotFound()
+        return Response(RestaurantOrderStatsSerializer(stats).data)
+
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """Orders, revenue, cancellation rate and prep time by hour or day, read from the hourly rollups."""
+        restaurant = self.get_object()
+        try:
+            start, end, bucket = rollups.parse_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        buckets, totals = rollups.series(restaurant.id, start, end, bucket)
+        return Response(RestaurantAnalyticsSerializer({
+            'restaurant_id': restaurant.id,
+            'bucket': bucket,
+            'start': start,
+            'end': end,
+            'updated_through': rollups.updated_through(),
+            'totals': totals,
+            'buckets': buckets,
+        }).data)
+
+
+# Order actions backed by a state transition, by action name.
+TRANSITION_ACTIONS = {
+    'accept_preparation': transitions.ACCEPT,
+    'reject_preparation': transitions.REJECT,
+    'mark_delayed': transitions.DELAY,
+    'mark_cancelled': transitions.CANCEL,
+    'mark_done': transitions.DONE,
+    'mark_delivered': transitions.DELIVER,
+}
+
+
+def transition_params(name, data):
+    """Validated transition arguments for action ``name``; ValueError with the API message."""
+    if name in ('reject_preparation', 'mark_cancelled'):
+        reason = data.get('reason', '')
+        if not reason:
+            kind = 'Rejection' if name == 'reject_preparation' else 'Cancellation'
+            raise ValueError(f'{kind} reason is required')
+        return {'reason': reason}
+    if name == 'mark_delayed':
+        delay_minutes = data.get('delay_minutes')
+        if not delay_minutes:
+            raise ValueError('Delay minutes is required')
+        try:
+            delay_minutes = int(delay_minutes)
+        except (ValueError, TypeError):
+            delay_minutes = 0
+        if delay_minutes <= 0:
+            raise ValueError('Invalid delay minutes value')
+        return {'delay_minutes': delay_minutes, 'reason': data.get('reason', '')}
+    return {}
+
+
+def filter_orders(queryset, params):
+    """Apply the ``restaurant_id``/``status``/``preparation_status`` query filters.
+
+    ValueError with the API message for a ``restaurant_id`` that is not an id.
+    Callers scoping ETags to the restaurant rely on this check.
+    """
+    restaurant_id = params.get('restaurant_id')
+    if restaurant_id:
+        try:
+            queryset = queryset.filter(restaurant_id=_parse_id(restaurant_id))
+        except ValueError:
+            raise ValueError('restaurant_id must be an integer')
+
+    order_status = params.get('status')
+    if order_status:
+        queryset = queryset.filter(status=order_status)
+
+    prep_status = params.get('preparation_status')
+    if prep_status:
+        queryset = queryset.filter(preparation_status=prep_status)
+    return queryset
+
+
+def filter_placed(queryset, params):
+    """Apply ``from``/``to`` (ISO dates or datetimes, ``to`` exclusive) to ``placed_at``.
+
+    ValueError with the API message for bad values.
+    """
+    start, end = rollups.parse_bound(params, 'from'), rollups.parse_bound(params, 'to')
+    if start is not None:
+        queryset = queryset.filter(placed_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(placed_at__lt=end)
+    return queryset
+
+
+def load_order_fields(queryset, fields):
+    """Restrict ``queryset`` to the columns and relations that ``fields`` (from ``order_fields``) render."""
+    related = [name for name in ('restaurant', 'customer') if name in fields]
+    columns = [name for name in fields if name not in ORDER_NESTED_FIELDS + ORDER_COMPUTED_FIELDS]
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if related:
+        # select_related() without names would follow every foreign key.
+        queryset = queryset.select_related(*related)
+    if 'items' in fields:
+        queryset = queryset.prefetch_related('items')
+    if 'events' in fields:
+        queryset = queryset.with_latest_events(ORDER_DETAIL_EVENTS)
+    if 'events_count' in fields:
+        queryset = queryset.with_events_count()
+    # updated_at for the ETag
+    return queryset.only(*columns, *related, 'updated_at')
+
+
+def filter_cancelled(queryset, params):
+    """Cancelled orders, optionally by ``stage`` ('preparation' | 'ready') and ``source`` ('kyte' | 'staff')."""
+    stage = params.get('stage')
+    source = params.get('source')
+    queryset = queryset.cancelled()
+
+    # Stage and source are recorded on the order when it is cancelled
+    # (see Order.set_cancel_origin), so both filters are index lookups.
+    if stage in Order.CancelStage.values:
+        queryset = queryset.filter(cancel_stage=stage)
+    if source in Order.CancelSource.values:
+        queryset = queryset.filter(cancel_source=source)
+    return queryset
+
 
 class OrderViewSet(viewsets.ModelViewSet):
     """
     ViewSet for Order model with custom actions for order management.
     Includes actions for accepting, rejecting, and updating order status.
     """
-    queryset = Order.objects.all().select_related('customer', 'restaurant').prefetch_related('items', 'events')
+    queryset = (
+        Order.objects.all()
+        .select_related('customer', 'restaurant')
+        .prefetch_related('items')
+        # A bounded window of events; the full timeline is paginated at events_url.
+        .with_latest_events(ORDER_DETAIL_EVENTS)
+        .with_events_count()
+    )
+    pagination_class = OrderCursorPagination
+    max_bulk_size = 200
 
     def get_serializer_class(self):
         if self.action == 'list':
             return OrderListSerializer
         return OrderSerializer
 
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # ?fields= / ?expand= shape the order read back by the detail view and the actions.
+        self.order_fields = None
+        if self.action == 'retrieve' or self.action in TRANSITION_ACTIONS:
+            try:
+                self.order_fields = order_fields(request.query_params)
+            except ValueError as e:
+                raise ParseError({'error': str(e)})
+
     def get_queryset(self):
         queryset = super().get_queryset()
+        if getattr(self, 'order_fields', None) is not None:
+            queryset = load_order_fields(queryset, self.order_fields)
+        try:
+            return filter_orders(queryset, self.request.query_params)
+        except ValueError as e:
+            raise ParseError({'error': str(e)})
+
+    def get_serializer(self, *args, **kwargs):
+        if getattr(self, 'order_fields', None) is not None:
+            kwargs.setdefault('fields', self.order_fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self._list_response(self.filter_queryset(self.get_queryset()))
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            counters.record(serializer.save())
+
+    def perform_update(self, serializer):
+        before = counters.state(serializer.instance)
+        with transaction.atomic():
+            counters.record(serializer.save(), before)
+
+    def perform_destroy(self, instance):
+        before = counters.state(instance)
+        with transaction.atomic():
+            instance.delete()
+            counters.record_removed(before)
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.order_fields is not None and not {'events', 'events_count'} & set(self.order_fields):
+            # Without events the row's updated_at is the whole version, so
+            # loading the order is the only query.
+            order = self.get_object()
+            return self._conditional(
+                (order.updated_at,), lambda: Response(self.get_serializer(order).data)
+            )
+        try:
+            version = etags.order_version(int(kwargs[self.lookup_field]))
+        except ValueError:
+            version = None
+        if version is None:
+            return super().retrieve(request, *args, **kwargs)
+        return self._conditional(version, lambda: super(OrderViewSet, self).retrieve(request, *args, **kwargs))
+
+    def _conditional(self, version, render):
+        """304 if the client already has ``version``, otherwise ``render()`` with its ETag."""
+        etag = etags.make_etag(self.request, *version)
+        return etags.not_modified(self.request, etag) or etags.tag(render(), etag)
+
+    def _list_response(self, queryset):
+        """Serialize a list of orders through the flat ``list_rows`` projection.
+
+        Lists scoped to a restaurant are conditional on its version, checked
+        before the page is queried.
+        """
         restaurant_id = self.request.query_params.get('restaurant_id')
-        if restaurant_id:
-            queryset = queryset.filter(restaurant_id=restaurant_id)
-
-        order_status = self.request.query_params.get('status')
-        if order_status:
-            queryset = queryset.filter(status=order_status)
-
-        prep_status = self.request.query_params.get('preparation_status')
-        if prep_status:
-            queryset = queryset.filter(preparation_status=prep_status)
-        return queryset
-
-    def _create_order_event(self, order, event_type, event_data=None):
-        OrderEvent.objects.create(order=order, event_type=event_type, event_data=event_data or {})
+        version = etags.restaurant_version(restaurant_id) if restaurant_id else None
+        if version is not None:
+            return self._conditional(version, lambda: self._render_list(queryset))
+        return self._render_list(queryset)
+
+    def _render_list(self, queryset):
+        queryset = queryset.list_rows()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(OrderListRowSerializer(page, many=True).data)
+        return Response(OrderListRowSerializer(queryset, many=True).data)
 
     # ---------- Simulation helpers exposed as actions ----------
     @action(detail=False, methods=['post'])
     def simulate_create(self, request):
         restaurant_id = int(request.data.get('restaurant_id') or 1)
 
-        customers = list(Customer.objects.all())
-        if not customers:
+        customer = sampling.random_row(Customer.objects.all())
+        if customer is None:
             return Response({'error': 'No customers available'}, status=status.HTTP_400_BAD_REQUEST)
 
-        customer = random.choice(customers)
         placed_at = timezone.now().isoformat()
 
         sample_items = [
@@ -92,28 +308,14 @@ class OrderViewSet(viewsets.ModelViewSet):
         restaurant_id = int(request.data.get('restaurant_id') or 1)
 
         # Prefer READY orders, then in-progress (accepted/delayed), then pending
-        ready_qs = Order.objects.filter(
-            restaurant_id=restaurant_id,
-            status=Order.OrderStatus.READY
-        ).exclude(status=Order.OrderStatus.CANCELLED)
-
-        inprog_qs = Order.objects.filter(
-            restaurant_id=restaurant_id,
-            preparation_status__in=[
-                Order.PreparationStatus.ACCEPTED,
-                Order.PreparationStatus.DELAYED,
-            ]
-        ).exclude(status__in=[Order.OrderStatus.DELIVERED, Order.OrderStatus.CANCELLED])
-
-        pending_qs = Order.objects.filter(
-            restaurant_id=restaurant_id
-        ).filter(
-            Q(preparation_status__isnull=True) | Q(preparation_status=Order.PreparationStatus.PENDING)
-        ).exclude(status__in=[Order.OrderStatus.DELIVERED, Order.OrderStatus.CANCELLED])
+        orders = Order.objects.filter(restaurant_id=restaurant_id)
+        ready_qs = orders.ready()
+        inprog_qs = orders.active().open()
+        pending_qs = orders.pending().open()
 
         order = None
         for qs in (ready_qs, inprog_qs, pending_qs):
-            o = qs.order_by('?').first()
+            o = sampling.random_row(qs, key='placed_at')
             if o:
                 order = o
                 break
@@ -126,121 +328,100 @@ class OrderViewSet(viewsets.ModelViewSet):
         return Response(response)
 
     # ---------- Core actions ----------
+    # Each is one compare-and-set UPDATE (see orders.transitions); an order
+    # in the wrong state, or changed by a concurrent request, answers 409.
     @action(detail=True, methods=['post'])
     def accept_preparation(self, request, pk=None):
-        order = self.get_object()
-        if order.preparation_status == Order.PreparationStatus.ACCEPTED:
-            return Response({'error': 'Order has already been accepted'}, status=status.HTTP_400_BAD_REQUEST)
-        order.preparation_status = Order.PreparationStatus.ACCEPTED
-        order.accepted_at = timezone.now()
-        order.save()
-        self._create_order_event(order, 'preparation_accepted', {'accepted_at': order.accepted_at.isoformat()})
-        kyte_client.notify_preparation_accepted(order.id)
-        serializer = self.get_serializer(order)
-        return Response(serializer.data)
+        return self._transition(request, pk, 'accept_preparation')
 
     @action(detail=True, methods=['post'])
     def reject_preparation(self, request, pk=None):
-        order = self.get_object()
-        reason = request.data.get('reason', '')
-        if not reason:
-            return Response({'error': 'Rejection reason is required'}, status=status.HTTP_400_BAD_REQUEST)
-        order.preparation_status = Order.PreparationStatus.REJECTED
-        order.rejection_reason = reason
-        order.status = Order.OrderStatus.CANCELLED
-        order.cancelled_at = timezone.now()
-        order.save()
-        self._create_order_event(order, 'preparation_rejected', {'reason': reason, 'rejected_at': timezone.now().isoformat()})
-        kyte_client.notify_preparation_rejected(order.id, reason)
-        serializer = self.get_serializer(order)
-        return Response(serializer.data)
+        return self._transition(request, pk, 'reject_preparation')
 
     @action(detail=True, methods=['post'])
     def mark_delayed(self, request, pk=None):
-        order = self.get_object()
-        delay_minutes = request.data.get('delay_minutes')
-        reason = request.data.get('reason', '')
-        if not delay_minutes:
-            return Response({'error': 'Delay minutes is required'}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            delay_minutes = int(delay_minutes)
-            if delay_minutes <= 0:
-                raise ValueError('Delay minutes must be positive')
-        except (ValueError, TypeError):
-            return Response({'error': 'Invalid delay minutes value'}, status=status.HTTP_400_BAD_REQUEST)
-        order.preparation_status = Order.PreparationStatus.DELAYED
-        order.delay_minutes = (order.delay_minutes or 0) + delay_minutes
-        order.save()
-        self._create_order_event(order, 'preparation_delayed', {
-            'delay_minutes': delay_minutes,
-            'reason': reason,
-            'delayed_at': timezone.now().isoformat(),
-        })
-        kyte_client.notify_preparation_delayed(order.id, delay_minutes, reason)
-        serializer = self.get_serializer(order)
-        return Response(serializer.data)
+        return self._transition(request, pk, 'mark_delayed')
 
     @action(detail=True, methods=['post'])
     def mark_cancelled(self, request, pk=None):
-        order = self.get_object()
-        reason = request.data.get('reason', '')
-        if not reason:
-            return Response({'error': 'Cancellation reason is required'}, status=status.HTTP_400_BAD_REQUEST)
-        order.preparation_status = Order.PreparationStatus.CANCELLED
-        order.status = Order.OrderStatus.CANCELLED
-        order.cancelled_at = timezone.now()
-        order.rejection_reason = reason
-        order.save()
-        self._create_order_event(order, 'preparation_cancelled', {'reason': reason, 'cancelled_at': timezone.now().isoformat()})
-        kyte_client.notify_preparation_cancelled(order.id, reason)
-        serializer = self.get_serializer(order)
-        return Response(serializer.data)
+        return self._transition(request, pk, 'mark_cancelled')
 
     @action(detail=True, methods=['post'])
     def mark_done(self, request, pk=None):
-        order = self.get_object()
-        if order.preparation_status not in (Order.PreparationStatus.ACCEPTED, Order.PreparationStatus.DELAYED):
-            return Response({'error': 'Order must be accepted before marking as done'}, status=status.HTTP_400_BAD_REQUEST)
-        order.preparation_status = Order.PreparationStatus.DONE
-        order.status = Order.OrderStatus.READY
-        order.save()
-        self._create_order_event(order, 'preparation_done', {'completed_at': timezone.now().isoformat()})
-        kyte_client.notify_preparation_done(order.id)
-        serializer = self.get_serializer(order)
-        return Response(serializer.data)
+        return self._transition(request, pk, 'mark_done')
 
     @action(detail=True, methods=['post'])
     def mark_delivered(self, request, pk=None):
-        order = self.get_object()
-        if order.status != Order.OrderStatus.READY:
-            return Response({'error': 'Order must be ready before marking as delivered'}, status=status.HTTP_400_BAD_REQUEST)
-        order.status = Order.OrderStatus.DELIVERED
-        order.save()
-        self._create_order_event(order, 'order_delivered', {'delivered_at': timezone.now().isoformat()})
-        serializer = self.get_serializer(order)
-        return Response(serializer.data)
+        return self._transition(request, pk, 'mark_delivered')
+
+    def _transition(self, request, pk, name):
+        """Apply the transition of action ``name`` and answer with the updated order."""
+        try:
+            params = transition_params(name, request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            order_id = _parse_id(pk)
+        except ValueError:
+            raise NotFound()
+        try:
+            transitions.apply(order_id, TRANSITION_ACTIONS[name], **params)
+        except Order.DoesNotExist:
+            raise NotFound()
+        except transitions.Conflict as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(self.get_object()).data)
+
+    @action(detail=False, methods=['post'])
+    def bulk_transition(self, request):
+        """Apply one action to many orders in a single transaction.
+
+        Body: ``{"action": "accept_preparation", "order_ids": [1, 2, 3]}`` plus
+        the action's own fields (``reason``, ``delay_minutes``). Every order
+        gets a result at its position in ``order_ids``.
+        """
+        name = request.data.get('action')
+        if name not in TRANSITION_ACTIONS:
+            return Response(
+                {'error': f"action must be one of: {', '.join(TRANSITION_ACTIONS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        order_ids = request.data.get('order_ids')
+        if (
+            not isinstance(order_ids, list) or not order_ids
+            or not all(isinstance(i, int) and not isinstance(i, bool) and i in ID_RANGE for i in order_ids)
+        ):
+            return Response({'error': 'order_ids must be a non-empty list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(order_ids) > self.max_bulk_size:
+            return Response(
+                {'error': f'Too many orders (max {self.max_bulk_size})'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            params = transition_params(name, request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        errors = transitions.apply_many(list(dict.fromkeys(order_ids)), TRANSITION_ACTIONS[name], **params)
+        results = [
+            {'order_id': order_id, 'status': 'error', 'error': errors[order_id]} if errors[order_id]
+            else {'order_id': order_id, 'status': 'ok'}
+            for order_id in order_ids
+        ]
+        failed = sum(1 for result in results if result['status'] == 'error')
+        return Response({
+            'action': name,
+            'processed': len(results) - failed,
+            'failed': failed,
+            'results': results,
+        })
 
     @action(detail=False, methods=['get'])
     def pending(self, request):
-        restaurant_id = request.query_params.get('restaurant_id')
-        queryset = self.get_queryset().filter(
-            Q(preparation_status__isnull=True) | Q(preparation_status=Order.PreparationStatus.PENDING)
-        )
-        if restaurant_id:
-            queryset = queryset.filter(restaurant_id=restaurant_id)
-        serializer = OrderListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self._list_response(self.get_queryset().pending())
 
     @action(detail=False, methods=['get'])
     def active(self, request):
-        restaurant_id = request.query_params.get('restaurant_id')
-        queryset = self.get_queryset().filter(
-            preparation_status__in=[Order.PreparationStatus.ACCEPTED, Order.PreparationStatus.DELAYED]
-        )
-        if restaurant_id:
-            queryset = queryset.filter(restaurant_id=restaurant_id)
-        serializer = OrderListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self._list_response(self.get_queryset().active())
 
     @action(detail=False, methods=['get'])
     def cancelled(self, request):
@@ -249,28 +430,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         These are used by the UI to surface recently-cancelled items prominently
         until acknowledged by the user.
         """
-        restaurant_id = request.query_params.get('restaurant_id')
-        stage = request.query_params.get('stage')  # 'preparation' | 'ready'
-        source = request.query_params.get('source')  # 'kyte' | 'staff'
-        queryset = self.get_queryset().filter(status=Order.OrderStatus.CANCELLED)
-        if restaurant_id:
-            queryset = queryset.filter(restaurant_id=restaurant_id)
-
-        # Stage filtering: treat orders that have a 'preparation_done' event as
-        # ready-level cancellations. Others are preparation-level.
-        if stage == 'ready':
-            queryset = queryset.filter(events__event_type='preparation_done').distinct()
-        elif stage == 'preparation':
-            queryset = queryset.exclude(events__event_type='preparation_done').distinct()
-
-        # Source filtering: Kyte cancellations create 'order_cancelled' events.
-        # Staff cancellations use 'preparation_cancelled' (or 'preparation_rejected').
-        if source == 'kyte':
-            queryset = queryset.filter(events__event_type='order_cancelled').distinct()
-        elif source == 'staff':
-            queryset = queryset.exclude(events__event_type='order_cancelled').distinct()
-        serializer = OrderListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self._list_response(filter_cancelled(self.get_queryset(), request.query_params))
 
     @action(detail=False, methods=['post'])
     def simulate(self, request):
@@ -283,53 +443,142 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class WebhookCall(NamedTuple):
+    key: Optional[str]
+    event_type: str
+    handler: Callable
+    data: Any
+    success_status: int
+    fingerprint: str
+
+
+def request_fingerprint(event_type, data) -> str:
+    """Hash of what an idempotency key stands for: the event type and its data."""
+    canonical = json.dumps([event_type, data], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def parse_webhook(data, key=None, max_batch_size=1000):
+    """The ``WebhookCall`` for a webhook request body; ValueError with the API message.
+
+    A JSON array of events (or ``{"events": [...]}``) is processed as a batch;
+    see ``handle_order_events_batch``.
+    """
+    if isinstance(data, list) or (isinstance(data, dict) and 'events' in data):
+        events = data if isinstance(data, list) else data.get('events')
+        if not isinstance(events, list) or not events:
+            raise ValueError('events must be a non-empty list')
+        if len(events) > max_batch_size:
+            raise ValueError(f'Batch too large (max {max_batch_size} events)')
+        return WebhookCall(
+            key, 'batch', handle_order_events_batch, events, status.HTTP_200_OK, request_fingerprint('batch', events)
+        )
+    if not isinstance(data, dict):
+        raise ValueError('Missing event type')
+
+    event_type = data.get('type')
+    key = key or data.get('id')
+    key = str(key) if key else None
+    if not event_type:
+        raise ValueError('Missing event type')
+    event_data = data.get('data', {})
+    fingerprint = request_fingerprint(event_type, event_data)
+    if event_type == 'order_created':
+        return WebhookCall(
+            key, event_type, handle_order_created_event, event_data, status.HTTP_201_CREATED, fingerprint
+        )
+    if event_type == 'order_cancelled':
+        return WebhookCall(key, event_type, handle_order_cancelled_event, event_data, status.HTTP_200_OK, fingerprint)
+    raise ValueError('Unsupported event')
+
+
+KEY_REUSED = 'Idempotency key was already used for a different event'
+
+
+def delivered_query(key):
+    return KyteWebhookDelivery.objects.filter(idempotency_key=key).values('response', 'status_code', 'request_hash')
+
+
+def replay(call, delivery):
+    """``(body, status, replayed)`` answering ``call`` from its recorded ``delivery``.
+
+    A key reused for a different event answers 422 rather than the other
+    event's response, so the new event is not silently dropped.
+    """
+    if delivery['request_hash'] and delivery['request_hash'] != call.fingerprint:
+        return {'error': KEY_REUSED}, status.HTTP_422_UNPROCESSABLE_ENTITY, False
+    return delivery['response'], delivery['status_code'], True
+
+
+def run_webhook(call):
+    """Run ``call.handler`` at most once per idempotency key; returns ``(body, status, replayed)``.
+
+    The delivery row is written in the handler's transaction, so a concurrent
+    duplicate fails on the unique constraint, rolls back its writes and
+    replays the winner's response.
+    """
+    try:
+        with transaction.atomic():
+            response = call.handler(call.data)
+            if call.key:
+                KyteWebhookDelivery.objects.create(
+                    idempotency_key=call.key,
+                    event_type=call.event_type,
+                    request_hash=call.fingerprint,
+                    response=response,
+                    status_code=call.success_status,
+                )
+    except ValueError as e:
+        return {'error': str(e)}, status.HTTP_400_BAD_REQUEST, False
+    except IntegrityError:
+        delivery = delivered_query(call.key).first() if call.key else None
+        if delivery is None:
+            raise
+        return replay(call, delivery)
+    return response, call.success_status, False
+
+
+REPLAYED_HEADERS = {'Idempotent-Replayed': 'true'}
+
+
 class KyteWebhookView(APIView):
     """Inbound webhook to handle events from Kyte (mock).
 
     Supported events:
     - order_created
     - order_cancelled
-    """
-
-    def post(self, request):
-        event_type = request.data.get('type')
-        data = request.data.get('data', {})
 
-        if not event_type:
-            return Response({'error': 'Missing event type'}, status=status.HTTP_400_BAD_REQUEST)
+    A JSON array of events (or ``{"events": [...]}``) is processed as a
+    batch; see ``handle_order_events_batch``.
 
-        if event_type == 'order_created':
-            try:
-                response = handle_order_created_event(data)
-                return Response(response, status=status.HTTP_201_CREATED)
-            except ValueError as e:
-                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-        if event_type == 'order_cancelled':
-            try:
-                response = handle_order_cancelled_event(data)
-                return Response(response)
-            except ValueError as e:
-                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    A redelivery with a known idempotency key costs one lookup on the unique
+    key index and returns the stored response; a key reused for a different
+    event answers 422.
+    """
+    max_batch_size = 1000
 
-        return Response({'error': 'Unsupported event'}, status=status.HTTP_400_BAD_REQUEST)
+    def post(self, request):
+        try:
+            call = parse_webhook(request.data, request.headers.get('Idempotency-Key'), self.max_batch_size)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        delivery = delivered_query(call.key).first() if call.key else None
+        body, status_code, replayed = replay(call, delivery) if delivery is not None else run_webhook(call)
+        return Response(body, status=status_code, headers=REPLAYED_HEADERS if replayed else None)
 
 
+@transaction.atomic
 def handle_order_created_event(data):
     """Create local order from an order_created event payload.
 
     Expected data keys: restaurant_id, customer_id, placed_at; optional: total_amount, items
     """
+    if not isinstance(data, dict):
+        raise ValueError('Event data must be an object')
+    parsed = _parse_order_created(data)
     try:
-        restaurant_id = data['restaurant_id']
-        customer_id = data['customer_id']
-        placed_at = data['placed_at']
-    except KeyError as e:
-        raise ValueError(f"Missing field: {e.args[0]}")
-
-    try:
-        restaurant = Restaurant.objects.get(id=restaurant_id)
-        customer = Customer.objects.get(id=customer_id)
+        restaurant = Restaurant.objects.get(id=parsed['restaurant_id'])
+        customer = Customer.objects.get(id=parsed['customer_id'])
     except (Restaurant.DoesNotExist, Customer.DoesNotExist):
         raise ValueError('Invalid restaurant_id or customer_id')
 
@@ -338,39 +587,39 @@ def handle_order_created_event(data):
         customer=customer,
         status=Order.OrderStatus.CREATED,
         preparation_status=Order.PreparationStatus.PENDING,
-        total_amount=data.get('total_amount'),
-        placed_at=placed_at,
+        total_amount=parsed['total_amount'],
+        placed_at=parsed['placed_at'],
     )
 
     # Optional items
-    items = data.get('items', [])
-    for item in items:
-        OrderItem.objects.create(
-            order=order,
-            menu_item=item.get('menu_item', 'Item'),
-            quantity=item.get('quantity', 1),
-            unit_price=item.get('unit_price', 0),
-        )
+    for item in parsed['items']:
+        OrderItem.objects.create(order=order, **item)
 
     OrderEvent.objects.create(order=order, event_type='order_created', event_data=data)
+    counters.record(order)
     return {'message': 'order_created processed', 'order_id': order.id}
 
 
+@transaction.atomic
 def handle_order_cancelled_event(data):
     """Cancel local order from an order_cancelled event payload.
 
     Expected data keys: order_id; optional: reason
     """
+    if not isinstance(data, dict):
+        raise ValueError('Event data must be an object')
     order_id = data.get('order_id')
     reason = data.get('reason', '')
     if not order_id:
         raise ValueError('order_id is required')
 
     try:
-        order = Order.objects.get(id=order_id)
-    except Order.DoesNotExist:
+        order = Order.objects.get(id=_parse_id(order_id))
+    except (ValueError, Order.DoesNotExist):
         raise ValueError('Order not found')
 
+    before = counters.state(order)
+    order.set_cancel_origin(Order.CancelSource.KYTE)
     order.status = Order.OrderStatus.CANCELLED
     order.preparation_status = Order.PreparationStatus.CANCELLED
     order.rejection_reason = reason
@@ -378,307 +627,286 @@ def handle_order_cancelled_event(data):
     order.save()
 
     OrderEvent.objects.create(order=order, event_type='order_cancelled', event_data=data)
+    counters.record(order, before)
     return {'message': 'order_cancelled processed', 'order_id': order.id}
 
 
-# Convenience endpoints to simulate Kyte events from the UI
-@action(detail=False, methods=['post'])
-def simulate_create(self, request):
-    """Simulate a Kyte order_created for a given restaurant (default id=1)."""
-    restaurant_id = int(request.data.get('restaurant_id') or 1)
+# SQLite stores integers as signed 64-bit; larger ids overflow in the driver.
+ID_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def _parse_id(value):
+    """``value`` as a row id; ValueError if it is not an integer SQLite can store."""
+    try:
+        parsed = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid id')
+    if parsed not in ID_RANGE:
+        raise ValueError('Invalid id')
+    return parsed
+
+
+def _clean_field(model, name, value, label=None):
+    """``value`` validated as the model field ``name`` (digits, decimal places,
+    non-finite numbers, nulls, ranges); ValueError with the API message."""
+    if isinstance(value, float):
+        # The JSON literal, not its binary expansion (0.1 -> 0.1000000000000000055...).
+        value = str(value)
+    try:
+        return model._meta.get_field(name).clean(value, None)
+    except ValidationError as e:
+        raise ValueError(f"Invalid {label or name}: {' '.join(e.messages)}")
 
-    customers = list(Customer.objects.all())
-    if not customers:
-        return Response({'error': 'No customers available'}, status=status.HTTP_400_BAD_REQUEST)
 
-    customer = random.choice(customers)
-    placed_at = timezone.now().isoformat()
+def _parse_order_created(data):
+    """Validate an order_created payload up front so one bad event cannot
+    break the bulk insert for the rest of the batch."""
+    try:
+        restaurant_id = _parse_id(data['restaurant_id'])
+        customer_id = _parse_id(data['customer_id'])
+        placed_at = data['placed_at']
+    except KeyError as e:
+        raise ValueError(f"Missing field: {e.args[0]}")
+    except ValueError:
+        raise ValueError('Invalid restaurant_id or customer_id')
 
-    # Simple random items
-    sample_items = [
-        {"menu_item": "Random Pizza", "quantity": 1, "unit_price": 12.5},
-        {"menu_item": "Garlic Bread", "quantity": 1, "unit_price": 5.0},
-        {"menu_item": "Soft Drink", "quantity": 1, "unit_price": 2.5},
-    ]
-    items = random.sample(sample_items, k=random.randint(1, len(sample_items)))
-    total_amount = round(sum(i['unit_price'] * i['quantity'] for i in items), 2)
+    try:
+        parsed_placed_at = parse_datetime(placed_at) if isinstance(placed_at, str) else None
+    except ValueError:
+        parsed_placed_at = None
+    if parsed_placed_at is None:
+        raise ValueError('Invalid placed_at')
+    if timezone.is_naive(parsed_placed_at):
+        parsed_placed_at = timezone.make_aware(parsed_placed_at)
+
+    total_amount = _clean_field(Order, 'total_amount', data.get('total_amount'))
+    raw_items = data.get('items') or []
+    if not isinstance(raw_items, list) or not all(isinstance(item, dict) for item in raw_items):
+        raise ValueError('items must be a list of objects')
+    items = []
+    for position, item in enumerate(raw_items):
+        menu_item = item.get('menu_item', 'Item')
+        if not isinstance(menu_item, str) or not menu_item.strip():
+            raise ValueError(f'Invalid items[{position}].menu_item: must be a non-empty string')
+        items.append({
+            'menu_item': _clean_field(OrderItem, 'menu_item', menu_item, f'items[{position}].menu_item'),
+            'quantity': _clean_field(OrderItem, 'quantity', item.get('quantity', 1), f'items[{position}].quantity'),
+            'unit_price': _clean_field(
+                OrderItem, 'unit_price', item.get('unit_price', 0), f'items[{position}].unit_price'
+            ),
+        })
 
-    payload = {
+    return {
         'restaurant_id': restaurant_id,
-        'customer_id': customer.id,
-        'placed_at': placed_at,
+        'customer_id': customer_id,
+        'placed_at': parsed_placed_at,
         'total_amount': total_amount,
         'items': items,
     }
 
-    response = handle_order_created_event(payload)
-    return Response(response, status=status.HTTP_201_CREATED)
 
+def handle_order_events_batch(events):
+    """Process a list of ``{"type": ..., "data": ...}`` events in one transaction.
 
-@action(detail=False, methods=['post'])
-def simulate_cancel(self, request):
-    """Simulate a Kyte order_cancelled for a random not-delivered order for restaurant id=1."""
-    restaurant_id = int(request.data.get('restaurant_id') or 1)
-
-    # Choose random order that is not delivered
-    candidates = Order.objects.filter(
-        restaurant_id=restaurant_id
-    ).exclude(status=Order.OrderStatus.DELIVERED).order_by('?')
-
-    order = candidates.first()
-    if not order:
-        return Response({'error': 'No cancellable orders found'}, status=status.HTTP_400_BAD_REQUEST)
-
-    payload = {
-        'order_id': order.id,
-        'reason': 'Simulated cancellation',
-    }
-
-    response = handle_order_cancelled_event(payload)
-    return Response(response)
-    
-    @action(detail=True, methods=['post'])
-    def reject_preparation(self, request, pk=None):
-        """
-        Reject the order preparation.
-        This is called when the restaurant cannot prepare the order.
-        """
-        order = self.get_object()
-        
-        # Get rejection reason
-        reason = request.data.get('reason', '')
-        if not reason:
-            return Response(
-                {'error': 'Rejection reason is required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Update order
-        order.preparation_status = Order.PreparationStatus.REJECTED
-        order.rejection_reason = reason
-        order.status = Order.OrderStatus.CANCELLED
-        order.cancelled_at = timezone.now()
-        order.save()
-        
-        # Create event
-        self._create_order_event(
-            order,
-            'preparation_rejected',
-            {'reason': reason, 'rejected_at': timezone.now().isoformat()}
-        )
-        
-
-        # Notify Kyte (mock)
-        kyte_client.notify_preparation_rejected(order.id, reason)
+    Restaurants, customers and cancelled orders are each resolved with a single
+    query for the whole batch, and orders, items and events are written with
+    ``bulk_create``/``bulk_update``. Every event gets its own entry in
+    ``results`` (same position as in the request); invalid events are reported
+    there instead of rejecting the batch.
 
-        serializer = self.get_serializer(order)
-        return Response(serializer.data)
-    
-    @action(detail=True, methods=['post'])
-    def mark_delayed(self, request, pk=None):
-        """
-        Mark the order as delayed.
-        This is called when the restaurant needs more time to prepare the order.
-        """
-        order = self.get_object()
-        
-        # Get delay information
-        delay_minutes = request.data.get('delay_minutes')
-        reason = request.data.get('reason', '')
-        
-        if not delay_minutes:
-            return Response(
-                {'error': 'Delay minutes is required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
+    Events carrying an ``id`` are de-duplicated against earlier deliveries (and
+    against each other) with one lookup on the idempotency key index.
+    """
+    for attempt in range(2):
         try:
-            delay_minutes = int(delay_minutes)
-            if delay_minutes <= 0:
-                raise ValueError("Delay minutes must be positive")
-        except (ValueError, TypeError):
-            return Response(
-                {'error': 'Invalid delay minutes value'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Update order
-        order.preparation_status = Order.PreparationStatus.DELAYED
-        # Accumulate delay rather than overwrite
-        order.delay_minutes = (order.delay_minutes or 0) + delay_minutes
-        order.save()
-        
-        # Create event
-        self._create_order_event(
-            order,
-            'preparation_delayed',
-            {
-                'delay_minutes': delay_minutes,
-                'reason': reason,
-                'delayed_at': timezone.now().isoformat()
+            return _process_events_batch(events)
+        except IntegrityError:
+            # A concurrent delivery recorded one of our idempotency keys
+            # first; the retry replays its result instead.
+            if attempt:
+                raise
+
+
+def _process_events_batch(events):
+    results = [None] * len(events)
+    created = []  # (index, raw data, parsed data)
+    cancelled = []  # (index, raw data, order_id)
+    keys = {}  # index -> idempotency key
+    fingerprints = {}  # index -> request_fingerprint of a keyed event
+    duplicates = {}  # index -> index of the first event with the same key
+
+    def fail(index, event_type, message):
+        results[index] = {'index': index, 'type': event_type, 'status': 'error', 'error': message}
+
+    for index, event in enumerate(events):
+        if isinstance(event, dict) and event.get('id') not in (None, ''):
+            keys[index] = str(event['id'])
+            fingerprints[index] = request_fingerprint(event.get('type'), event.get('data', {}))
+
+    with transaction.atomic():
+        delivered = {}
+        if keys:
+            delivered = {
+                key: (event_type, request_hash, response)
+                for key, event_type, request_hash, response in KyteWebhookDelivery.objects.filter(
+                    idempotency_key__in=set(keys.values())
+                ).values_list('idempotency_key', 'event_type', 'request_hash', 'response')
             }
-        )
-        
-
-        # Notify Kyte (mock)
-        kyte_client.notify_preparation_delayed(order.id, delay_minutes, reason)
-
-        serializer = self.get_serializer(order)
-        return Response(serializer.data)
-    
-    @action(detail=True, methods=['post'])
-    def mark_cancelled(self, request, pk=None):
-        """
-        Mark the order preparation as cancelled.
-        This is called when the restaurant needs to cancel an already accepted order.
-        """
-        order = self.get_object()
-        
-        # Get cancellation reason
-        reason = request.data.get('reason', '')
-        if not reason:
-            return Response(
-                {'error': 'Cancellation reason is required'},
-                status=status.HTTP_400_BAD_REQUEST
+        first_with_key = {}
+
+        for index, event in enumerate(events):
+            key = keys.get(index)
+            if key is not None:
+                if key in delivered:
+                    event_type, request_hash, response = delivered[key]
+                    if request_hash and request_hash != fingerprints[index]:
+                        fail(index, event.get('type'), KEY_REUSED)
+                        continue
+                    results[index] = {
+                        'index': index, 'type': event_type, 'status': 'ok',
+                        'order_id': response.get('order_id'), 'replayed': True,
+                    }
+                    continue
+                if key in first_with_key:
+                    if fingerprints[first_with_key[key]] != fingerprints[index]:
+                        fail(index, event.get('type'), KEY_REUSED)
+                    else:
+                        duplicates[index] = first_with_key[key]
+                    continue
+                first_with_key[key] = index
+
+            if not isinstance(event, dict):
+                fail(index, None, 'Event must be an object')
+                continue
+            event_type = event.get('type')
+            data = event.get('data') or {}
+            if not event_type:
+                fail(index, None, 'Missing event type')
+            elif not isinstance(data, dict):
+                fail(index, event_type, 'Event data must be an object')
+            elif event_type == 'order_created':
+                try:
+                    created.append((index, data, _parse_order_created(data)))
+                except ValueError as e:
+                    fail(index, event_type, str(e))
+            elif event_type == 'order_cancelled':
+                order_id = data.get('order_id')
+                if not order_id:
+                    fail(index, event_type, 'order_id is required')
+                    continue
+                try:
+                    cancelled.append((index, data, _parse_id(order_id)))
+                except ValueError:
+                    fail(index, event_type, 'Order not found')
+            else:
+                fail(index, event_type, 'Unsupported event')
+
+        new_events = []
+        counter_changes = []  # (before, after) counters.state pairs
+
+        if created:
+            restaurant_ids = Restaurant.objects.filter(
+                id__in={parsed['restaurant_id'] for _, _, parsed in created}
+            ).values_list('id', flat=True)
+            customer_ids = Customer.objects.filter(
+                id__in={parsed['customer_id'] for _, _, parsed in created}
+            ).values_list('id', flat=True)
+            restaurant_ids, customer_ids = set(restaurant_ids), set(customer_ids)
+
+            accepted = []
+            for index, data, parsed in created:
+                if parsed['restaurant_id'] not in restaurant_ids or parsed['customer_id'] not in customer_ids:
+                    fail(index, 'order_created', 'Invalid restaurant_id or customer_id')
+                    continue
+                order = Order(
+                    restaurant_id=parsed['restaurant_id'],
+                    customer_id=parsed['customer_id'],
+                    status=Order.OrderStatus.CREATED,
+                    preparation_status=Order.PreparationStatus.PENDING,
+                    total_amount=parsed['total_amount'],
+                    placed_at=parsed['placed_at'],
+                )
+                accepted.append((index, data, parsed, order))
+
+            Order.objects.bulk_create([order for _, _, _, order in accepted])
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, **item)
+                for _, _, parsed, order in accepted
+                for item in parsed['items']
+            ])
+            for index, data, _, order in accepted:
+                counter_changes.append((None, counters.state(order)))
+                new_events.append(OrderEvent(order=order, event_type='order_created', event_data=data))
+                results[index] = {
+                    'index': index, 'type': 'order_created', 'status': 'ok', 'order_id': order.id,
+                }
+
+        if cancelled:
+            orders = Order.objects.in_bulk({order_id for _, _, order_id in cancelled})
+            now = timezone.now()
+            changed = {}
+            before = {}
+            for index, data, order_id in cancelled:
+                order = orders.get(order_id)
+                if order is None:
+                    fail(index, 'order_cancelled', 'Order not found')
+                    continue
+                before.setdefault(order.id, counters.state(order))
+                order.set_cancel_origin(Order.CancelSource.KYTE)
+                order.status = Order.OrderStatus.CANCELLED
+                order.preparation_status = Order.PreparationStatus.CANCELLED
+                order.rejection_reason = data.get('reason', '')
+                order.cancelled_at = now
+                order.updated_at = now
+                changed[order.id] = order
+                new_events.append(OrderEvent(order=order, event_type='order_cancelled', event_data=data))
+                results[index] = {
+                    'index': index, 'type': 'order_cancelled', 'status': 'ok', 'order_id': order.id,
+                }
+            Order.objects.bulk_update(
+                changed.values(),
+                [
+                    'status', 'preparation_status', 'rejection_reason', 'cancelled_at',
+                    'cancel_stage', 'cancel_source', 'updated_at',
+                ],
             )
-        
-        # Update order
-        order.preparation_status = Order.PreparationStatus.CANCELLED
-        order.status = Order.OrderStatus.CANCELLED
-        order.cancelled_at = timezone.now()
-        order.rejection_reason = reason
-        order.save()
-        
-        # Create event
-        self._create_order_event(
-            order,
-            'preparation_cancelled',
-            {'reason': reason, 'cancelled_at': timezone.now().isoformat()}
-        )
-        
-
-        # Notify Kyte (mock)
-        kyte_client.notify_preparation_cancelled(order.id, reason)
-
-        serializer = self.get_serializer(order)
-        return Response(serializer.data)
-    
-    @action(detail=True, methods=['post'])
-    def mark_done(self, request, pk=None):
-        """
-        Mark the order preparation as done.
-        This is called when the restaurant has finished preparing the order.
-        """
-        order = self.get_object()
-        
-        # Validate that order was accepted
-        if order.preparation_status != Order.PreparationStatus.ACCEPTED and \
-           order.preparation_status != Order.PreparationStatus.DELAYED:
-            return Response(
-                {'error': 'Order must be accepted before marking as done'},
-                status=status.HTTP_400_BAD_REQUEST
+            counter_changes += [(before[order.id], counters.state(order)) for order in changed.values()]
+
+        OrderEvent.objects.bulk_create(new_events)
+        counters.apply(counter_changes)
+
+        # Only successful events are recorded, so a rejected event can be
+        # fixed and redelivered with the same id. Rows use the single-event
+        # response shape so either path can replay them.
+        KyteWebhookDelivery.objects.bulk_create([
+            KyteWebhookDelivery(
+                idempotency_key=key,
+                event_type=results[index]['type'],
+                request_hash=fingerprints[index],
+                response={
+                    'message': f"{results[index]['type']} processed",
+                    'order_id': results[index]['order_id'],
+                },
+                status_code=(
+                    status.HTTP_201_CREATED if results[index]['type'] == 'order_created'
+                    else status.HTTP_200_OK
+                ),
             )
-        
-        # Update order
-        order.preparation_status = Order.PreparationStatus.DONE
-        order.status = Order.OrderStatus.READY
-        order.save()
-        
-        # Create event
-        self._create_order_event(
-            order,
-            'preparation_done',
-            {'completed_at': timezone.now().isoformat()}
-        )
-        
-
-        # Notify Kyte (mock)
-        kyte_client.notify_preparation_done(order.id)
-
-        serializer = self.get_serializer(order)
-        return Response(serializer.data)
-    
-    @action(detail=True, methods=['post'])
-    def mark_delivered(self, request, pk=None):
-        """
-        Mark the order as delivered.
-        This is called when the order has been picked up by the drone/delivery service.
-        """
-        order = self.get_object()
-        
-        # Validate that order is ready
-        if order.status != Order.OrderStatus.READY:
-            return Response(
-                {'error': 'Order must be ready before marking as delivered'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Update order
-        order.status = Order.OrderStatus.DELIVERED
-        order.save()
-        
-        # Create event
-        self._create_order_event(
-            order,
-            'order_delivered',
-            {'delivered_at': timezone.now().isoformat()}
-        )
-        
-        serializer = self.get_serializer(order)
-        return Response(serializer.data)
-    
-    @action(detail=False, methods=['get'])
-    def pending(self, request):
-        """Get all pending orders (created but not yet accepted or rejected)"""
-        restaurant_id = request.query_params.get('restaurant_id')
-        
-        queryset = self.get_queryset().filter(
-            Q(preparation_status__isnull=True) | 
-            Q(preparation_status=Order.PreparationStatus.PENDING)
-        )
-        
-        if restaurant_id:
-            queryset = queryset.filter(restaurant_id=restaurant_id)
-        
-        serializer = OrderListSerializer(queryset, many=True)
-        return Response(serializer.data)
-    
-    @action(detail=False, methods=['get'])
-    def active(self, request):
-        """Get all active orders (accepted or delayed)"""
-        restaurant_id = request.query_params.get('restaurant_id')
-        
-        queryset = self.get_queryset().filter(
-            preparation_status__in=[
-                Order.PreparationStatus.ACCEPTED,
-                Order.PreparationStatus.DELAYED
-            ]
-        )
-        
-        if restaurant_id:
-            queryset = queryset.filter(restaurant_id=restaurant_id)
-        
-        serializer = OrderListSerializer(queryset, many=True)
-        return Response(serializer.data)
-    
-    @action(detail=False, methods=['post'])
-    def simulate(self, request):
-        """Generate random orders for testing"""
-        count = request.data.get('count', 5)
-        
-        try:
-            # Capture command output
-            out = io.StringIO()
-            call_command('generate_orders', count=count, restaurant_id=1, stdout=out)
-
-            return Response({
-                'message': f'Successfully generated {count} random orders',
-                'count': count
-            }, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            return Response({
-                'error': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            for index, key in keys.items()
+            if index not in duplicates and results[index]['status'] == 'ok'
+            and not results[index].get('replayed')
+        ])
+
+    for index, original in duplicates.items():
+        results[index] = {**results[original], 'index': index, 'replayed': True}
+
+    failed = sum(1 for result in results if result['status'] == 'error')
+    return {
+        'message': 'batch processed',
+        'processed': len(results) - failed,
+        'failed': failed,
+        'results': results,
+    }
 
 
 class OrderItemViewSet(viewsets.ModelViewSet):
@@ -686,10 +914,29 @@ class OrderItemViewSet(viewsets.ModelViewSet):
     queryset = OrderItem.objects.all()
     serializer_class = OrderItemSerializer
 
+    # Items are part of the order payload, so item writes bump the order's
+    # updated_at; its ETag and list versions depend on it.
+    def _touch_order(self, order_id):
+        Order.objects.filter(pk=order_id).update(updated_at=timezone.now())
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            self._touch_order(serializer.save().order_id)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            self._touch_order(serializer.save().order_id)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            self._touch_order(instance.order_id)
+
 
 class OrderEventViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for OrderEvent model (read-only)"""
-    queryset = OrderEvent.objects.all()
+    # Newest first, with a tie-breaker so pages of one order's timeline are stable.
+    queryset = OrderEvent.objects.order_by('-created_at', '-id')
     serializer_class = OrderEventSerializer
     
     def get_queryset(self):
@@ -698,6 +945,65 @@ class OrderEventViewSet(viewsets.ReadOnlyModelViewSet):
         order_id = self.request.query_params.get('order_id', None)
         
         if order_id:
-            queryset = queryset.filter(order_id=order_id)
+            try:
+                queryset = queryset.filter(order_id=_parse_id(order_id))
+            except ValueError:
+                # Not an id any order can have: an empty timeline.
+                queryset = queryset.none()
         
         return queryset
+
+    def list(self, request, *args, **kwargs):
+        """``?include_archived=true`` (with ``order_id``) adds the events moved to the archive."""
+        order_id = request.query_params.get('order_id')
+        if order_id and request.query_params.get('include_archived') in ('1', 'true'):
+            try:
+                events = archive.history(_parse_id(order_id))
+            except ValueError:
+                events = []
+            page = self.paginate_queryset(events)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+            return Response(self.get_serializer(events, many=True).data)
+        return super().list(request, *args, **kwargs)
+
+
+def order_stream(request):
+    """Placeholder for the order SSE feed outside ASGI.
+
+    Under ``backend.asgi`` this path is served by ``stream.sse_application``
+    before Django sees the request; a WSGI worker cannot hold streams open
+    without pinning a thread each, so it reports the feed as unavailable.
+    """
+    return JsonResponse(
+        {'error': 'Streaming requires the ASGI server (backend.asgi)'},
+        status=status.HTTP_501_NOT_IMPLEMENTED,
+    )
+
+
+@require_GET
+def order_export(request):
+    """Orders with their items as a streamed NDJSON (default) or CSV download.
+
+    Takes the order list filters plus ``from``/``to`` on ``placed_at``; see
+    ``orders.export``.
+    """
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in export.FORMATS:
+        return JsonResponse(
+            {'error': f"format must be one of: {', '.join(export.FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        queryset = filter_placed(filter_orders(Order.objects.all(), request.GET), request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    # Django buffers iterators of the other kind to serve them, whole export included.
+    parts = export.astream if isinstance(request, ASGIRequest) else export.stream
+    response = StreamingHttpResponse(parts(queryset, export_format), content_type=export.FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="orders.{export_format}"'
+    return response
+
+
+def metrics_view(request):
+    """Request histograms of this process in the Prometheus text format."""
+    return HttpResponse(metrics.REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')